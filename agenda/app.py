@@ -1,68 +1,366 @@
+import heapq
 import random
-from fastapi import FastAPI, Query
-from typing import List, Optional
+import threading
+import uuid
+from bisect import bisect_right
+from dataclasses import dataclass
+from fastapi import FastAPI, HTTPException, Query
+from pydantic import BaseModel
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, date, timedelta, time
+import time as clock
 
 app = FastAPI(title="Fake agenda API")
 
+# Slot grid: from 09:00 to 17:45 every 15 minutes, computed once.
+# Bit i of a day bitmap is set when the slot SLOT_LABELS[i] is available.
+SLOT_START = time(9, 0)
+SLOT_END = time(18, 0)
+SLOT_DURATION = timedelta(minutes=15)
+SLOT_LABELS: List[str] = []
+_slot = datetime.combine(date.min, SLOT_START)
+while _slot < datetime.combine(date.min, SLOT_END):
+    SLOT_LABELS.append(_slot.strftime("%H:%M"))
+    _slot += SLOT_DURATION
+SLOT_INDEXES = {label: i for i, label in enumerate(SLOT_LABELS)}
 
-@app.get("/booking/available-slots")
-def available_slots(start: Optional[str] = Query(None), end: Optional[str] = Query(None)):
+# The widest range a single request may cover
+MAX_RANGE_DAYS = 3660
+
+
+class AvailabilityIndex:
+    """Availability of each day over the slot grid, as a bitmap drawn once per day and kept in memory.
+
+    Weekends have no slots, weekdays have `slots_per_day` random slots. Reserved slots are masked out of the bitmap
+    of their day. The slot labels of a day are cached with its bitmap, so that serving a day costs a dictionary lookup.
+
+    The listing endpoints run in the threadpool: a day missing from the cache is drawn and masked while holding
+    `lock`, which the reservations share, so that a reservation made meanwhile is never overwritten by a stale bitmap.
+    """
+
+    def __init__(self, slots_per_day: int = 5, seed: Optional[int] = None):
+        self.slots_per_day = slots_per_day
+        self.lock = threading.RLock()
+        self._random = random.Random(seed)
+        self._open: Dict[date, int] = {}
+        self._bitmaps: Dict[date, int] = {}
+        self._reserved: Dict[date, int] = {}
+        self._slots: Dict[date, Tuple[int, List[str]]] = {}
+
+    def open_bitmap(self, day: date) -> int:
+        """The slots of the day open for booking, reserved or not."""
+        bitmap = self._open.get(day)
+        if bitmap is None:
+            with self.lock:
+                # Checked again under the lock, so that the day is drawn once
+                bitmap = self._open.get(day)
+                if bitmap is None:
+                    bitmap = 0
+                    if day.weekday() < 5:
+                        # Skip weekends (Saturday=5, Sunday=6)
+                        for i in self._random.sample(range(len(SLOT_LABELS)), min(self.slots_per_day, len(SLOT_LABELS))):
+                            bitmap |= 1 << i
+                    self._open[day] = bitmap
+        return bitmap
+
+    def bitmap(self, day: date) -> int:
+        """The available slots of the day: open and not reserved."""
+        bitmap = self._bitmaps.get(day)
+        if bitmap is None:
+            with self.lock:
+                bitmap = self._bitmaps.get(day)
+                if bitmap is None:
+                    bitmap = self.open_bitmap(day) & ~self._reserved.get(day, 0)
+                    self._bitmaps[day] = bitmap
+        return bitmap
+
+    def reserved(self, day: date) -> int:
+        return self._reserved.get(day, 0)
+
+    def set_reserved(self, day: date, reserved: int) -> None:
+        with self.lock:
+            self._reserved[day] = reserved
+            self._bitmaps[day] = self.open_bitmap(day) & ~reserved
+
+    def slots(self, day: date) -> List[str]:
+        bitmap = self.bitmap(day)
+        # The labels are cached along with the bitmap they were built from, and rebuilt once a reservation changed it
+        cached = self._slots.get(day)
+        if cached is not None and cached[0] == bitmap:
+            return cached[1]
+        slots = [label for i, label in enumerate(SLOT_LABELS) if bitmap >> i & 1]
+        self._slots[day] = (bitmap, slots)
+        return slots
+
+    def days(self, start_date: date, end_date: date):
+        """Yields the days from start_date included to end_date excluded."""
+        day = start_date
+        one_day = timedelta(days=1)
+        while day < end_date:
+            yield day
+            day += one_day
+
+    def next_available(self, start_date: date, count: int, horizon: int) -> List[date]:
+        """Returns the first `count` days with an available slot, within `horizon` days from start_date."""
+        found = []
+        for day in self.days(start_date, start_date + timedelta(days=horizon)):
+            if self.bitmap(day):
+                found.append(day)
+                if len(found) >= count:
+                    break
+        return found
+
+
+@dataclass
+class Reservation:
+    id: str
+    day: date
+    start: int
+    """The index of the first slot reserved"""
+    end: int
+    """The index of the slot after the last one reserved"""
+    expires_at: Optional[float] = None
+    """When a hold is released if not confirmed, on the `time.monotonic` clock. None for a booking"""
+
+
+class SlotConflictError(Exception):
+    pass
+
+
+class ReservationIndex:
+    """Holds and bookings of each day, as sorted non-overlapping intervals of slot indexes.
+
+    A new reservation is checked against its neighbours found by bisection, then inserted and masked out of the
+    availability index while holding the lock, so that two concurrent requests can never reserve the same slot.
+    Holds expire after their TTL unless confirmed, expired holds being released before every operation.
+    """
+
+    def __init__(self, availability: AvailabilityIndex):
+        self.availability = availability
+        # The lock of the availability index, so that a listing never caches a day while its reservations change
+        self._lock = availability.lock
+        # Per day, the reservation starts and the reservations, in the same order
+        self._starts: Dict[date, List[int]] = {}
+        self._intervals: Dict[date, List[Reservation]] = {}
+        self._reservations: Dict[str, Reservation] = {}
+        self._expiries: List[Tuple[float, str]] = []
+
+    def reserve(self, day: date, start: int, end: int, ttl: Optional[float] = None) -> Reservation:
+        """Reserves the slots from start to end excluded, as a hold expiring after `ttl` seconds or as a booking."""
+        mask = ((1 << (end - start)) - 1) << start
+        with self._lock:
+            self._release_expired()
+            if self.availability.open_bitmap(day) & mask != mask:
+                raise SlotConflictError("The slot is not open for booking.")
+            starts = self._starts.setdefault(day, [])
+            intervals = self._intervals.setdefault(day, [])
+            i = bisect_right(starts, start)
+            if (i > 0 and intervals[i - 1].end > start) or (i < len(starts) and starts[i] < end):
+                raise SlotConflictError("The slot is already reserved.")
+
+            reservation = Reservation(uuid.uuid4().hex, day, start, end)
+            if ttl is not None:
+                reservation.expires_at = clock.monotonic() + ttl
+                heapq.heappush(self._expiries, (reservation.expires_at, reservation.id))
+            starts.insert(i, start)
+            intervals.insert(i, reservation)
+            self._reservations[reservation.id] = reservation
+            self.availability.set_reserved(day, self.availability.reserved(day) | mask)
+            return reservation
+
+    def confirm(self, hold_id: str) -> Reservation:
+        """Turns a hold into a booking, which no longer expires."""
+        with self._lock:
+            self._release_expired()
+            reservation = self._get(hold_id, hold=True)
+            reservation.expires_at = None
+            return reservation
+
+    def release(self, reservation_id: str, hold: bool = False) -> Reservation:
+        """Releases a hold, or cancels a booking, as told by `hold`."""
+        with self._lock:
+            self._release_expired()
+            return self._release(self._get(reservation_id, hold))
+
+    def _get(self, reservation_id: str, hold: bool) -> Reservation:
+        # The hold endpoints must not cancel a booking, nor the booking endpoints release a hold
+        reservation = self._reservations[reservation_id]
+        if (reservation.expires_at is not None) != hold:
+            raise KeyError(reservation_id)
+        return reservation
+
+    def release_expired(self) -> None:
+        if self._expiries and self._expiries[0][0] <= clock.monotonic():
+            with self._lock:
+                self._release_expired()
+
+    def _release_expired(self) -> None:
+        now = clock.monotonic()
+        while self._expiries and self._expiries[0][0] <= now:
+            _, reservation_id = heapq.heappop(self._expiries)
+            reservation = self._reservations.get(reservation_id)
+            # Confirmed holds keep their heap entry, and no longer expire
+            if reservation is not None and reservation.expires_at is not None and reservation.expires_at <= now:
+                self._release(reservation)
+
+    def _release(self, reservation: Reservation) -> Reservation:
+        starts, intervals = self._starts[reservation.day], self._intervals[reservation.day]
+        i = bisect_right(starts, reservation.start) - 1
+        del starts[i], intervals[i]
+        del self._reservations[reservation.id]
+        mask = ((1 << (reservation.end - reservation.start)) - 1) << reservation.start
+        self.availability.set_reserved(reservation.day, self.availability.reserved(reservation.day) & ~mask)
+        return reservation
+
+
+index = AvailabilityIndex()
+reservations = ReservationIndex(index)
+
+
+def parse_range(start: Optional[str], end: Optional[str]):
+    """Returns (start_date, end_date), or an error response."""
     # Define date format
     date_format = "%Y-%m-%d"
 
-    # Get today's date
-    today = date.today()
-
     # Parse 'start' parameter
     if start:
         try:
             start_date = datetime.strptime(start, date_format).date()
         except ValueError:
-            return {"error": "Invalid start date format. Use YYYY-MM-DD."}
+            return None, {"error": "Invalid start date format. Use YYYY-MM-DD."}
     else:
-        start_date = today
+        start_date = date.today()
 
     # Parse 'end' parameter
     if end:
         try:
             end_date = datetime.strptime(end, date_format).date()
         except ValueError:
-            return {"error": "Invalid end date format. Use YYYY-MM-DD."}
+            return None, {"error": "Invalid end date format. Use YYYY-MM-DD."}
     else:
         # If 'end' is not set, set it based on 'start'
         end_date = start_date + timedelta(days=7)
 
     # Ensure start_date is before or equal to end_date
     if start_date > end_date:
-        return {"error": "'start' date must be before 'end' date."}
-
-    # Generate list of dates from start_date to end_date inclusive
-    delta = end_date - start_date
-
-    available_slots_list = []
-
-    for i in range(delta.days):
-        day = start_date + timedelta(days=i)
-        if day.weekday() >= 5:
-            # Skip weekends (Saturday=5, Sunday=6)
-            continue
-        date_str = day.strftime("%Y-%m-%d")
-        # Generate time slots from 09:00 to 17:45 every 15 minutes
-        slots = []
-        start_time = time(9, 0)
-        end_time = time(18, 0)
-        slot_duration = timedelta(minutes=15)
-        current_time = datetime.combine(day, start_time)
-        end_datetime = datetime.combine(day, end_time)
-
-        while current_time < end_datetime:
-            slots.append(current_time.strftime("%H:%M"))
-            current_time += slot_duration
-
-        # Random 5 slots
-        selected_indices = sorted(random.sample(range(len(slots)), min(5, len(slots))))
-        selected_slots = [slots[i] for i in selected_indices]
-        available_slots_list.append({"date": date_str, "availableSlots": selected_slots})
+        return None, {"error": "'start' date must be before 'end' date."}
+    if (end_date - start_date).days > MAX_RANGE_DAYS:
+        return None, {"error": f"The range must not exceed {MAX_RANGE_DAYS} days."}
+    return (start_date, end_date), None
+
+
+@app.get("/booking/available-slots")
+def available_slots(start: Optional[str] = Query(None), end: Optional[str] = Query(None)):
+    date_range, error = parse_range(start, end)
+    if error:
+        return error
+    reservations.release_expired()
 
+    # Days from start_date to end_date excluded, weekends have no slots and are left out
+    available_slots_list = [
+        {"date": day.isoformat(), "availableSlots": index.slots(day)} for day in index.days(*date_range) if index.bitmap(day)
+    ]
     return {"data": available_slots_list}
+
+
+@app.get("/booking/available-slots/bulk")
+def available_slots_bulk(start: Optional[str] = Query(None), end: Optional[str] = Query(None)):
+    """Wide ranges in a compact form: the slot grid once, then the availability bitmap of each day with slots."""
+    date_range, error = parse_range(start, end)
+    if error:
+        return error
+    reservations.release_expired()
+
+    data = [{"date": day.isoformat(), "bitmap": index.bitmap(day)} for day in index.days(*date_range) if index.bitmap(day)]
+    return {"slots": SLOT_LABELS, "data": data}
+
+
+@app.get("/booking/next-available")
+def next_available(
+    start: Optional[str] = Query(None),
+    count: int = Query(1, ge=1, le=100),
+    horizon: int = Query(30, ge=1, le=MAX_RANGE_DAYS),
+):
+    """The first `count` days with an available slot from `start` included, looking at most `horizon` days ahead."""
+    date_range, error = parse_range(start, None)
+    if error:
+        return error
+    reservations.release_expired()
+
+    days = index.next_available(date_range[0], count, horizon)
+    return {"data": [{"date": day.isoformat(), "availableSlots": index.slots(day)} for day in days]}
+
+
+class ReservationRequest(BaseModel):
+    date: str
+    """The day, as YYYY-MM-DD"""
+    time: str
+    """The first slot, as HH:MM"""
+    duration_minutes: int = 15
+
+
+def reserve(request: ReservationRequest, ttl: Optional[float]) -> dict:
+    try:
+        day = datetime.strptime(request.date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Invalid date format. Use YYYY-MM-DD.")
+    start = SLOT_INDEXES.get(request.time)
+    slot_minutes = int(SLOT_DURATION.total_seconds() // 60)
+    if start is None or request.duration_minutes <= 0 or request.duration_minutes % slot_minutes:
+        raise HTTPException(status_code=422, detail="The time and duration must follow the 15-minute slot grid.")
+    end = start + request.duration_minutes // slot_minutes
+    if end > len(SLOT_LABELS):
+        raise HTTPException(status_code=422, detail="The reservation must end by the end of the day.")
+    try:
+        reservation = reservations.reserve(day, start, end, ttl)
+    except SlotConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return reservation_response(reservation)
+
+
+def reservation_response(reservation: Reservation) -> dict:
+    response = {
+        "id": reservation.id,
+        "date": reservation.day.isoformat(),
+        "time": SLOT_LABELS[reservation.start],
+        "durationMinutes": (reservation.end - reservation.start) * int(SLOT_DURATION.total_seconds() // 60),
+        "status": "held" if reservation.expires_at is not None else "booked",
+    }
+    if reservation.expires_at is not None:
+        response["expiresInSeconds"] = max(0.0, reservation.expires_at - clock.monotonic())
+    return response
+
+
+@app.post("/booking/holds", status_code=201)
+def create_hold(request: ReservationRequest, ttl_seconds: float = Query(120, gt=0, le=3600)):
+    """Holds slots for `ttl_seconds`, while the user confirms. The hold is released if not confirmed in time."""
+    return reserve(request, ttl_seconds)
+
+
+@app.post("/booking/holds/{hold_id}/confirm")
+def confirm_hold(hold_id: str):
+    try:
+        return reservation_response(reservations.confirm(hold_id))
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown or expired hold.")
+
+
+@app.delete("/booking/holds/{hold_id}")
+def release_hold(hold_id: str):
+    try:
+        return reservation_response(reservations.release(hold_id, hold=True))
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown or expired hold.")
+
+
+@app.post("/booking/bookings", status_code=201)
+def create_booking(request: ReservationRequest):
+    return reserve(request, None)
+
+
+@app.delete("/booking/bookings/{booking_id}")
+def cancel_booking(booking_id: str):
+    try:
+        return reservation_response(reservations.release(booking_id))
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown booking.")
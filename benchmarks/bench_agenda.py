@@ -0,0 +1,77 @@
+"""Measures the requests per second of the agenda service over wide date ranges.
+
+Compares the slot grid rebuilt on every request, as the agenda did before its availability index, with the index
+endpoints: the ranged listing, its bulk bitmap form, and the next available days.
+
+Usage: python benchmarks/bench_agenda.py [--days 7 90 365] [--requests 200]
+"""
+
+import argparse
+import importlib.util
+import random
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from fastapi import FastAPI, Query
+from fastapi.testclient import TestClient
+
+spec = importlib.util.spec_from_file_location("agenda_app", Path(__file__).parents[1] / "agenda" / "app.py")
+agenda_app = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(agenda_app)
+
+legacy_app = FastAPI()
+
+
+@legacy_app.get("/booking/available-slots")
+def legacy_available_slots(start: str = Query(None), end: str = Query(None)):
+    """The handler before the availability index: the 15-minute grid of every day is rebuilt on each request."""
+    start_date = datetime.strptime(start, "%Y-%m-%d").date()
+    end_date = datetime.strptime(end, "%Y-%m-%d").date()
+    available_slots_list = []
+    for i in range((end_date - start_date).days):
+        day = start_date + timedelta(days=i)
+        if day.weekday() >= 5:
+            continue
+        slots = []
+        current_time = datetime.combine(day, datetime.min.time().replace(hour=9))
+        end_datetime = datetime.combine(day, datetime.min.time().replace(hour=18))
+        while current_time < end_datetime:
+            slots.append(current_time.strftime("%H:%M"))
+            current_time += timedelta(minutes=15)
+        selected_indices = sorted(random.sample(range(len(slots)), min(5, len(slots))))
+        available_slots_list.append({"date": day.strftime("%Y-%m-%d"), "availableSlots": [slots[i] for i in selected_indices]})
+    return {"data": available_slots_list}
+
+
+def measure(client: TestClient, path: str, params: dict, requests: int) -> float:
+    """Returns the requests per second of the endpoint, after a warm-up request."""
+    client.get(path, params=params).raise_for_status()
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get(path, params=params)
+    return requests / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, nargs="+", default=[7, 90, 365])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    legacy, indexed = TestClient(legacy_app), TestClient(agenda_app.app)
+    start = date.today().isoformat()
+    print(f"{'days':>5} {'legacy req/s':>13} {'indexed req/s':>14} {'bulk req/s':>11}")
+    for days in args.days:
+        params = {"start": start, "end": (date.today() + timedelta(days=days)).isoformat()}
+        legacy_rate = measure(legacy, "/booking/available-slots", params, args.requests)
+        indexed_rate = measure(indexed, "/booking/available-slots", params, args.requests)
+        bulk_rate = measure(indexed, "/booking/available-slots/bulk", params, args.requests)
+        print(f"{days:>5} {legacy_rate:>13,.0f} {indexed_rate:>14,.0f} {bulk_rate:>11,.0f}")
+
+    next_available = measure(indexed, "/booking/next-available", {"start": start, "count": 3, "horizon": 30}, args.requests)
+    print(f"next-available (3 days within 30): {next_available:,.0f} req/s")
+
+
+if __name__ == "__main__":
+    main()
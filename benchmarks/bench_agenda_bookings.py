@@ -0,0 +1,81 @@
+"""Measures the booking throughput of the agenda service under many concurrent booking attempts.
+
+Threads race to book the open slots of a range of days, most attempts hitting a slot already taken. The run checks
+that every slot was booked exactly once, then reports the attempts per second through the reservation index, and
+through the HTTP endpoint.
+
+Usage: python benchmarks/bench_agenda_bookings.py [--days 60] [--threads 16] [--attempts 20000]
+"""
+
+import argparse
+import importlib.util
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+
+def load_agenda_app():
+    spec = importlib.util.spec_from_file_location("agenda_app", Path(__file__).parents[1] / "agenda" / "app.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def open_slots(agenda, days: list[date]) -> list[tuple[date, int]]:
+    return [(day, agenda.SLOT_INDEXES[label]) for day in days for label in agenda.index.slots(day)]
+
+
+def run(attempt, slots: list, threads: int, attempts: int) -> tuple[float, int]:
+    """Returns the attempts per second and the number of successful bookings."""
+    targets = [random.choice(slots) for _ in range(attempts)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        booked = sum(executor.map(attempt, targets))
+    return attempts / (time.perf_counter() - start), booked
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--attempts", type=int, default=20_000)
+    args = parser.parse_args()
+    days = [date.today() + timedelta(days=i) for i in range(args.days)]
+
+    agenda = load_agenda_app()
+    slots = open_slots(agenda, days)
+
+    def reserve(target: tuple[date, int]) -> bool:
+        day, start = target
+        try:
+            agenda.reservations.reserve(day, start, start + 1)
+            return True
+        except agenda.SlotConflictError:
+            return False
+
+    rate, booked = run(reserve, slots, args.threads, args.attempts)
+    # Slots never drawn by a thread stay open: every drawn slot must be booked exactly once
+    assert booked == len(slots) - len(open_slots(agenda, days)), "a slot was booked twice"
+    print(f"{'index':<6} {rate:>10,.0f} attempts/s  {booked} of {len(slots)} slots booked")
+
+    agenda = load_agenda_app()
+    slots = open_slots(agenda, days)
+    client = TestClient(agenda.app)
+
+    def book(target: tuple[date, int]) -> bool:
+        day, start = target
+        response = client.post("/booking/bookings", json={"date": day.isoformat(), "time": agenda.SLOT_LABELS[start]})
+        return response.status_code == 201
+
+    attempts = max(args.attempts // 10, 1)
+    rate, booked = run(book, slots, args.threads, attempts)
+    assert booked == len(slots) - len(open_slots(agenda, days)), "a slot was booked twice"
+    print(f"{'http':<6} {rate:>10,.0f} attempts/s  {booked} of {len(slots)} slots booked")
+
+
+if __name__ == "__main__":
+    main()
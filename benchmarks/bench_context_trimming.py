@@ -0,0 +1,77 @@
+"""Compares the per-turn cost of context trimming with and without the message token cache.
+
+Usage: python benchmarks/bench_context_trimming.py [--turns 200] [--model gpt-4o-mini]
+"""
+
+import argparse
+import time
+
+from lisa.agents.base_agent import BaseAgent
+from lisa.models.llm_config import LLMConfig
+
+
+def fit_without_cache(agent: BaseAgent, messages: list) -> list:
+    """The trimming as it was before the token cache: every message is tokenized on every call."""
+    total_messages_tokens = 0
+    trimmed_messages = []
+    for message in reversed(messages):
+        if "content" not in message:
+            trimmed_messages.append(message)
+            continue
+        total_messages_tokens += agent.llm_config.token_counter(messages=[message])
+        if total_messages_tokens <= agent.llm_config.max_prompt_tokens:
+            trimmed_messages.append(message)
+        else:
+            break
+    if trimmed_messages[-1]["role"] == "assistant":
+        trimmed_messages.pop()
+    return list(reversed(trimmed_messages))
+
+
+def simulate_turn(turn: int) -> list[dict]:
+    day = turn % 28 + 1
+    slots = ["09:00", "10:15", "11:30", "14:45", "16:00"]
+    return [
+        {"role": "user", "content": f"Est-ce que vous auriez un créneau le {day} mars dans l'après-midi ?"},
+        {
+            "role": "tool",
+            "name": "get_available_time_slots",
+            "tool_call_id": f"call_{turn}",
+            "content": f"Les créneaux disponibles du lundi {day} mars: {slots}",
+        },
+        {"role": "assistant", "content": "Je peux vous proposer 14h45 ou 16h. Lequel préférez-vous ?"},
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--model", default="gpt-4o-mini")
+    args = parser.parse_args()
+
+    llm_config = LLMConfig(model=args.model, api_key="benchmark", context_window=128_000, max_tokens=1_000)
+    agent = BaseAgent(llm_config=llm_config)
+    messages = [{"role": "system", "content": "Vous êtes LISA, un assistant vocal qui parle français."}]
+
+    print(f"{'turn':>6} {'messages':>9} {'uncached ms':>12} {'cached ms':>10}")
+    for turn in range(1, args.turns + 1):
+        for message in simulate_turn(turn):
+            messages.append(message)
+            # The agent counts the tokens of a message once, when adding it to the history
+            agent.message_tokens.count(message)
+
+        start = time.perf_counter()
+        uncached = fit_without_cache(agent, messages)
+        uncached_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        cached = agent._fit_messages_within_context(messages)
+        cached_ms = (time.perf_counter() - start) * 1000
+
+        assert cached == uncached
+        if turn == 1 or turn % max(1, args.turns // 10) == 0:
+            print(f"{turn:>6} {len(messages):>9} {uncached_ms:>12.3f} {cached_ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
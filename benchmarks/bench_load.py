@@ -0,0 +1,233 @@
+"""Load test of the agent: many concurrent scripted conversations against local stand-ins of every upstream.
+
+The stand-ins run in background threads, each with its own event loop, so that only the agent side loads the loop
+being measured:
+- an OpenAI-compatible LLM stub streaming the scripted answers and tool calls, with a configurable token latency,
+- the fake agenda service of `agenda/app.py`, served by uvicorn,
+- a Recognizers stub resolving dates with the local French parser.
+
+Conversations are replayed from a JSON lines file, one conversation per line:
+{"conversation_id": "...", "turns": [{"user": "...", "tool_calls": [[name, arguments], ...], "answer": "..."}]}
+The LLM stub answers a user message with its tool calls if any, then with its answer.
+
+Reports turns per second, the p50/p95/p99 turn latency, the time to first token and the event loop lag, followed by
+the latency histograms of the spans, such as the LLM calls and the agenda requests. Set TRACING_EXPORTER to also
+export the spans.
+
+Usage: python benchmarks/bench_load.py [--conversations 200] [--concurrency 50] [--token-delay-ms 20]
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import logging
+import os
+import re
+import socket
+import statistics
+import threading
+import time
+from datetime import date
+from pathlib import Path
+
+import uvicorn
+from aiohttp import web
+from chainlit.context import init_http_context
+
+from lisa.agent_tools.appointment.french_date_parser import parse_french_date
+from lisa.agent_tools.appointment.schedulers import book_time_slot, get_available_time_slots
+from lisa.agents.tool_call_agent import ToolCallAgent
+from lisa.models.llm_config import LLMConfig
+from lisa.models.stream_events import Finish
+from lisa.utils.tracing import tracer
+
+SYSTEM_PROMPT = "Vous êtes LISA, un assistant vocal qui planifie des rendez-vous."
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run_in_thread(start) -> None:
+    """Runs the coroutine function `start` and then its loop forever in a daemon thread."""
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+
+    def run() -> None:
+        loop.run_until_complete(start())
+        started.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    started.wait()
+
+
+class ScriptedLLM:
+    """OpenAI-compatible chat completions answering each scripted user message with its tool calls, then its answer."""
+
+    def __init__(self, turns: dict[str, dict], token_delay: float, first_token_delay: float) -> None:
+        self.turns = turns
+        self.token_delay = token_delay
+        self.first_token_delay = first_token_delay
+
+    async def chat_completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        messages = body["messages"]
+        user_text = next(m["content"] for m in reversed(messages) if m["role"] == "user")
+        turn = self.turns.get(user_text, {})
+        if messages[-1]["role"] == "user" and turn.get("tool_calls"):
+            deltas, finish_reason = self._tool_call_deltas(turn["tool_calls"]), "tool_calls"
+        else:
+            answer = turn.get("answer", "Pouvez-vous préciser ?")
+            deltas, finish_reason = [{"content": token} for token in re.findall(r"\S+\s*", answer)], "stop"
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        await asyncio.sleep(self.first_token_delay)
+        for delta in deltas:
+            await response.write(self._event(body, {"choices": [{"index": 0, "delta": delta, "finish_reason": None}]}))
+            await asyncio.sleep(self.token_delay)
+        await response.write(self._event(body, {"choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}]}))
+        if body.get("stream_options", {}).get("include_usage"):
+            usage = {"prompt_tokens": 400, "completion_tokens": len(deltas), "total_tokens": 400 + len(deltas)}
+            await response.write(self._event(body, {"choices": [], "usage": usage}))
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    def _tool_call_deltas(self, tool_calls: list) -> list[dict]:
+        deltas = []
+        for index, (name, arguments) in enumerate(tool_calls):
+            function = {"name": name, "arguments": json.dumps(arguments)}
+            deltas.append({"tool_calls": [{"index": index, "id": f"call_{index}", "type": "function", "function": function}]})
+        return deltas
+
+    def _event(self, body: dict, chunk: dict) -> bytes:
+        chunk = {"id": "chatcmpl-load", "object": "chat.completion.chunk", "created": 0, "model": body["model"]} | chunk
+        return f"data: {json.dumps(chunk)}\n\n".encode()
+
+
+async def recognize(request: web.Request) -> web.Response:
+    """Recognizers stub: resolves the texts with the local French parser, as the service would."""
+    texts = await request.json()
+    dates = [parse_french_date(text, date.today()) for text in texts]
+    return web.json_response([d.strftime("%Y-%m-%dT%H:%M:%S") if d else None for d in dates])
+
+
+def start_stubs(turns: dict[str, dict], token_delay: float, first_token_delay: float) -> tuple[str, str, str]:
+    """Starts the stand-ins, and returns the base URLs of the LLM, the agenda and the Recognizers."""
+    llm = ScriptedLLM(turns, token_delay, first_token_delay)
+    stub_port = free_port()
+
+    async def start_stub_server() -> None:
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", llm.chat_completions)
+        app.router.add_post("/api/recognizer/datetime", recognize)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", stub_port).start()
+
+    run_in_thread(start_stub_server)
+
+    spec = importlib.util.spec_from_file_location("agenda_app", Path(__file__).parents[1] / "agenda" / "app.py")
+    agenda = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(agenda)
+    agenda_port = free_port()
+    server = uvicorn.Server(uvicorn.Config(agenda.app, host="127.0.0.1", port=agenda_port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+
+    stub_url = f"http://127.0.0.1:{stub_port}"
+    return f"{stub_url}/v1", f"http://127.0.0.1:{agenda_port}", stub_url
+
+
+async def monitor_loop_lag(samples: list[float], interval: float = 0.01) -> None:
+    """Records by how much the loop oversleeps, which is how long callbacks waited for a busy loop."""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append((time.perf_counter() - start - interval) * 1000)
+
+
+async def run_conversation(conversation: dict, llm_config: LLMConfig, results: dict[str, list[float]]) -> None:
+    init_http_context()
+    agent = ToolCallAgent(
+        llm_config=llm_config,
+        messages=[{"role": "system", "content": SYSTEM_PROMPT}],
+        agent_tools=[get_available_time_slots, book_time_slot],
+    )
+    for turn in conversation["turns"]:
+        start = time.perf_counter()
+        first_token = None
+        stream = await agent.on_message(turn["user"], stream=True)
+        async for event in stream:
+            if first_token is None and isinstance(event, str):
+                first_token = time.perf_counter()
+            elif isinstance(event, Finish):
+                break
+        end = time.perf_counter()
+        results["turn_ms"].append((end - start) * 1000)
+        results["ttft_ms"].append(((first_token or end) - start) * 1000)
+
+
+def percentiles(samples: list[float]) -> str:
+    if len(samples) < 2:
+        return "n/a"
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return f"p50 {cuts[49]:8.1f}  p95 {cuts[94]:8.1f}  p99 {cuts[98]:8.1f}  max {max(samples):8.1f}"
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--script", type=Path, default=Path(__file__).with_name("conversations.jsonl"))
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--token-delay-ms", type=float, default=20)
+    parser.add_argument("--first-token-delay-ms", type=float, default=200)
+    parser.add_argument("--verbose", action="store_true", help="keep the INFO logs of the agent and its HTTP clients")
+    args = parser.parse_args()
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    scripts = [json.loads(line) for line in args.script.read_text().splitlines() if line.strip()]
+    turns = {turn["user"]: turn for script in scripts for turn in script["turns"]}
+    llm_url, agenda_url, recognizers_url = start_stubs(turns, args.token_delay_ms / 1000, args.first_token_delay_ms / 1000)
+    os.environ["AGENDA_BASE_URL"] = agenda_url
+    os.environ["RECOGNIZERS_BASE_URL"] = recognizers_url
+
+    llm_config = LLMConfig(model="gpt-4o-mini", api_key="load-test", base_url=llm_url)
+    # Load the tokenizer before measuring, as the app does at startup
+    await asyncio.to_thread(llm_config.token_counter, text="Bonjour")
+
+    results: dict[str, list[float]] = {"turn_ms": [], "ttft_ms": []}
+    lag_samples: list[float] = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def run_one(i: int) -> None:
+        async with semaphore:
+            await run_conversation(scripts[i % len(scripts)], llm_config, results)
+
+    monitor = asyncio.create_task(monitor_loop_lag(lag_samples))
+    start = time.perf_counter()
+    await asyncio.gather(*(run_one(i) for i in range(args.conversations)))
+    elapsed = time.perf_counter() - start
+    monitor.cancel()
+
+    turns_count = len(results["turn_ms"])
+    print(f"{args.conversations} conversations, {turns_count} turns in {elapsed:.1f} s, concurrency {args.concurrency}")
+    print(f"turns/s        {turns_count / elapsed:8.1f}")
+    print(f"turn ms        {percentiles(results['turn_ms'])}")
+    print(f"first token ms {percentiles(results['ttft_ms'])}")
+    print(f"loop lag ms    {percentiles(lag_samples)}")
+    for name, histogram in tracer.histograms().items():
+        print(
+            f"{name:<24} n {histogram.count:6}  p50 {histogram.p50_ms:8.1f}  p95 {histogram.p95_ms:8.1f}  max {histogram.max_ms:8.1f}"
+        )
+    await tracer.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
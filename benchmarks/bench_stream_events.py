@@ -0,0 +1,97 @@
+"""Compares the CPU cost per streamed token of the JSON lines stream and of the typed event stream.
+
+The model stream is replayed from prebuilt chunks, so that only the agent and consumer side is measured.
+
+Usage: python benchmarks/bench_stream_events.py [--tokens 20000] [--rounds 5]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections.abc import AsyncIterator
+
+from litellm.types.utils import Delta, ModelResponse, StreamingChoices
+from litellm.utils import CustomStreamWrapper
+
+from lisa.agents import base_agent
+from lisa.agents.tool_call_agent import ToolCallAgent
+from lisa.models.llm_config import LLMConfig
+
+
+class ReplayedStream(CustomStreamWrapper):
+    """A model stream replaying prebuilt chunks."""
+
+    def __init__(self, chunks: list[ModelResponse]) -> None:
+        self.chunks = chunks
+
+    async def _replay(self) -> AsyncIterator[ModelResponse]:
+        for chunk in self.chunks:
+            yield chunk
+
+    def __aiter__(self) -> AsyncIterator[ModelResponse]:
+        return self._replay()
+
+
+def build_chunks(tokens: int) -> list[ModelResponse]:
+    words = ["Je ", "peux ", "vous ", "proposer ", "un ", "créneau ", "mardi ", "à ", "14h30. "]
+    chunks = [
+        ModelResponse(stream=True, choices=[StreamingChoices(delta=Delta(content=words[i % len(words)]))]) for i in range(tokens)
+    ]
+    chunks.append(ModelResponse(stream=True, choices=[StreamingChoices(delta=Delta(), finish_reason="stop")]))
+    return chunks
+
+
+async def consume_json_lines(agent: ToolCallAgent) -> int:
+    """The consumer as it was before the typed events: every token is encoded then decoded."""
+    tokens = 0
+    async for line in agent.call_llm():
+        if json.loads(line)["message"]:
+            tokens += 1
+    return tokens
+
+
+async def consume_events(agent: ToolCallAgent) -> int:
+    tokens = 0
+    async for event in agent.stream_events():
+        if isinstance(event, str):
+            tokens += 1
+    return tokens
+
+
+async def measure(consume, agent: ToolCallAgent, rounds: int) -> float:
+    """Returns the best tokens per CPU second over the rounds."""
+    best = 0.0
+    for _ in range(rounds):
+        start = time.process_time()
+        tokens = await consume(agent)
+        best = max(best, tokens / (time.process_time() - start))
+    return best
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=20_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    chunks = build_chunks(args.tokens)
+
+    async def replay_completion(**kwargs) -> CustomStreamWrapper:
+        return ReplayedStream(chunks)
+
+    # Replace the provider call made by the agents
+    base_agent.acompletion = replay_completion
+    llm_config = LLMConfig(model="gpt-4o-mini", api_key="benchmark", keep_alive=False)
+    agent = ToolCallAgent(llm_config=llm_config, messages=[], agent_tools=[])
+    json_lines = await measure(consume_json_lines, agent, args.rounds)
+    events = await measure(consume_events, agent, args.rounds)
+
+    print(f"{'stream':<12} {'tokens/s per core':>18}")
+    print(f"{'json lines':<12} {json_lines:>18,.0f}")
+    print(f"{'events':<12} {events:>18,.0f}")
+    print(f"speed-up: x{events / json_lines:.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+"""Compares the session startup and tool dispatch costs with and without the process-wide tool registry.
+
+Usage: python benchmarks/bench_tool_registry.py [--sessions 200] [--calls 20000]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from litellm.types.utils import ChatCompletionMessageToolCall, Function
+
+from lisa.agent_tools.appointment.schedulers import get_available_time_slots
+from lisa.utils.function_calling import convert_to_openai_tool, encode_tool_result, tool_registry
+
+
+async def book_time_slot(date_string: str, time_slot: str, duration: int = 30) -> str:
+    """Book a time slot.
+
+    Args:
+        date_string (str): The day of the appointment.
+        time_slot (str): The start of the appointment, such as '14:30'.
+        duration (int): The duration of the appointment, in minutes.
+    """
+    return f"{date_string} {time_slot}"
+
+
+TOOLS = [get_available_time_slots, book_time_slot]
+
+
+async def execute_without_registry(tool_call: ChatCompletionMessageToolCall, tool_dict: dict) -> str:
+    """The dispatch as it was before the registry: bare JSON parsing and keyword arguments."""
+    tool_args = json.loads(tool_call.function.arguments) if tool_call.function.arguments else {}
+    return encode_tool_result(await tool_dict[tool_call.function.name](**tool_args))
+
+
+async def execute_with_registry(tool_call: ChatCompletionMessageToolCall, tool_dict: dict) -> str:
+    tool = tool_registry.get(tool_dict[tool_call.function.name])
+    return encode_tool_result(await tool.function(**tool.parse_arguments(tool_call.function.arguments)))
+
+
+async def measure_dispatch(execute, calls: int) -> float:
+    tool_dict = {f.__name__: f for f in TOOLS}
+    tool_call = ChatCompletionMessageToolCall(
+        id="call_1", function=Function(name="book_time_slot", arguments='{"date_string": "lundi 3 mars", "time_slot": "14:30"}')
+    )
+    start = time.perf_counter()
+    for _ in range(calls):
+        await execute(tool_call, tool_dict)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--calls", type=int, default=20_000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    for _ in range(args.sessions):
+        [convert_to_openai_tool(f) for f in TOOLS]
+    uncached_ms = (time.perf_counter() - start) / args.sessions * 1000
+
+    start = time.perf_counter()
+    for _ in range(args.sessions):
+        # The first session builds the tools, the next ones share them
+        [tool_registry.get(f).schema for f in TOOLS]
+    registry_ms = (time.perf_counter() - start) / args.sessions * 1000
+
+    json_us = asyncio.run(measure_dispatch(execute_without_registry, args.calls))
+    registry_us = asyncio.run(measure_dispatch(execute_with_registry, args.calls))
+
+    print(f"{'':<28} {'without registry':>17} {'with registry':>14}")
+    print(f"{'session tool setup (ms)':<28} {uncached_ms:>17.3f} {registry_ms:>14.3f}")
+    print(f"{'tool dispatch (µs per call)':<28} {json_us:>17.2f} {registry_us:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import os
+from datetime import date, datetime
+
+from lisa.agent_tools.appointment.time_slot_fetcher import TimeSlotFetcher, TimeSlots
+from lisa.utils.async_ttl_cache import AsyncTTLCache
+from lisa.utils.metrics import metrics
+
+availability_cache: AsyncTTLCache[tuple[date, int], list[TimeSlots]] = AsyncTTLCache(
+    ttl=float(os.environ.get("AVAILABILITY_CACHE_TTL", "30")),
+    max_size=int(os.environ.get("AVAILABILITY_CACHE_MAX_SIZE", "1024")),
+)
+metrics.register("availability_cache", availability_cache.stats)
+
+
+class CachedTimeSlotFetcher(TimeSlotFetcher):
+    """Serves the available time slots from the process-wide availability cache, keyed by requested date."""
+
+    async def fetch(self, date: datetime) -> TimeSlots:
+        return (await self.fetch_candidates(date, count=1))[0]
+
+    async def fetch_candidates(self, date: datetime, count: int = 1) -> list[TimeSlots]:
+        load = super().fetch_candidates
+        return await availability_cache.get_or_load((date.date(), count), lambda: load(date, count))
+
+
+def invalidate_availability(day: date | datetime | None = None) -> int:
+    """Drops the cached availability that covers the given day, or everything if no day is given.
+
+    To be called whenever a booking is made or cancelled, so that the cache does not offer a stale slot.
+    """
+    if day is None:
+        return availability_cache.invalidate()
+    if isinstance(day, datetime):
+        day = day.date()
+    # An entry covers every day from the requested date up to its last available day
+    return availability_cache.invalidate(lambda key, candidates: key[0] <= day <= candidates[-1].date.date())
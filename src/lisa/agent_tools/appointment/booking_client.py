@@ -0,0 +1,37 @@
+import logging
+import os
+from datetime import date
+
+from lisa.agent_tools.appointment.availability_cache import invalidate_availability
+from lisa.utils.http_client_pool import http_client_pool
+from lisa.utils.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+class SlotUnavailableError(Exception):
+    pass
+
+
+async def book_slot(day: date, time_slot: str, duration_minutes: int = 15) -> dict:
+    """Books a slot in the agenda, which checks and reserves it atomically.
+
+    Raises `SlotUnavailableError` when the slot is taken or not open. Either way the cached availability of the day
+    is dropped, as it no longer matches the agenda.
+    """
+    url = f"{os.environ['AGENDA_BASE_URL']}/booking/bookings"
+    payload = {"date": day.strftime("%Y-%m-%d"), "time": time_slot, "duration_minutes": duration_minutes}
+    session = http_client_pool.session("agenda")
+    try:
+        with tracer.span("agenda.http", method="POST", path="/booking/bookings") as span:
+            async with session.post(url, json=payload) as response:
+                span.set_attributes(status=response.status)
+                if response.status == 409:
+                    raise SlotUnavailableError((await response.json()).get("detail", "The slot is not available."))
+                if response.status != 201:
+                    error_message = f"Error while calling API: {await response.text()}"
+                    logger.error(error_message)
+                    raise EnvironmentError(error_message)
+                return await response.json()
+    finally:
+        invalidate_availability(day)
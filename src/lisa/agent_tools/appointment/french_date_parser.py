@@ -0,0 +1,128 @@
+import re
+import unicodedata
+from datetime import date, datetime, timedelta
+
+WEEKDAYS = {"lundi": 0, "mardi": 1, "mercredi": 2, "jeudi": 3, "vendredi": 4, "samedi": 5, "dimanche": 6}
+MONTHS = {
+    "janvier": 1,
+    "fevrier": 2,
+    "mars": 3,
+    "avril": 4,
+    "mai": 5,
+    "juin": 6,
+    "juillet": 7,
+    "aout": 8,
+    "septembre": 9,
+    "octobre": 10,
+    "novembre": 11,
+    "decembre": 12,
+}
+NUMBERS = {"un": 1, "une": 1, "deux": 2, "trois": 3, "quatre": 4, "cinq": 5, "six": 6, "sept": 7, "huit": 8, "neuf": 9, "dix": 10}
+RELATIVE_DAYS = {"aujourd'hui": 0, "ce jour": 0, "demain": 1, "apres demain": 2}
+
+_WEEKDAY = "|".join(WEEKDAYS)
+_MONTH = "|".join(MONTHS)
+_NUMBER = "|".join(NUMBERS)
+
+_PREFIX_PATTERN = re.compile(r"^(?:pour|le|des|a partir d[eu]|a compter d[eu])\s+")
+_TIME_PATTERN = re.compile(
+    r"\s+(?:(?:a|vers|pour)\s+)?(?:(?P<hour>\d{1,2})\s*(?:h|heures?|:)\s*(?P<minute>\d{2})?|(?P<noon>midi))$"
+)
+_IN_DAYS_PATTERN = re.compile(rf"^dans\s+(?P<count>\d{{1,2}}|{_NUMBER})\s+(?P<unit>jours?|semaines?)$")
+_WEEKDAY_PATTERN = re.compile(rf"^(?P<this>ce\s+)?(?P<weekday>{_WEEKDAY})(?:\s+(?P<next>prochain))?$")
+_DAY_MONTH_PATTERN = re.compile(
+    rf"^(?:(?P<weekday>{_WEEKDAY})\s+)?(?P<day>\d{{1,2}}|1er|premier)\s+(?P<month>{_MONTH})(?:\s+(?P<year>\d{{4}}))?$"
+)
+_NUMERIC_PATTERN = re.compile(r"^(?P<day>\d{1,2})[/.-](?P<month>\d{1,2})(?:[/.-](?P<year>\d{4}|\d{2}))?$")
+_ISO_PATTERN = re.compile(r"^(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})(?:t(?P<hour>\d{2}):(?P<minute>\d{2})(?::\d{2})?)?$")
+
+
+def normalize_date_phrase(text: str) -> str:
+    """Lowercases the phrase, removes accents and punctuation, and collapses whitespaces."""
+    text = unicodedata.normalize("NFKD", text.lower().replace("’", "'"))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"(?<=[a-z])-(?=[a-z])", " ", text)
+    text = re.sub(r"[,;!?«»\"]|\.(?=\s|$)", " ", text)
+    return " ".join(text.split())
+
+
+def parse_french_date(text: str, today: date | None = None) -> datetime | None:
+    """Resolves common French date phrases relative to `today`, such as 'demain', 'lundi prochain', 'le 12 mars à 14h'
+    or ISO dates.
+
+    Returns None when the whole phrase is not understood, so that it can be sent to a full-featured recognizer instead.
+    """
+    today = today or date.today()
+    phrase = normalize_date_phrase(text)
+
+    iso_match = _ISO_PATTERN.match(phrase)
+    if iso_match:
+        day = _make_date(iso_match["year"], iso_match["month"], iso_match["day"])
+        return _combine(day, iso_match["hour"] or 0, iso_match["minute"] or 0)
+
+    while prefix_match := _PREFIX_PATTERN.match(phrase):
+        phrase = phrase[prefix_match.end() :]
+
+    hour, minute = 0, 0
+    time_match = _TIME_PATTERN.search(phrase)
+    if time_match:
+        phrase = phrase[: time_match.start()]
+        hour = 12 if time_match["noon"] else time_match["hour"]
+        minute = time_match["minute"] or 0
+
+    return _combine(_resolve_day(phrase, today), hour, minute)
+
+
+def _resolve_day(phrase: str, today: date) -> date | None:
+    if phrase in RELATIVE_DAYS:
+        return today + timedelta(days=RELATIVE_DAYS[phrase])
+
+    if match := _IN_DAYS_PATTERN.match(phrase):
+        count = NUMBERS.get(match["count"]) or int(match["count"])
+        return today + timedelta(days=count * (7 if match["unit"].startswith("semaine") else 1))
+
+    if match := _WEEKDAY_PATTERN.match(phrase):
+        delta = (WEEKDAYS[match["weekday"]] - today.weekday()) % 7
+        if delta == 0 and not match["this"]:
+            # A bare or 'prochain' weekday naming today refers to next week
+            delta = 7
+        return today + timedelta(days=delta)
+
+    if match := _DAY_MONTH_PATTERN.match(phrase):
+        day_of_month = "1" if match["day"] in ("1er", "premier") else match["day"]
+        day = _infer_year(day_of_month, MONTHS[match["month"]], match["year"], today)
+        if day and match["weekday"] and WEEKDAYS[match["weekday"]] != day.weekday():
+            # The weekday contradicts the date, leave it to the full recognizer
+            return None
+        return day
+
+    if match := _NUMERIC_PATTERN.match(phrase):
+        year = match["year"]
+        if year and len(year) == 2:
+            year = f"20{year}"
+        return _infer_year(match["day"], match["month"], year, today)
+
+    return None
+
+
+def _infer_year(day: str | int, month: str | int, year: str | None, today: date) -> date | None:
+    if year:
+        return _make_date(year, month, day)
+    # Without a year, a date already passed this year refers to next year
+    resolved = _make_date(today.year, month, day)
+    if resolved and resolved < today:
+        resolved = _make_date(today.year + 1, month, day)
+    return resolved
+
+
+def _make_date(year: str | int, month: str | int, day: str | int) -> date | None:
+    try:
+        return date(int(year), int(month), int(day))
+    except ValueError:
+        return None
+
+
+def _combine(day: date | None, hour: str | int, minute: str | int) -> datetime | None:
+    if day is None or not (0 <= int(hour) <= 23 and 0 <= int(minute) <= 59):
+        return None
+    return datetime(day.year, day.month, day.day, int(hour), int(minute))
@@ -1,22 +1,74 @@
 import os
-from datetime import datetime
+from datetime import date, datetime
 
-import aiohttp
+from lisa.agent_tools.appointment.french_date_parser import normalize_date_phrase, parse_french_date
+from lisa.models.recognizer_stats import RecognizerStats
+from lisa.utils.async_ttl_cache import AsyncTTLCache
+from lisa.utils.http_client_pool import http_client_pool
+from lisa.utils.metrics import metrics
+from lisa.utils.micro_batcher import MicroBatcher
+from lisa.utils.tracing import tracer
 
+recognizer_stats = RecognizerStats()
+recognizer_cache: AsyncTTLCache[tuple[str, str, date], datetime | None] = AsyncTTLCache(
+    ttl=float(os.environ.get("RECOGNIZER_CACHE_TTL", "3600")),
+    max_size=int(os.environ.get("RECOGNIZER_CACHE_MAX_SIZE", "4096")),
+)
+metrics.register("date_recognizer", lambda: recognizer_stats)
+metrics.register("date_recognizer_cache", recognizer_cache.stats)
 
-async def recognize_date_time(text: str, culture="fr-fr") -> datetime:
+
+async def recognize_date_time(text: str, culture="fr-fr", speculative: bool = False) -> datetime:
+    """Recognizes the date of a phrase. `speculative` lookups, of whole user messages, are counted apart."""
+    # Relative phrases such as 'demain' resolve differently from one day to the next
+    today = date.today()
+    key = (normalize_date_phrase(text), culture, today)
+    try:
+        return await recognizer_cache.get_or_load(key, lambda: _recognize_date_time(text, culture, today, speculative))
+    except OSError as e:
+        # A failed recognition is not cached, the phrase is recognized again once the service is back
+        print(e)
+        return None
+
+
+async def _recognize_date_time(text: str, culture: str, today: date, speculative: bool = False) -> datetime:
+    if speculative:
+        recognizer_stats.speculative += 1
+    if culture.lower().startswith("fr"):
+        recognized_date = parse_french_date(text, today)
+        if recognized_date:
+            if not speculative:
+                recognizer_stats.fast_path += 1
+            return recognized_date
+    if speculative:
+        recognizer_stats.speculative_remote += 1
+    else:
+        recognizer_stats.remote += 1
+    return await recognizer_batcher.submit(culture, text)
+
+
+async def _recognize_date_times_remotely(culture: str, texts: list[str]) -> list[datetime | None]:
     url = f"{os.environ["RECOGNIZERS_BASE_URL"]}/api/recognizer/datetime"
     headers = {"Content-Type": "application/json"}
-    payload = [text]
-    async with aiohttp.ClientSession() as session:
+    payload = texts
+    session = http_client_pool.session("recognizers")
+    # The batch runs within the span of its first request
+    with tracer.span("recognizer.http", culture=culture, batch_size=len(texts)) as span:
         async with session.post(url, params={"culture": culture}, json=payload, headers=headers) as response:
+            span.set_attributes(status=response.status)
             if response.status == 200:
                 recognized_dates = await response.json()
-                if recognized_dates[0]:
-                    date_format = "%Y-%m-%dT%H:%M:%S"
-                    return datetime.strptime(recognized_dates[0], date_format)
-                else:
-                    return None
+                date_format = "%Y-%m-%dT%H:%M:%S"
+                return [datetime.strptime(d, date_format) if d else None for d in recognized_dates]
             else:
                 error_text = await response.text()
-                print(f"Request failed with status {response.status}: {error_text}")
+                raise OSError(f"Request failed with status {response.status}: {error_text}")
+
+
+# Concurrent remote recognitions for the same culture are sent together, as the API accepts a list of texts
+recognizer_batcher = MicroBatcher(
+    _recognize_date_times_remotely,
+    window=float(os.environ.get("RECOGNIZERS_BATCH_WINDOW_MS", "5")) / 1000,
+    max_batch_size=int(os.environ.get("RECOGNIZERS_BATCH_MAX_SIZE", "32")),
+)
+metrics.register("date_recognizer_batches", recognizer_batcher.stats)
@@ -1,25 +1,85 @@
+import os
+import re
 import sys
+from datetime import date, datetime, time
 
+from lisa.agent_tools.appointment.availability_cache import CachedTimeSlotFetcher
+from lisa.agent_tools.appointment.booking_client import SlotUnavailableError, book_slot
 from lisa.agent_tools.appointment.recognizers import recognize_date_time
-from lisa.agent_tools.appointment.time_slot_fetcher import TimeSlotFetcher
+from lisa.agent_tools.appointment.time_slot_fetcher import FetchMode, TimeSlots
+from lisa.utils.function_calling import tool_result_formatter
+from lisa.utils.speculation import ToolSpeculator, speculative
 
 
-async def get_available_time_slots(date_string: str) -> str:
+def format_time_slots(candidates: list[TimeSlots]) -> str:
+    """Encodes the available time slots as one line per day, the shortest form the LLM reads reliably."""
+    return "\n".join(f"{_format_day(slots.date)}: {' '.join(slots.slots)}" for slots in candidates)
+
+
+@tool_result_formatter(format_time_slots)
+async def get_available_time_slots(date_string: str) -> list[TimeSlots] | str:
     """Retrieve available date and time slots for appointment booking.
 
     Args:
         date_string (str): Date string for appointment booking. You can use:\n- Specific date (preferred)\n- Relative terms (e.g., 'tomorrow', 'next monday')
 
     Returns:
-        str: _description_
+        list[TimeSlots] | str: The available time slots of the first days with availabilities, or an error message
+    """
+    date = await recognize_date_time(date_string)
+    if not date:
+        return f"Impossible de reconnaître la date '{date_string}'"
+    return await speculative("get_available_time_slots", date.date(), _load_time_slots)
+
+
+async def book_time_slot(date_string: str, time_slot: str) -> str:
+    """Book an appointment on one of the available time slots, once the user has chosen it.
+
+    Args:
+        date_string (str): Date of the appointment, as given to get_available_time_slots
+        time_slot (str): The chosen time slot, as HH:MM (e.g. '14:30')
+
+    Returns:
+        str: The confirmation of the booking, or the reason it could not be made
     """
     date = await recognize_date_time(date_string)
     if not date:
         return f"Impossible de reconnaître la date '{date_string}'"
-    fetcher = TimeSlotFetcher()
-    slots = await fetcher.fetch(date)
+    try:
+        await book_slot(date.date(), time_slot)
+    except SlotUnavailableError:
+        return f"Le créneau du {_format_day(date)} à {time_slot} n'est plus disponible"
+    return f"Rendez-vous réservé le {_format_day(date)} à {time_slot}"
+
+
+async def _requested_day(text: str) -> date | None:
+    recognized = await recognize_date_time(text, speculative=True)
+    return recognized.date() if recognized else None
+
+
+async def _load_time_slots(day: date) -> list[TimeSlots]:
+    # The agenda is queried by day, so that the time of the recognized date does not change the result
+    fetcher = CachedTimeSlotFetcher(mode=os.environ.get("AGENDA_FETCH_MODE", FetchMode.RANGED))
+    return await fetcher.fetch_candidates(datetime.combine(day, time()), count=int(os.environ.get("AGENDA_CANDIDATE_DAYS", "1")))
+
+
+# Recognizes the day asked in the user message and loads its availability while the LLM decides to call the tool
+time_slots_speculator = ToolSpeculator(resolve=_requested_day, load=_load_time_slots)
+
+
+def summarize_available_time_slots(content: str) -> str:
+    """Summarizes a result of `get_available_time_slots` once its turn is over, for the history sent to the LLM.
+
+    Only the number of slots of each day is kept: the slots offered to the user remain in the answer of that turn, and
+    listing the others again takes a new call to the tool, so that the LLM never offers a slot it was not given.
+    """
+    days = [re.match(r"^(.+?): (.+)$", line) for line in content.splitlines()]
+    if not days or not all(days):
+        return content
+    return "\n".join(f"{day[1]}: {len(day[2].split())} créneaux déjà consultés" for day in days)
+
+
+def _format_day(date) -> str:
     if sys.platform.startswith("win"):
-        date_str = slots.date.strftime("%A %#d %B")
-    else:
-        date_str = slots.date.strftime("%A %-d %B")
-    return f"Les créneaux disponibles du {date_str}: {str(slots.slots)}"
+        return date.strftime("%A %#d %B")
+    return date.strftime("%A %-d %B")
@@ -1,12 +1,17 @@
+import asyncio
 import logging
 import os
 import random
 from dataclasses import dataclass
 from datetime import datetime, timedelta
+from enum import StrEnum
 from typing import List
 
 import aiohttp
 
+from lisa.utils.http_client_pool import http_client_pool
+from lisa.utils.tracing import tracer
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -23,54 +28,134 @@ class NoAvailableTimeSlotsError(Exception):
     pass
 
 
+class FetchMode(StrEnum):
+    SEQUENTIAL = "sequential"
+    """Probe one day per request, moving to the next day until slots are found"""
+    RANGED = "ranged"
+    """Fetch the whole probing window in a single ranged request"""
+    CONCURRENT = "concurrent"
+    """Probe every day of the window with parallel single-day requests"""
+    NEXT_AVAILABLE = "next_available"
+    """Ask the agenda for the first available days of the window in a single request"""
+
+
 class TimeSlotFetcher:
-    def __init__(self):
-        pass  # No instance attributes
+    def __init__(self, mode: FetchMode = FetchMode.SEQUENTIAL, max_attempts: int = 5):
+        self.mode = FetchMode(mode)
+        self.max_attempts = max_attempts
 
     async def fetch(self, date: datetime) -> TimeSlots:
-        max_attempts = 5
+        if self.mode is not FetchMode.SEQUENTIAL:
+            return (await self.fetch_candidates(date, count=1))[0]
+
+        max_attempts = self.max_attempts
         attempts = 0
 
         while attempts < max_attempts:
             attempts += 1
-            end_date = date + timedelta(days=1)
-            url = f"{os.environ['AGENDA_BASE_URL']}/booking/available-slots"
-            params = {
-                "start": date.strftime("%Y-%m-%d"),
-                "end": end_date.strftime("%Y-%m-%d"),
-            }
             logger.info(f"Attempt {attempts}: Fetching available slots for date {date.strftime('%Y-%m-%d')}")
-            try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(url, params=params) as response:
-                        if response.status != 200:
-                            text = await response.text()
-                            error_message = f"Error while calling API: {text}"
-                            logger.error(error_message)
-                            raise EnvironmentError(error_message)
-
-                        json_response = await response.json()
-                        result = json_response.get("data", [])
-                        if not result:
-                            # No available slots, increment the date and try again
-                            logger.info(f"No available slots found for date {date.strftime('%Y-%m-%d')}. Trying next day.")
-                            date += timedelta(days=1)
-                        else:
-                            available_date = datetime.strptime(result[0]["date"], "%Y-%m-%d")
-                            slots = result[0].get("availableSlots", [])
-                            logger.info(f"Found available slots for date {available_date.strftime('%Y-%m-%d')}")
-                            return TimeSlots(date=available_date, slots=slots)
-            except aiohttp.ClientError as e:
-                # Handle HTTP client exceptions (e.g., network errors)
-                logger.error(f"HTTP request failed: {e}")
-                raise e
-            except Exception as e:
-                # Handle any other exceptions that should not be retried
-                logger.error(f"An unexpected error occurred: {e}")
-                raise e
+            result = await self._fetch_range(date, date + timedelta(days=1))
+            if not result:
+                # No available slots, increment the date and try again
+                logger.info(f"No available slots found for date {date.strftime('%Y-%m-%d')}. Trying next day.")
+                date += timedelta(days=1)
+            else:
+                logger.info(f"Found available slots for date {result[0].date.strftime('%Y-%m-%d')}")
+                return result[0]
 
         # If we reach this point, no slots were found after max_attempts
         error_message = f"No available slots found in {max_attempts} attempts starting from date {date.strftime('%Y-%m-%d')}."
 
         logger.error(error_message)
         raise NoAvailableTimeSlotsError(error_message)
+
+    async def fetch_candidates(self, date: datetime, count: int = 1) -> list[TimeSlots]:
+        """Returns up to `count` earliest days with available slots within the probing window, starting from `date`."""
+        if self.mode is FetchMode.RANGED:
+            logger.info(f"Fetching available slots for {self.max_attempts} days from date {date.strftime('%Y-%m-%d')}")
+            candidates = (await self._fetch_range(date, date + timedelta(days=self.max_attempts)))[:count]
+        elif self.mode is FetchMode.CONCURRENT:
+            candidates = await self._probe_concurrently(date, count)
+        elif self.mode is FetchMode.NEXT_AVAILABLE:
+            logger.info(
+                f"Fetching the first {count} available days within {self.max_attempts} days from date {date.strftime('%Y-%m-%d')}"
+            )
+            params = {"start": date.strftime("%Y-%m-%d"), "count": count, "horizon": self.max_attempts}
+            candidates = await self._get_time_slots("/booking/next-available", params)
+        else:
+            candidates = []
+            day = date
+            for _ in range(self.max_attempts):
+                candidates += await self._fetch_range(day, day + timedelta(days=1))
+                if len(candidates) >= count:
+                    break
+                day += timedelta(days=1)
+
+        if not candidates:
+            error_message = (
+                f"No available slots found in {self.max_attempts} days starting from date {date.strftime('%Y-%m-%d')}."
+            )
+            logger.error(error_message)
+            raise NoAvailableTimeSlotsError(error_message)
+        logger.info(f"Found available slots for dates {', '.join(c.date.strftime('%Y-%m-%d') for c in candidates)}")
+        return candidates
+
+    async def _probe_concurrently(self, date: datetime, count: int) -> list[TimeSlots]:
+        days = [date + timedelta(days=i) for i in range(self.max_attempts)]
+        logger.info(f"Probing {len(days)} days concurrently from date {date.strftime('%Y-%m-%d')}")
+        tasks = [asyncio.create_task(self._fetch_range(day, day + timedelta(days=1))) for day in days]
+        results: list[list[TimeSlots] | None] = [None] * len(tasks)
+        pending = set(tasks)
+        candidates = []
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    results[tasks.index(task)] = task.result()
+                # The earliest days are known once every day before them has answered
+                candidates = []
+                for result in results:
+                    if result is None:
+                        break
+                    candidates += result
+                    if len(candidates) >= count:
+                        return candidates[:count]
+            return candidates
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _fetch_range(self, start: datetime, end: datetime) -> list[TimeSlots]:
+        params = {
+            "start": start.strftime("%Y-%m-%d"),
+            "end": end.strftime("%Y-%m-%d"),
+        }
+        return await self._get_time_slots("/booking/available-slots", params)
+
+    async def _get_time_slots(self, path: str, params: dict) -> list[TimeSlots]:
+        url = f"{os.environ['AGENDA_BASE_URL']}{path}"
+        try:
+            session = http_client_pool.session("agenda")
+            with tracer.span("agenda.http", method="GET", path=path) as span:
+                async with session.get(url, params=params) as response:
+                    span.set_attributes(status=response.status)
+                    if response.status != 200:
+                        text = await response.text()
+                        error_message = f"Error while calling API: {text}"
+                        logger.error(error_message)
+                        raise EnvironmentError(error_message)
+
+                    json_response = await response.json()
+                    return [
+                        TimeSlots(date=datetime.strptime(day["date"], "%Y-%m-%d"), slots=day.get("availableSlots", []))
+                        for day in json_response.get("data", [])
+                        if day.get("availableSlots")
+                    ]
+        except aiohttp.ClientError as e:
+            # Handle HTTP client exceptions (e.g., network errors)
+            logger.error(f"HTTP request failed: {e}")
+            raise e
+        except Exception as e:
+            # Handle any other exceptions that should not be retried
+            logger.error(f"An unexpected error occurred: {e}")
+            raise e
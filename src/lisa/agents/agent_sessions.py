@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import time
+import weakref
+from collections import OrderedDict
+from collections.abc import Callable
+
+from lisa.agents.tool_call_agent import ToolCallAgent
+from lisa.models.session_state import SessionState
+from lisa.models.session_store_stats import SessionStoreStats
+from lisa.utils.session_store import WriteBehindBuffer
+
+logger = logging.getLogger(__name__)
+
+
+class AgentSessions:
+    """The agents of the live sessions of this worker, backed by a session store shared with the other workers.
+
+    The state of an agent is saved after each turn, through the write-behind buffer. An agent missing from memory,
+    because it was evicted, the worker restarted or the session moved to another worker, is rebuilt from the store on
+    its next message. Agents idle for `max_idle` seconds, and the least recently used beyond `max_live`, are evicted
+    once their state is saved, so that the memory of a worker stays bounded.
+
+    Each saved state carries a version, the number of saves of the session. With a store shared by several workers,
+    a live agent is rebuilt from the store when another worker saved a newer state of its session meanwhile, so that a
+    stale agent does not overwrite it. Two turns of a session running at once on two workers are not reconciled: the
+    last one saved wins.
+    """
+
+    def __init__(
+        self,
+        buffer: WriteBehindBuffer,
+        agent_factory: Callable[[SessionState], ToolCallAgent],
+        max_idle: float = 900,
+        max_live: int = 1000,
+    ) -> None:
+        self.buffer = buffer
+        self.agent_factory = agent_factory
+        self.max_idle = max_idle
+        self.max_live = max_live
+        self._stats = buffer.stats
+        self._agents: OrderedDict[str, tuple[ToolCallAgent, float]] = OrderedDict()
+        # The history length of each agent when last saved, so that an unchanged agent is not written again
+        self._saved_lengths: dict[str, int] = {}
+        self._loading: dict[str, asyncio.Future] = {}
+        # The version of the last state saved or loaded of each agent, kept with the agent even once evicted
+        self._versions: weakref.WeakKeyDictionary[ToolCallAgent, int] = weakref.WeakKeyDictionary()
+
+    def put(self, session_id: str, agent: ToolCallAgent) -> None:
+        self._agents[session_id] = (agent, time.monotonic())
+        self._agents.move_to_end(session_id)
+        self.save(session_id)
+        self._evict_beyond_max_live()
+
+    async def get(self, session_id: str) -> ToolCallAgent | None:
+        entry = self._agents.get(session_id)
+        if entry is not None and self.buffer.store.shared:
+            version = await self.buffer.version(session_id)
+            if version is not None and version > self._versions.get(entry[0], 0):
+                self._stats.stale_reloads += 1
+                self._agents.pop(session_id, None)
+                self._saved_lengths.pop(session_id, None)
+            entry = self._agents.get(session_id)
+        if entry is not None:
+            self._agents[session_id] = (entry[0], time.monotonic())
+            self._agents.move_to_end(session_id)
+            return entry[0]
+
+        # Concurrent messages of an evicted session share one rehydration
+        loading = self._loading.get(session_id)
+        if loading is not None:
+            return await asyncio.shield(loading)
+        future = asyncio.get_running_loop().create_future()
+        self._loading[session_id] = future
+        try:
+            state = await self.buffer.load(session_id)
+            agent = self.agent_factory(state) if state is not None else None
+            if agent is not None:
+                self._stats.rehydrations += 1
+                self._versions[agent] = state.version
+                self._agents[session_id] = (agent, time.monotonic())
+                self._saved_lengths[session_id] = len(agent.messages)
+                self._evict_beyond_max_live()
+            future.set_result(agent)
+            return agent
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            del self._loading[session_id]
+
+    async def exists(self, session_id: str) -> bool:
+        return session_id in self._agents or await self.buffer.exists(session_id)
+
+    def save(self, session_id: str, agent: ToolCallAgent | None = None) -> None:
+        """Hands the current state of the agent to the write-behind buffer, to be written with the next batch.
+
+        The caller of a turn passes the agent it holds, as the agent may have been evicted while the turn was running.
+        """
+        entry = self._agents.get(session_id)
+        if agent is None:
+            if entry is None:
+                return
+            agent = entry[0]
+        version = self._versions.get(agent, 0) + 1
+        self._versions[agent] = version
+        state = SessionState(messages=list(agent.messages), agent_usage=agent.agent_usage.model_copy(deep=True), version=version)
+        self.buffer.save(session_id, state)
+        if entry is not None and entry[0] is agent:
+            self._saved_lengths[session_id] = len(agent.messages)
+
+    def evict_idle(self) -> int:
+        """Evicts the agents idle for longer than `max_idle`, and returns how many were evicted."""
+        expiry = time.monotonic() - self.max_idle
+        idle = [session_id for session_id, (_, last_used) in self._agents.items() if last_used <= expiry]
+        for session_id in idle:
+            self._evict(session_id)
+        return len(idle)
+
+    def _evict_beyond_max_live(self) -> None:
+        while len(self._agents) > self.max_live:
+            self._evict(next(iter(self._agents)))
+
+    def _evict(self, session_id: str) -> None:
+        # The last state of the agent stays in the buffer until written, and is read back from there if needed
+        if self._saved_lengths.pop(session_id, None) != len(self._agents[session_id][0].messages):
+            self.save(session_id)
+            self._saved_lengths.pop(session_id, None)
+        del self._agents[session_id]
+        self._stats.evictions += 1
+
+    def stats(self) -> SessionStoreStats:
+        return self._stats.model_copy(update={"live_sessions": len(self._agents), "pending_writes": self.buffer.pending_writes})
+
+    async def run_eviction(self, interval: float = 60) -> None:
+        """Evicts the idle agents and purges the expired states every `interval` seconds, until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            self.evict_idle()
+            try:
+                await self.buffer.purge_expired()
+            except Exception as e:
+                logger.error(f"Could not delete the expired sessions from the store: {e!r}")
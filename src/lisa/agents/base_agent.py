@@ -1,18 +1,52 @@
+import asyncio
+import logging
 import time
 from datetime import datetime, timezone
+from uuid import uuid4
 
 from litellm import acompletion, completion_cost
 from litellm.utils import CustomStreamWrapper, ModelResponse
 
+from lisa.agents.history_compactor import HistoryCompactor
 from lisa.exceptions.token_limit_error import TokenLimitError
 from lisa.models.base_agent_usage import BaseAgentUsage
+from lisa.models.hedging_policy import HedgingPolicy
 from lisa.models.llm_config import LLMConfig
+from lisa.utils.llm_client_pool import llm_client_pool
+from lisa.utils.llm_scheduler import LLMScheduler, llm_scheduler
+from lisa.utils.message_token_cache import MessageTokenCache
+from lisa.utils.metered_stream import MeteredStream, PrefetchedStream
+from lisa.utils.tracing import Span, tracer
+
+logger = logging.getLogger(__name__)
+
+# The fields of the LLM call records set on the spans of the calls
+_LLM_SPAN_ATTRIBUTES = (
+    "queue_wait",
+    "time_to_first_token",
+    "stream_duration",
+    "tokens_prompt",
+    "tokens_completion",
+    "tokens_cached",
+)
 
 
 class BaseAgent:
-    def __init__(self, llm_config: LLMConfig) -> None:
+    def __init__(
+        self,
+        llm_config: LLMConfig,
+        compactor: HistoryCompactor | None = None,
+        hedging_policy: HedgingPolicy | None = None,
+        scheduler: LLMScheduler = llm_scheduler,
+    ) -> None:
         self.llm_config = llm_config
+        self.compactor = compactor
+        self.hedging_policy = hedging_policy
+        self.scheduler = scheduler
+        # Identifies the agent session to the scheduler, which serves the waiting sessions in turn
+        self.session_id = uuid4().hex
         self.agent_usage = BaseAgentUsage()
+        self.message_tokens = MessageTokenCache(llm_config.token_counter)
         self._stats = {
             "tokens_prompt": 0,
             "tokens_completion": 0,
@@ -29,7 +63,7 @@ class BaseAgent:
             if "content" not in message:
                 trimmed_messages.append(message)
                 continue
-            total_messages_tokens += self.llm_config.token_counter(messages=[message])
+            total_messages_tokens += self.message_tokens.count(message)
             if total_messages_tokens <= self.llm_config.max_prompt_tokens:
                 trimmed_messages.append(message)
             else:
@@ -42,59 +76,299 @@ class BaseAgent:
                 exceeded_tokens_count=self.llm_config.max_prompt_tokens - total_messages_tokens,
             )
 
+        self.message_tokens.prune(messages)
         if trimmed_messages[-1]["role"] == "assistant":
             trimmed_messages.pop()
         return list(reversed(trimmed_messages))
 
     def _update_usage(
         self,
-        model_response: ModelResponse | CustomStreamWrapper,
+        model_response: ModelResponse,
         start_time: float,
         end_time: float,
         messages: list,
-    ):
+        tokens_compacted: int = 0,
+        llm_config: LLMConfig | None = None,
+    ) -> dict:
+        llm_config = llm_config or self.llm_config
         llm_duration = (end_time - start_time) * 1000
         llm_call = {
+            "model": llm_config.model,
             "start_time": datetime.fromtimestamp(start_time, tz=timezone.utc),
             "end_time": datetime.fromtimestamp(end_time, tz=timezone.utc),
             "request_llm": llm_duration,
+            "tokens_compacted": tokens_compacted,
         }
-        if isinstance(model_response, ModelResponse):
-            llm_call["tokens_prompt"] = model_response.usage.prompt_tokens
-            llm_call["tokens_completion"] = model_response.usage.completion_tokens
-            llm_call["tokens_total"] = model_response.usage.total_tokens
-            llm_call["total_cost"] = completion_cost(model_response)
-            if model_response.usage.prompt_tokens_details:
-                llm_call["tokens_cached"] = model_response.usage.prompt_tokens_details.cached_tokens
+        llm_call["tokens_prompt"] = model_response.usage.prompt_tokens
+        llm_call["tokens_completion"] = model_response.usage.completion_tokens
+        llm_call["tokens_total"] = model_response.usage.total_tokens
+        llm_call["total_cost"] = completion_cost(model_response)
+        if model_response.usage.prompt_tokens_details:
+            llm_call["tokens_cached"] = model_response.usage.prompt_tokens_details.cached_tokens
+        else:
+            # For LLM models from Azure and Google, the prompt_tokens_details is None
+            llm_call["tokens_cached"] = 0
+        self._record_prompt_cache(llm_call, llm_config)
+        self.agent_usage.llm_calls.append(llm_call)
+        return llm_call
+
+    def _update_stream_usage(
+        self,
+        llm_call: dict,
+        stream: MeteredStream,
+        start_time: float,
+        messages: list,
+        llm_config: LLMConfig | None = None,
+    ):
+        """Completes the record of a streamed LLM call once its stream has ended."""
+        llm_config = llm_config or self.llm_config
+        llm_call["end_time"] = datetime.fromtimestamp(stream.end_time, tz=timezone.utc)
+        llm_call["request_llm"] = llm_call["stream_duration"] = (stream.end_time - start_time) * 1000
+        if stream.first_token_time is not None:
+            llm_call["time_to_first_token"] = (stream.first_token_time - start_time) * 1000
+
+        if stream.usage:
+            llm_call["usage_source"] = "provider"
+            llm_call["tokens_prompt"] = stream.usage.prompt_tokens
+            llm_call["tokens_completion"] = stream.usage.completion_tokens
+            if stream.usage.prompt_tokens_details:
+                llm_call["tokens_cached"] = stream.usage.prompt_tokens_details.cached_tokens or 0
             else:
-                # For LLM models from Azure and Google, the prompt_tokens_details is None
                 llm_call["tokens_cached"] = 0
         else:
-            llm_call["tokens_prompt"] = self.llm_config.token_counter(messages=messages)
-        self.agent_usage.llm_calls.append(llm_call)
+            # Providers not sending the usage of streams, such as Azure, get the tokens counted locally
+            llm_call["usage_source"] = "estimated"
+            llm_call["tokens_prompt"] = llm_config.token_counter(messages=messages)
+            completion_text = stream.completion_text
+            llm_call["tokens_completion"] = llm_config.token_counter(text=completion_text) if completion_text else 0
+            llm_call["tokens_cached"] = 0
+        llm_call["tokens_total"] = llm_call["tokens_prompt"] + llm_call["tokens_completion"]
+
+        generation_time = stream.end_time - (stream.first_token_time or stream.end_time)
+        if generation_time > 0:
+            llm_call["tokens_per_second"] = llm_call["tokens_completion"] / generation_time
+        try:
+            prompt_tokens_cost, completion_tokens_cost = llm_config.token_cost_calculator(
+                prompt_tokens=llm_call["tokens_prompt"],
+                completion_tokens=llm_call["tokens_completion"],
+                cache_read_input_tokens=llm_call["tokens_cached"],
+            )
+            llm_call["total_cost"] = prompt_tokens_cost + completion_tokens_cost
+        except Exception as e:
+            # The stream has been consumed, a model missing from the litellm price list must not fail the answer
+            logger.warning(f"Could not compute the cost of the LLM call: {e}")
+        self._record_prompt_cache(llm_call, llm_config)
+
+    def _record_prompt_cache(self, llm_call: dict, llm_config: LLMConfig) -> None:
+        """Records the share of the prompt read from the provider prompt cache, and the cost it saved."""
+        tokens_prompt, tokens_cached = llm_call["tokens_prompt"], llm_call["tokens_cached"]
+        llm_call["cache_hit_rate"] = tokens_cached / tokens_prompt if tokens_prompt else 0.0
+        if not tokens_cached:
+            llm_call["cache_savings"] = 0.0
+            return
+        try:
+            uncached_cost, _ = llm_config.token_cost_calculator(prompt_tokens=tokens_prompt)
+            cached_cost, _ = llm_config.token_cost_calculator(prompt_tokens=tokens_prompt, cache_read_input_tokens=tokens_cached)
+            llm_call["cache_savings"] = uncached_cost - cached_cost
+        except Exception as e:
+            logger.warning(f"Could not compute the prompt cache savings of the LLM call: {e}")
 
     async def acompletion(
         self,
         messages: list,
+        first_hop: bool = True,
         **kwargs,
-    ) -> ModelResponse | CustomStreamWrapper:
+    ) -> ModelResponse | MeteredStream | PrefetchedStream:
+        """Calls the LLM once the scheduler admits the call.
+
+        `first_hop` tells the scheduler whether the call answers a user message, or follows up on tool results.
+        """
+        tokens_compacted = 0
+        if self.compactor is not None:
+            with tracer.span("context.compact") as span:
+                messages, tokens_compacted = self.compactor.compact(messages, count_tokens=self.message_tokens.count)
+                span.set_attributes(tokens_compacted=tokens_compacted)
         if self.llm_config.context_window and self.llm_config.max_tokens:
-            messages = self._fit_messages_within_context(messages)
-        max_tokens = kwargs.pop("max_tokens", self.llm_config.max_tokens)
+            with tracer.span("context.trim", messages=len(messages)) as span:
+                messages = self._fit_messages_within_context(messages)
+                span.set_attributes(messages_kept=len(messages))
+        if self.hedging_policy is not None:
+            return await self._hedged_acompletion(messages, tokens_compacted=tokens_compacted, first_hop=first_hop, **kwargs)
+        model_response, _ = await self._acompletion_with(
+            self.llm_config, messages, tokens_compacted=tokens_compacted, first_hop=first_hop, **kwargs
+        )
+        return model_response
 
-        if "stream_options" in kwargs and self.llm_config.llm_provider == "azure":
+    async def _acompletion_with(
+        self,
+        llm_config: LLMConfig,
+        messages: list,
+        tokens_compacted: int = 0,
+        first_hop: bool = True,
+        **kwargs,
+    ) -> tuple[ModelResponse | MeteredStream, dict]:
+        """Calls the given LLM, and returns its response along with the record of the call."""
+        max_tokens = kwargs.pop("max_tokens", llm_config.max_tokens)
+
+        if kwargs.get("stream"):
+            # Ask for the usage of the call in the final chunk of the stream
+            kwargs.setdefault("stream_options", {"include_usage": True})
+        if "stream_options" in kwargs and llm_config.provider == "azure":
             kwargs.pop("stream_options")
 
+        if llm_config.keep_alive:
+            client = llm_client_pool.client(llm_config)
+            if client is not None:
+                kwargs["client"] = client
+        else:
+            kwargs["extra_headers"] = {"Connection": "close"} | kwargs.get("extra_headers", {})
+
+        queued_time = time.time()
+        span = tracer.start_span("llm.call", start_time=queued_time, model=llm_config.model, first_hop=first_hop)
+        try:
+            ticket = await self.scheduler.acquire(
+                self.session_id, tokens=self._estimate_tokens(messages, max_tokens), first_hop=first_hop
+            )
+        except BaseException as e:
+            span.end(error=e)
+            raise
         start_time = time.time()
-        model_response = await acompletion(
-            model=self.llm_config.model,
-            base_url=self.llm_config.base_url,
-            api_key=self.llm_config.api_key,
-            api_version=self.llm_config.api_version,
-            max_tokens=max_tokens,
+        try:
+            model_response = await acompletion(
+                model=llm_config.model,
+                base_url=llm_config.base_url,
+                api_key=llm_config.api_key,
+                api_version=llm_config.api_version,
+                max_tokens=max_tokens,
+                messages=messages,
+                **kwargs,
+            )
+        except BaseException as e:
+            ticket.release()
+            span.end(error=e, queue_wait=(start_time - queued_time) * 1000)
+            raise
+        if isinstance(model_response, CustomStreamWrapper):
+            # The call is recorded in order now, and completed once its stream has been consumed
+            llm_call = {
+                "model": llm_config.model,
+                "start_time": datetime.fromtimestamp(start_time, tz=timezone.utc),
+                "queue_wait": (start_time - queued_time) * 1000,
+                "tokens_compacted": tokens_compacted,
+            }
+            self.agent_usage.llm_calls.append(llm_call)
+
+            def on_end(stream: MeteredStream) -> None:
+                try:
+                    self._update_stream_usage(llm_call, stream, start_time=start_time, messages=messages, llm_config=llm_config)
+                    ticket.update_tokens(llm_call["tokens_total"])
+                finally:
+                    ticket.release()
+                    _end_llm_span(span, llm_call)
+
+            return MeteredStream(model_response, on_end=on_end), llm_call
+        ticket.update_tokens(model_response.usage.total_tokens)
+        ticket.release()
+        llm_call = self._update_usage(
+            model_response=model_response,
+            start_time=start_time,
+            end_time=time.time(),
             messages=messages,
-            extra_headers={"Connection": "close"},
-            **kwargs,
+            tokens_compacted=tokens_compacted,
+            llm_config=llm_config,
         )
-        self._update_usage(model_response=model_response, start_time=start_time, end_time=time.time(), messages=messages)
-        return model_response
+        llm_call["queue_wait"] = (start_time - queued_time) * 1000
+        _end_llm_span(span, llm_call)
+        return model_response, llm_call
+
+    def _estimate_tokens(self, messages: list, max_tokens: int | None) -> int:
+        """Estimates the tokens of a call for the tokens-per-minute budget of the scheduler, when it has one."""
+        if self.scheduler.tokens_per_minute is None:
+            return 0
+        prompt_tokens = sum(self.message_tokens.count(message) for message in messages if message.get("content"))
+        return prompt_tokens + (max_tokens or 0)
+
+    async def _hedged_acompletion(self, messages: list, tokens_compacted: int, **kwargs) -> ModelResponse | PrefetchedStream:
+        """Calls the LLM deployments of the hedging policy, and returns the first response to produce a token.
+
+        The agent LLM is called first. Without a first token after `hedge_delay`, the next deployment is called as
+        well, and the first response wins while the others are cancelled. A failed call is followed by a call to the
+        next deployment, if failover is enabled.
+        """
+        policy = self.hedging_policy
+        llm_configs = [self.llm_config, *policy.alternates]
+        attempts: dict[asyncio.Task, dict] = {}
+        next_index = 0
+        hedges = 0
+
+        def start_attempt(kind: str) -> None:
+            nonlocal next_index
+            attempt = {"kind": kind, "llm_call": None}
+            task = asyncio.create_task(
+                self._first_token_of(llm_configs[next_index], messages, attempt, tokens_compacted=tokens_compacted, **kwargs)
+            )
+            attempts[task] = attempt
+            next_index += 1
+
+        self.agent_usage.hedging_requests += 1
+        start_attempt("primary")
+        pending = set(attempts)
+        error: BaseException | None = None
+        try:
+            while pending:
+                can_hedge = policy.hedge_delay is not None and hedges < policy.max_hedges and next_index < len(llm_configs)
+                done, pending = await asyncio.wait(
+                    pending, timeout=policy.hedge_delay if can_hedge else None, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    hedges += 1
+                    if hedges == 1:
+                        self.agent_usage.hedged_requests += 1
+                    start_attempt("hedge")
+                    pending = {task for task in attempts if not task.done()}
+                    continue
+                for task in done:
+                    if task.exception() is None:
+                        attempts[task]["won"] = True
+                        if attempts[task]["kind"] == "hedge":
+                            self.agent_usage.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+                    logger.warning(f"LLM call to {attempts[task]['model']} failed: {error!r}")
+                if policy.failover and not pending and next_index < len(llm_configs):
+                    self.agent_usage.failovers += 1
+                    start_attempt("failover")
+                    pending = {task for task in attempts if not task.done()}
+            raise error
+        finally:
+            for task, attempt in attempts.items():
+                if attempt["llm_call"] is not None:
+                    attempt["llm_call"]["attempt"] = attempt["kind"]
+                    attempt["llm_call"]["won"] = attempt.get("won", False)
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled() and task.exception() is None and not attempt.get("won"):
+                    # A response received while another attempt won is discarded
+                    await _discard(task.result())
+
+    async def _first_token_of(
+        self, llm_config: LLMConfig, messages: list, attempt: dict, **kwargs
+    ) -> ModelResponse | PrefetchedStream:
+        """Calls the LLM, and for a stream, waits for its first token."""
+        attempt["model"] = llm_config.model
+        model_response, attempt["llm_call"] = await self._acompletion_with(llm_config, messages, **kwargs)
+        if isinstance(model_response, ModelResponse):
+            return model_response
+        return await PrefetchedStream.first_token_of(model_response)
+
+
+async def _discard(model_response: ModelResponse | PrefetchedStream) -> None:
+    if isinstance(model_response, PrefetchedStream):
+        await model_response.aclose()
+
+
+def _end_llm_span(span: Span, llm_call: dict) -> None:
+    """Ends the span of an LLM call with the record of the call, whose phases also feed their own histograms."""
+    for phase in ("queue_wait", "time_to_first_token", "stream_duration"):
+        if phase in llm_call:
+            tracer.observe(f"llm.{phase}", llm_call[phase])
+    span.end(**{key: llm_call.get(key) for key in _LLM_SPAN_ATTRIBUTES})
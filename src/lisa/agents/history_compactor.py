@@ -0,0 +1,73 @@
+from collections.abc import Callable
+
+# The length above which the results of the tools without a summarizer are truncated
+DEFAULT_MAX_CHARS = 200
+
+
+class HistoryCompactor:
+    """Replaces the tool results of earlier turns with compact summaries, before the history is sent to the LLM.
+
+    The last `keep_turns` turns, a turn starting with a user message, are kept verbatim. Earlier tool messages are
+    replaced by copies whose content is summarized by the summarizer registered for their tool, or truncated to
+    `max_chars` characters otherwise, when that makes them shorter. Tool messages are never removed, so that every
+    assistant `tool_calls` entry keeps its tool messages. A message is compacted once: its compact copy is reused on
+    the next calls, so that the history sent stays byte-identical from one call to the next.
+    """
+
+    def __init__(
+        self,
+        summarizers: dict[str, Callable[[str], str]] | None = None,
+        keep_turns: int = 1,
+        max_chars: int = DEFAULT_MAX_CHARS,
+    ) -> None:
+        self.summarizers = summarizers or {}
+        self.keep_turns = keep_turns
+        self.max_chars = max_chars
+        self._compacted: dict[int, tuple[dict, str, dict, int]] = {}
+
+    def compact(self, messages: list, count_tokens: Callable[[dict], int]) -> tuple[list, int]:
+        """Returns the compacted history, and the number of prompt tokens the compaction saved."""
+        user_indexes = [i for i, message in enumerate(messages) if message["role"] == "user"]
+        if len(user_indexes) <= self.keep_turns:
+            return messages, 0
+        kept_from = user_indexes[-self.keep_turns] if self.keep_turns else len(messages)
+
+        compacted_messages = list(messages)
+        tokens_saved = 0
+        for i in range(kept_from):
+            if messages[i]["role"] == "tool":
+                compacted_messages[i], saved = self._compact_message(messages[i], count_tokens)
+                tokens_saved += saved
+        self._prune(messages)
+        return compacted_messages, tokens_saved
+
+    def _compact_message(self, message: dict, count_tokens: Callable[[dict], int]) -> tuple[dict, int]:
+        content = message.get("content")
+        entry = self._compacted.get(id(message))
+        if entry is not None and entry[0] is message and entry[1] is content:
+            return entry[2], entry[3]
+
+        summary = self.summarize(message.get("name", ""), content or "")
+        compacted_message, tokens_saved = message, 0
+        if summary != (content or ""):
+            summarized_message = {**message, "content": summary}
+            saved = count_tokens(message) - count_tokens(summarized_message)
+            # A summary longer than the message, such as of a short list, is not used
+            if saved > 0:
+                compacted_message, tokens_saved = summarized_message, saved
+        # Keeping a reference to the message prevents its id from being reused by another message
+        self._compacted[id(message)] = (message, content, compacted_message, tokens_saved)
+        return compacted_message, tokens_saved
+
+    def summarize(self, tool_name: str, content: str) -> str:
+        summarizer = self.summarizers.get(tool_name)
+        if summarizer is not None:
+            return summarizer(content)
+        if len(content) > self.max_chars:
+            return content[: self.max_chars] + " […]"
+        return content
+
+    def _prune(self, messages: list) -> None:
+        if len(self._compacted) > 2 * len(messages):
+            ids = {id(message) for message in messages}
+            self._compacted = {key: entry for key, entry in self._compacted.items() if key in ids}
@@ -1,81 +1,277 @@
+import asyncio
+import logging
+import time
 from collections.abc import AsyncGenerator
 from typing import Callable
 
 import chainlit as cl
-from litellm.types.utils import ChatCompletionMessageToolCall, Function
-from litellm.utils import CustomStreamWrapper, ModelResponse
+from litellm.types.utils import ChatCompletionMessageToolCall
+from litellm.utils import ModelResponse
 
 from lisa.agents.base_agent import BaseAgent
+from lisa.agents.history_compactor import HistoryCompactor
+from lisa.agents.tool_call_assembler import ToolCallAssembler
+from lisa.models.hedging_policy import HedgingPolicy
 from lisa.models.llm_config import LLMConfig
-from lisa.models.llm_response import LLMResponse
-from lisa.utils.function_calling import convert_to_openai_tool, execute_tool
+from lisa.models.stream_events import Finish, SentenceChunk, StreamEvent, ToolEnd, ToolStart
+from lisa.utils.french_sentence_chunker import FrenchSentenceChunker
+from lisa.utils.function_calling import execute_tool, tool_registry
+from lisa.utils.llm_scheduler import LLMScheduler, llm_scheduler
+from lisa.utils.speculation import Speculation, ToolSpeculator, current_speculation
+from lisa.utils.stream_serializer import serialize_stream_events
+from lisa.utils.tracing import current_span, trace_stream, tracer
+
+logger = logging.getLogger(__name__)
 
 
 class ToolCallAgent(BaseAgent):
-    def __init__(self, llm_config: LLMConfig, messages: list, agent_tools: list[Callable]) -> None:
-        super().__init__(llm_config=llm_config)
+    def __init__(
+        self,
+        llm_config: LLMConfig,
+        messages: list,
+        agent_tools: list[Callable],
+        max_concurrent_tools: int = 4,
+        tool_timeout: float | None = 30,
+        dynamic_context: Callable[[], str] | None = None,
+        compactor: HistoryCompactor | None = None,
+        hedging_policy: HedgingPolicy | None = None,
+        scheduler: LLMScheduler = llm_scheduler,
+        speculators: dict[str, ToolSpeculator] | None = None,
+    ) -> None:
+        super().__init__(llm_config=llm_config, compactor=compactor, hedging_policy=hedging_policy, scheduler=scheduler)
         self.current_iteration = 0
         self.max_iteration = 5
+        self.max_concurrent_tools = max_concurrent_tools
+        self.tool_timeout = tool_timeout
         self.messages = messages
+        self.dynamic_context = dynamic_context
+        self._context_message: dict | None = None
+        self.speculators = speculators or {}
+        self._speculation: Speculation | None = None
         self.tool_dict = {f.__name__: f for f in agent_tools}
-        self.tools = [convert_to_openai_tool(f) for f in agent_tools]
+        # The tool schemas are part of the cached prompt prefix, so their order must not depend on the caller
+        self.tools = [tool_registry.get(self.tool_dict[name]).schema for name in sorted(self.tool_dict)]
 
-    async def on_message(self, message: str, **kwargs) -> AsyncGenerator[str]:
+    async def on_message(self, message: str, **kwargs) -> AsyncGenerator[StreamEvent]:
         self.current_iteration = 0
-        self.messages.append({"role": "user", "content": message})
-        return self.call_llm(**kwargs)
+        self.add_message({"role": "user", "content": message})
+        # Each turn is a trace of its own. The spans started from this context, or from the tasks it creates, are
+        # children of the turn span until the turn ends.
+        turn_span = tracer.start_span("agent.turn", root=True, session_id=self.session_id)
+        token = current_span.set(turn_span)
+        self.start_speculation(message)
+        return trace_stream(turn_span, self._turn_events(self.stream_events(**kwargs)), token=token)
+
+    async def _turn_events(self, events: AsyncGenerator[StreamEvent]) -> AsyncGenerator[StreamEvent]:
+        """Yields the events of the turn, and discards its speculation once the turn ends, fails or is closed."""
+        speculation = self._speculation
+        try:
+            async for event in events:
+                yield event
+        finally:
+            await events.aclose()
+            # A stream closed late must not discard the speculation of a newer turn
+            if self._speculation is speculation:
+                self.end_speculation()
+
+    def start_speculation(self, message: str) -> None:
+        """Starts loading the results of the speculated tools from the user message, alongside the first LLM call."""
+        self.end_speculation()
+        speculators = {name: speculator for name, speculator in self.speculators.items() if name in self.tool_dict}
+        if speculators:
+            self._speculation = Speculation(message, speculators)
+            # The tool tasks of the turn are created from this context, and read the speculation from it
+            current_speculation.set(self._speculation)
+
+    def end_speculation(self) -> None:
+        if self._speculation is not None:
+            self._speculation.discard()
+            self._speculation = None
+            current_speculation.set(None)
+
+    def add_message(self, message: dict) -> None:
+        self.messages.append(message)
+        if self.llm_config.context_window and self.llm_config.max_tokens and "content" in message:
+            # Count the tokens once, when the message enters the history, rather than on every LLM call
+            self.message_tokens.count(message)
+
+    def messages_with_context(self) -> list:
+        """Returns the history with the dynamic context message placed right after the leading system messages.
+
+        The leading system messages stay byte-identical across calls and sessions, so that the provider can serve
+        them from its prompt cache, while the context (such as the current date) is computed for every call.
+        """
+        if self.dynamic_context is None:
+            return self.messages
+        content = self.dynamic_context()
+        if self._context_message is None or self._context_message["content"] != content:
+            self._context_message = {"role": "system", "content": content}
+        prefix_length = next((i for i, m in enumerate(self.messages) if m["role"] != "system"), len(self.messages))
+        return [*self.messages[:prefix_length], self._context_message, *self.messages[prefix_length:]]
 
     @cl.step(type="tool")
-    async def call_tool(self, tool_call: ChatCompletionMessageToolCall):
+    async def call_tool(self, tool_call: ChatCompletionMessageToolCall) -> dict:
         current_step = cl.context.current_step
         current_step.name = tool_call.function.name
         current_step.input = tool_call.function.arguments
-        function_response = await execute_tool(tool_call, self.tool_dict)
-        current_step.output = function_response
-        current_step.language = "json"
-        self.messages.append(
+        start_time = time.perf_counter()
+        with tracer.span("tool.call", tool=tool_call.function.name) as span:
+            try:
+                function_response = await asyncio.wait_for(execute_tool(tool_call, self.tool_dict), self.tool_timeout)
+            except TimeoutError:
+                function_response = f"L'outil '{tool_call.function.name}' n'a pas répondu dans le délai imparti."
+                span.set_attributes(timed_out=True)
+            except Exception as e:
+                # The call is answered all the same, so that the history stays valid and the LLM can recover
+                logger.warning(f"The tool '{tool_call.function.name}' failed: {e!r}")
+                function_response = f"L'outil '{tool_call.function.name}' a échoué : {e}"
+                span.set_attributes(error=repr(e))
+        tokens = self.llm_config.token_counter(text=function_response)
+        self.agent_usage.tool_calls.append(
             {
-                "role": "tool",
                 "name": tool_call.function.name,
-                "content": function_response,
                 "tool_call_id": tool_call.id,
+                "duration": (time.perf_counter() - start_time) * 1000,
+                "tokens_result": tokens,
             }
         )
+        current_step.output = function_response
+        current_step.language = "json"
+        current_step.metadata = {"tokens_result": tokens}
+        return {
+            "role": "tool",
+            "name": tool_call.function.name,
+            "content": function_response,
+            "tool_call_id": tool_call.id,
+        }
+
+    def tool_starter(self) -> Callable[[ChatCompletionMessageToolCall], asyncio.Task]:
+        """Returns a function starting tool calls as tasks, at most `max_concurrent_tools` of them running at once."""
+        semaphore = asyncio.Semaphore(self.max_concurrent_tools)
+
+        async def call_tool_when_allowed(tool_call: ChatCompletionMessageToolCall) -> dict:
+            async with semaphore:
+                return await self.call_tool(tool_call=tool_call)
+
+        return lambda tool_call: asyncio.create_task(call_tool_when_allowed(tool_call))
+
+    async def call_tools(
+        self,
+        tool_calls: list[ChatCompletionMessageToolCall],
+        started_tasks: dict[int, asyncio.Task] | None = None,
+        start_tool: Callable[[ChatCompletionMessageToolCall], asyncio.Task] | None = None,
+    ) -> AsyncGenerator[ToolStart | ToolEnd]:
+        """Runs the tool calls of an assistant turn concurrently, and adds their results in the order of the calls.
+
+        The calls already started while streaming the assistant turn are given in `started_tasks`, by index.
+        """
+        tasks = dict(started_tasks or {})
+        start_tool = start_tool or self.tool_starter()
+        try:
+            for i, tool_call in enumerate(tool_calls):
+                if i not in tasks:
+                    tasks[i] = start_tool(tool_call)
+                    yield ToolStart(
+                        tool_call_id=tool_call.id, name=tool_call.function.name, arguments=tool_call.function.arguments
+                    )
+            tool_messages = []
+            for i in range(len(tool_calls)):
+                tool_message = await tasks[i]
+                tool_messages.append(tool_message)
+                yield ToolEnd(
+                    tool_call_id=tool_message["tool_call_id"], name=tool_message["name"], content=tool_message["content"]
+                )
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+        for tool_message in tool_messages:
+            self.add_message(tool_message)
 
     async def call_llm(self, **kwargs) -> AsyncGenerator[str]:
+        """Streams the answer as JSON lines, for the callers that need a serialized stream."""
+        async for line in serialize_stream_events(self.stream_events(**kwargs)):
+            yield line
+
+    async def stream_sentences(self, **kwargs) -> AsyncGenerator[SentenceChunk | ToolStart | ToolEnd | Finish]:
+        """Streams the answer as speakable sentence or clause chunks, for a text-to-speech stage.
+
+        The text pending when a tool starts or the answer ends is emitted as a chunk of its own.
+        """
+        chunker = FrenchSentenceChunker(started_at=time.perf_counter())
+        async for event in self.stream_events(**kwargs):
+            if isinstance(event, str):
+                for chunk in chunker.feed(event):
+                    yield chunk
+                continue
+            for chunk in chunker.finish():
+                yield chunk
+            yield event
+
+    async def stream_events(self, **kwargs) -> AsyncGenerator[StreamEvent]:
         if not kwargs:
             kwargs = {}
         kwargs["tools"] = self.tools
-        model_response = await super().acompletion(self.messages, **kwargs)
+        model_response = await super().acompletion(self.messages_with_context(), first_hop=self.current_iteration == 0, **kwargs)
         tool_calls: list[ChatCompletionMessageToolCall] = []
-        if isinstance(model_response, ModelResponse):
-            resp_message = model_response.choices[0].message
-            tool_calls = resp_message.tool_calls
-            if not tool_calls:
-                yield LLMResponse(message=resp_message.content).model_dump_json(exclude_none=True)
-        elif isinstance(model_response, CustomStreamWrapper):
-            async for chunk in model_response:
-                delta = chunk.choices[0].delta if chunk.choices and chunk.choices[0].delta is not None else None
-                if delta and delta.content:
-                    yield LLMResponse(message=delta.content).model_dump_json(exclude_none=True) + "\n"
-                elif delta and delta.tool_calls:
-                    tc_chunk_list = delta.tool_calls
-                    for tc_chunk in tc_chunk_list:
-                        if len(tool_calls) <= tc_chunk.index:
-                            tool_call = ChatCompletionMessageToolCall(id="", function=Function(name="", arguments=""))
-                            tool_calls.append(tool_call)
-                        tc = tool_calls[tc_chunk.index]
-                        if tc_chunk.id:
-                            tc.id += tc_chunk.id
-                        if tc_chunk.function.name:
-                            tc.function.name += tc_chunk.function.name
-                        if tc_chunk.function.arguments:
-                            tc.function.arguments += tc_chunk.function.arguments
-
-        if tool_calls and self.current_iteration < self.max_iteration:
-            self.messages.append({"role": "assistant", "tool_calls": tool_calls})
-            for tool_call in tool_calls:
-                await self.call_tool(tool_call=tool_call)
+        tool_tasks: dict[int, asyncio.Task] = {}
+        start_tool = self.tool_starter()
+        run_tools = self.current_iteration < self.max_iteration
+        finish_reason = None
+        usage = None
+
+        def start_tools(completed: list[ChatCompletionMessageToolCall]) -> list[ToolStart]:
+            if not run_tools:
+                return []
+            for tool_call in completed:
+                tool_tasks[tool_calls.index(tool_call)] = start_tool(tool_call)
+            return [
+                ToolStart(tool_call_id=tool_call.id, name=tool_call.function.name, arguments=tool_call.function.arguments)
+                for tool_call in completed
+            ]
+
+        try:
+            if isinstance(model_response, ModelResponse):
+                choice = model_response.choices[0]
+                tool_calls = choice.message.tool_calls or []
+                finish_reason = choice.finish_reason
+                usage = getattr(model_response, "usage", None)
+                if not tool_calls and choice.message.content:
+                    yield choice.message.content
+            else:
+                assembler = ToolCallAssembler()
+                tool_calls = assembler.tool_calls
+                async for chunk in model_response:
+                    usage = getattr(chunk, "usage", None) or usage
+                    if not chunk.choices:
+                        continue
+                    choice = chunk.choices[0]
+                    finish_reason = choice.finish_reason or finish_reason
+                    delta = choice.delta
+                    if delta is None:
+                        continue
+                    if delta.content:
+                        yield delta.content
+                    elif delta.tool_calls:
+                        for tc_chunk in delta.tool_calls:
+                            # Start each tool as soon as its arguments are complete, while the stream goes on
+                            for event in start_tools(assembler.add(tc_chunk)):
+                                yield event
+                # The calls whose arguments never made a JSON object, such as malformed ones, start with the end
+                for event in start_tools(assembler.finish()):
+                    yield event
+        except BaseException:
+            for task in tool_tasks.values():
+                task.cancel()
+            raise
+
+        if tool_calls and run_tools:
+            self.add_message({"role": "assistant", "tool_calls": tool_calls})
+            async for event in self.call_tools(tool_calls, started_tasks=tool_tasks, start_tool=start_tool):
+                yield event
             self.current_iteration += 1
-            async for result in self.call_llm(**kwargs):
-                yield result
+            async for event in self.stream_events(**kwargs):
+                yield event
+        else:
+            self.end_speculation()
+            yield Finish(finish_reason=finish_reason, usage=usage.model_dump(exclude_none=True) if usage else None)
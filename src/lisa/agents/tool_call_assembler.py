@@ -0,0 +1,51 @@
+import json
+
+from litellm.types.utils import ChatCompletionDeltaToolCall, ChatCompletionMessageToolCall, Function
+
+
+class ToolCallAssembler:
+    """Assembles streamed tool call deltas into tool calls.
+
+    Each delta reports the tool calls it completed, so they can be executed while the rest of the stream arrives.
+    A tool call is complete once its arguments are a valid JSON object, or once the next tool call starts.
+    """
+
+    def __init__(self) -> None:
+        self.tool_calls: list[ChatCompletionMessageToolCall] = []
+        self._completed: set[int] = set()
+
+    def add(self, tc_chunk: ChatCompletionDeltaToolCall) -> list[ChatCompletionMessageToolCall]:
+        while len(self.tool_calls) <= tc_chunk.index:
+            self.tool_calls.append(ChatCompletionMessageToolCall(id="", function=Function(name="", arguments="")))
+        tc = self.tool_calls[tc_chunk.index]
+        if tc_chunk.id:
+            tc.id += tc_chunk.id
+        if tc_chunk.function.name:
+            tc.function.name += tc_chunk.function.name
+        if tc_chunk.function.arguments:
+            tc.function.arguments += tc_chunk.function.arguments
+
+        completed = [i for i in range(tc_chunk.index) if i not in self._completed]
+        # Only attempt to parse when the arguments may have just been closed
+        if tc_chunk.function.arguments and "}" in tc_chunk.function.arguments and _is_json_object(tc.function.arguments):
+            completed.append(tc_chunk.index)
+        return self._complete(completed)
+
+    def finish(self) -> list[ChatCompletionMessageToolCall]:
+        """Completes the tool calls still pending at the end of the stream."""
+        return self._complete([i for i in range(len(self.tool_calls)) if i not in self._completed])
+
+    def _complete(self, indexes: list[int]) -> list[ChatCompletionMessageToolCall]:
+        completed = []
+        for i in indexes:
+            if self.tool_calls[i].id and self.tool_calls[i].function.name:
+                self._completed.add(i)
+                completed.append(self.tool_calls[i])
+        return completed
+
+
+def _is_json_object(arguments: str) -> bool:
+    try:
+        return isinstance(json.loads(arguments), dict)
+    except json.JSONDecodeError:
+        return False
@@ -1,13 +1,32 @@
-import json
+import asyncio
 import locale
 import os
 from datetime import datetime
 
 import chainlit as cl
+from chainlit.server import app as chainlit_app
 
-from lisa.agent_tools.appointment.schedulers import get_available_time_slots
+from lisa.agent_tools.appointment.schedulers import (
+    book_time_slot,
+    get_available_time_slots,
+    summarize_available_time_slots,
+    time_slots_speculator,
+)
+from lisa.agents.agent_sessions import AgentSessions
+from lisa.agents.history_compactor import HistoryCompactor
 from lisa.agents.tool_call_agent import ToolCallAgent
+from lisa.exceptions.llm_over_capacity_error import LLMOverCapacityError
+from lisa.models.hedging_policy import HedgingPolicy
 from lisa.models.llm_config import LLMConfig
+from lisa.models.session_state import SessionState
+from lisa.utils.buffered_stream_sink import BufferedStreamSink
+from lisa.utils.function_calling import tool_registry
+from lisa.utils.http_client_pool import http_client_pool
+from lisa.utils.lifecycle import install_lifespan, on_shutdown, on_startup
+from lisa.utils.llm_client_pool import llm_client_pool
+from lisa.utils.metrics import metrics, mount_metrics_endpoint
+from lisa.utils.session_store import WriteBehindBuffer, session_store_from_env
+from lisa.utils.tracing import tracer
 
 # Set locale to French
 try:
@@ -26,7 +45,45 @@ except locale.Error:
                 print("French locale not available on your system.")
 
 
-system_prompt = f"""Vous êtes LISA, un assistant vocal qui parle français, conçu pour planifier des rendez-vous pour les utilisateurs.
+def build_llm_config() -> LLMConfig:
+    return LLMConfig(
+        model=os.environ["MODEL_NAME"],
+        api_key=os.environ["OPENAI_API_KEY"],
+        keep_alive=os.environ.get("LLM_KEEP_ALIVE", "true"),
+        idle_timeout=os.environ.get("LLM_IDLE_TIMEOUT", "60"),
+    )
+
+
+def build_hedging_policy() -> HedgingPolicy | None:
+    """Builds the hedging policy over the comma-separated deployments of `LLM_HEDGE_MODELS`, if any."""
+    models = [model.strip() for model in os.environ.get("LLM_HEDGE_MODELS", "").split(",") if model.strip()]
+    if not models:
+        return None
+    hedge_delay_ms = os.environ.get("LLM_HEDGE_DELAY_MS", "1000")
+    return HedgingPolicy(
+        alternates=[LLMConfig(**build_llm_config().model_dump() | {"model": model}) for model in models],
+        hedge_delay=float(hedge_delay_ms) / 1000 if hedge_delay_ms != "none" else None,
+        failover=os.environ.get("LLM_FAILOVER", "true"),
+    )
+
+
+@on_startup
+async def open_http_pools():
+    llm_config = build_llm_config()
+    await http_client_pool.start("recognizers", "agenda")
+    await llm_client_pool.warm_up(llm_config)
+    # Load the tokenizer off the event loop, rather than at the end of the first streamed answer when usage is counted
+    await asyncio.to_thread(llm_config.token_counter, text="Bonjour")
+
+
+on_shutdown(http_client_pool.close)
+on_shutdown(llm_client_pool.close)
+# Registered after the HTTP pools, so that the last spans are exported before the pools close
+on_shutdown(tracer.close)
+install_lifespan(chainlit_app)
+mount_metrics_endpoint(chainlit_app)
+
+system_prompt = """Vous êtes LISA, un assistant vocal qui parle français, conçu pour planifier des rendez-vous pour les utilisateurs.
 Votre objectif principal est d'aider les utilisateurs à trouver des horaires de rendez-vous adaptés en fonction des disponibilités fournies. Voici vos instructions :
 
 1. Demandez à l'utilisateur sa date et son heure préférées pour un rendez-vous, en étant attentif à son langage naturel.
@@ -42,32 +99,110 @@ Votre objectif principal est d'aider les utilisateurs à trouver des horaires de
 7. Confirmez toujours le rendez-vous de manière claire et assurez-vous que l'utilisateur est satisfait de l'horaire réservé.
 8. Soyez poli, concis et clair dans toutes vos communications. Utilisez des phrases courtes et engageantes pour maintenir l'intérêt de l'utilisateur.
 9. Répondez de manière appropriée à toute préoccupation ou question exprimée par l'utilisateur. Si nécessaire, reformulez vos propositions pour mieux correspondre à ses attentes.
-10. Introduisez des variations dans vos réponses pour éviter les répétitions et rendez la conversation dynamique et engageante.
+10. Introduisez des variations dans vos réponses pour éviter les répétitions et rendez la conversation dynamique et engageante."""
+
+
+def current_context() -> str:
+    return f"Current date: {datetime.now().strftime('%A %-d %B %Y')}"
+
+
+def build_speculators() -> dict:
+    if os.environ.get("SPECULATIVE_PREFETCH", "false").lower() not in ("true", "1", "yes"):
+        return {}
+    return {"get_available_time_slots": time_slots_speculator}
+
 
-Current date: {datetime.now().strftime("%A %-d %B %Y")}"""
+AGENT_TOOLS = [get_available_time_slots, book_time_slot]
+# Build the tool schemas and argument validators once, rather than on the first chat start
+for tool in AGENT_TOOLS:
+    tool_registry.get(tool)
 
+OVER_CAPACITY_MESSAGE = "Je suis très sollicitée en ce moment. Pouvez-vous renvoyer votre message dans quelques instants ?"
 welcome_msg = "Bonjour! Je suis LISA, votre assistante vocale. Quand souhaitez-vous prendre un rendez-vous ?"
 
 
+def build_agent(state: SessionState) -> ToolCallAgent:
+    """Builds the agent of a new session, or of a session rehydrated from the session store."""
+    llm_config = build_llm_config()
+    compactor = HistoryCompactor(
+        summarizers={"get_available_time_slots": summarize_available_time_slots},
+        keep_turns=int(os.environ.get("HISTORY_KEEP_TURNS", "1")),
+    )
+    chat_agent = ToolCallAgent(
+        llm_config=llm_config,
+        messages=state.messages,
+        agent_tools=AGENT_TOOLS,
+        dynamic_context=current_context,
+        compactor=compactor,
+        hedging_policy=build_hedging_policy(),
+        speculators=build_speculators(),
+    )
+    chat_agent.agent_usage = state.agent_usage
+    return chat_agent
+
+
+def new_session_state() -> SessionState:
+    return SessionState(messages=[{"role": "system", "content": system_prompt}, {"role": "assistant", "content": welcome_msg}])
+
+
+# The agents are kept out of the Chainlit user session, so that any worker can serve a session from the store
+agent_sessions = AgentSessions(
+    WriteBehindBuffer(
+        session_store_from_env(),
+        flush_interval=float(os.environ.get("SESSION_FLUSH_INTERVAL_MS", "500")) / 1000,
+        max_batch=int(os.environ.get("SESSION_FLUSH_MAX_BATCH", "64")),
+    ),
+    agent_factory=build_agent,
+    max_idle=float(os.environ.get("SESSION_IDLE_TIMEOUT", "900")),
+    max_live=int(os.environ.get("SESSION_MAX_LIVE", "1000")),
+)
+metrics.register("sessions", agent_sessions.stats)
+session_eviction_task: asyncio.Task | None = None
+
+
+@on_startup
+async def start_session_eviction():
+    global session_eviction_task
+    session_eviction_task = asyncio.create_task(agent_sessions.run_eviction(interval=60))
+
+
+@on_shutdown
+async def flush_sessions():
+    if session_eviction_task is not None:
+        session_eviction_task.cancel()
+    await agent_sessions.buffer.close()
+
+
 @cl.on_chat_start
 async def start_chat():
-    message_history = [{"role": "system", "content": system_prompt}, {"role": "assistant", "content": welcome_msg}]
-    llm_config = LLMConfig(model=os.environ["MODEL_NAME"], api_key=os.environ["OPENAI_API_KEY"])
-    agent_tools = [get_available_time_slots]
-    chat_agent = ToolCallAgent(llm_config=llm_config, messages=message_history, agent_tools=agent_tools)
-    cl.user_session.set("chat_agent", chat_agent)
+    session_id = cl.context.session.thread_id
+    if await agent_sessions.exists(session_id):
+        # A reconnection served by another worker, or after a restart: the agent is rehydrated on the next message
+        return
+    agent_sessions.put(session_id, build_agent(new_session_state()))
     await cl.Message(content=welcome_msg, author="LISA").send()
 
 
 @cl.on_message
 async def on_message(message: cl.Message):
-    chat_agent: ToolCallAgent = cl.user_session.get("chat_agent")
+    session_id = cl.context.session.thread_id
+    chat_agent = await agent_sessions.get(session_id)
+    if chat_agent is None:
+        # The session state was lost, such as with the in-memory store after a restart
+        chat_agent = build_agent(new_session_state())
+        agent_sessions.put(session_id, chat_agent)
     final_answer = cl.Message(content="", author="LISA")
     stream = await chat_agent.on_message(message.content, stream=True)
-    async for chunk in stream:
-        delta = json.loads(chunk)["message"]
-        await final_answer.stream_token(delta)
+    async with BufferedStreamSink(final_answer.stream_token) as sink:
+        try:
+            async for event in stream:
+                if isinstance(event, str):
+                    await sink.write(event)
+        except LLMOverCapacityError:
+            # Rejected at once rather than left waiting, the user can simply send the message again
+            await sink.write(OVER_CAPACITY_MESSAGE)
     await final_answer.send()
+    agent_sessions.save(session_id, chat_agent)
 
 
 if __name__ == "__main__":
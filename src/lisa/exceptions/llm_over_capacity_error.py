@@ -0,0 +1,5 @@
+class LLMOverCapacityError(Exception):
+    def __init__(self, message: str, queue_depth: int, in_flight: int):
+        super().__init__(message)
+        self.queue_depth = queue_depth
+        self.in_flight = in_flight
@@ -1,8 +1,56 @@
 from typing import Any
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, computed_field
 
 
 class BaseAgentUsage(BaseModel):
+    model_config = ConfigDict(use_attribute_docstrings=True)
+
     llm_calls: list[dict[str, Any]] | None = []
     llm_retries_count: int = 0
+    tool_calls: list[dict[str, Any]] = []
+    hedging_requests: int = 0
+    """The number of requests made under a hedging policy"""
+    hedged_requests: int = 0
+    """The number of requests for which an alternate deployment was called before the first token"""
+    hedge_wins: int = 0
+    """The number of hedged requests answered by the hedged call"""
+    failovers: int = 0
+    """The number of calls made to the next deployment after a failed call"""
+
+    @computed_field
+    @property
+    def prompt_cache_hit_rate(self) -> float:
+        """The share of the prompt tokens of all the calls that were read from the provider prompt cache"""
+        tokens_prompt = sum(llm_call.get("tokens_prompt", 0) for llm_call in self.llm_calls or [])
+        tokens_cached = sum(llm_call.get("tokens_cached", 0) for llm_call in self.llm_calls or [])
+        return tokens_cached / tokens_prompt if tokens_prompt else 0.0
+
+    @computed_field
+    @property
+    def prompt_cache_savings(self) -> float:
+        """The cost saved by the provider prompt cache over all the calls"""
+        return sum(llm_call.get("cache_savings", 0) for llm_call in self.llm_calls or [])
+
+    @computed_field
+    @property
+    def tokens_compacted(self) -> int:
+        """The prompt tokens saved by the history compaction over all the calls"""
+        return sum(llm_call.get("tokens_compacted", 0) for llm_call in self.llm_calls or [])
+
+    @computed_field
+    @property
+    def hedge_rate(self) -> float:
+        return self.hedged_requests / self.hedging_requests if self.hedging_requests else 0.0
+
+    @computed_field
+    @property
+    def hedge_win_rate(self) -> float:
+        """The share of hedged requests answered by the hedged call"""
+        return self.hedge_wins / self.hedged_requests if self.hedged_requests else 0.0
+
+    @computed_field
+    @property
+    def hedge_extra_cost(self) -> float:
+        """The cost of the calls whose response was discarded because another call won"""
+        return sum(llm_call.get("total_cost", 0) for llm_call in self.llm_calls or [] if llm_call.get("won") is False)
@@ -0,0 +1,28 @@
+from pydantic import BaseModel, computed_field
+
+
+class BatcherStats(BaseModel):
+    requests: int = 0
+    batches: int = 0
+    batch_sizes: dict[int, int] = {}
+    """The number of batches sent, per batch size"""
+    queue_wait_ms_total: float = 0
+    """The total time requests waited for their batch to be sent"""
+    queue_wait_ms_max: float = 0
+    batch_latency_ms_total: float = 0
+    """The total time spent sending batches, in milliseconds"""
+
+    @computed_field
+    @property
+    def mean_batch_size(self) -> float:
+        return self.requests / self.batches if self.batches else 0.0
+
+    @computed_field
+    @property
+    def mean_queue_wait_ms(self) -> float:
+        return self.queue_wait_ms_total / self.requests if self.requests else 0.0
+
+    @computed_field
+    @property
+    def mean_batch_latency_ms(self) -> float:
+        return self.batch_latency_ms_total / self.batches if self.batches else 0.0
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+
+
+class CacheStats(BaseModel):
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    """The number of lookups that joined a load already in flight for the same key"""
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+    size: int = 0
+    max_size: int = 0
+    ttl: float = 0
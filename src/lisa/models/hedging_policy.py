@@ -0,0 +1,19 @@
+from pydantic import BaseModel, ConfigDict
+
+from lisa.models.llm_config import LLMConfig
+
+
+class HedgingPolicy(BaseModel):
+    """Policy for hedging and failing over the LLM calls of an agent to alternate deployments."""
+
+    model_config = ConfigDict(use_attribute_docstrings=True)
+
+    alternates: list[LLMConfig]
+    """The deployments called after the agent LLM, in order of preference"""
+    hedge_delay: float | None = 1.0
+    """The number of seconds without a first token after which the next deployment is called as well, such as the
+    p90 time to first token. None disables hedging"""
+    max_hedges: int = 1
+    """The maximum number of hedged calls per request"""
+    failover: bool = True
+    """Call the next deployment when a call fails"""
@@ -0,0 +1,31 @@
+import os
+
+from pydantic import BaseModel, ConfigDict
+
+
+class HttpPoolConfig(BaseModel):
+    """Connection pool settings for an upstream HTTP service."""
+
+    model_config = ConfigDict(use_attribute_docstrings=True)
+
+    limit: int = 100
+    """The maximum number of simultaneous connections to the upstream"""
+    limit_per_host: int = 20
+    """The maximum number of simultaneous connections to a single host of the upstream"""
+    keepalive_timeout: float = 30
+    """The number of seconds an idle connection is kept open for reuse"""
+    ttl_dns_cache: int = 300
+    """The number of seconds a resolved DNS entry is cached"""
+    total_timeout: float | None = 30
+    """The total number of seconds allowed for a request, connection included"""
+
+    @classmethod
+    def from_env(cls, upstream: str) -> "HttpPoolConfig":
+        """Reads the settings from `<UPSTREAM>_HTTP_<FIELD>` or `HTTP_<FIELD>` environment variables."""
+        values = {}
+        for field in cls.model_fields:
+            for key in (f"{upstream.upper()}_HTTP_{field.upper()}", f"HTTP_{field.upper()}"):
+                if key in os.environ:
+                    values[field] = os.environ[key]
+                    break
+        return cls(**values)
@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+
+
+class HttpPoolStats(BaseModel):
+    in_use: int = 0
+    idle: int = 0
+    waiters: int = 0
+    limit: int = 0
+    limit_per_host: int = 0
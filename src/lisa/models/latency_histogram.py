@@ -0,0 +1,61 @@
+from bisect import bisect_left
+
+from pydantic import BaseModel, ConfigDict, Field, computed_field
+
+# Finer between 100 ms and 2.5 s, where the LLM calls and the turns fall
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 150, 200, 300, 400, 500, 750, 1000, 1500, 2000, 2500, 5000, 10000, 30000)
+
+
+class LatencyHistogram(BaseModel):
+    model_config = ConfigDict(use_attribute_docstrings=True)
+
+    buckets: dict[str, int] = Field(default_factory=lambda: {str(bound): 0 for bound in LATENCY_BUCKETS_MS} | {"+Inf": 0})
+    """The number of durations per bucket, keyed by the upper bound of the bucket in milliseconds"""
+    count: int = 0
+    """The number of durations observed"""
+    sum_ms: float = 0.0
+    """The sum of the durations observed, in milliseconds"""
+    max_ms: float = 0.0
+    """The longest duration observed, in milliseconds"""
+
+    def observe(self, duration_ms: float) -> None:
+        index = bisect_left(LATENCY_BUCKETS_MS, duration_ms)
+        key = str(LATENCY_BUCKETS_MS[index]) if index < len(LATENCY_BUCKETS_MS) else "+Inf"
+        self.buckets[key] += 1
+        self.count += 1
+        self.sum_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+
+    def _quantile(self, quantile: float) -> float:
+        """Estimates a quantile by interpolating linearly within the bucket holding it, capped by the longest duration."""
+        if not self.count:
+            return 0.0
+        rank = quantile * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets.values()):
+            if count and seen + count >= rank:
+                return min(lower + (bound - lower) * (rank - seen) / count, self.max_ms)
+            seen += count
+            lower = bound
+        return self.max_ms
+
+    @computed_field
+    @property
+    def mean_ms(self) -> float:
+        return self.sum_ms / self.count if self.count else 0.0
+
+    @computed_field
+    @property
+    def p50_ms(self) -> float:
+        return self._quantile(0.5)
+
+    @computed_field
+    @property
+    def p95_ms(self) -> float:
+        return self._quantile(0.95)
+
+    @computed_field
+    @property
+    def p99_ms(self) -> float:
+        return self._quantile(0.99)
@@ -20,6 +20,12 @@ class LLMConfig(BaseModel):
     """The model context window"""
     max_tokens: int | None = None
     """The maximum number of tokens in the generated completion"""
+    keep_alive: bool = True
+    """Reuse pooled connections to the provider across calls. When False, the connection is closed after each call"""
+    idle_timeout: float = 60
+    """The number of seconds an idle pooled connection is kept open"""
+    max_connections: int = 100
+    """The maximum number of simultaneous connections to the provider"""
 
     @functools.cached_property
     def token_counter(self) -> Callable[[str], int]:
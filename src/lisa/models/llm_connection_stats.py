@@ -0,0 +1,15 @@
+from pydantic import BaseModel, computed_field
+
+
+class LLMConnectionStats(BaseModel):
+    requests: int = 0
+    new_connections: int = 0
+    """The number of requests that had to open a new connection to the provider"""
+    reused_connections: int = 0
+    """The number of requests sent over a pooled keep-alive connection"""
+    open_clients: int = 0
+
+    @computed_field
+    @property
+    def reuse_ratio(self) -> float:
+        return self.reused_connections / self.requests if self.requests else 0.0
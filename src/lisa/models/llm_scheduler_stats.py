@@ -0,0 +1,29 @@
+from pydantic import BaseModel, ConfigDict, computed_field
+
+
+class LLMSchedulerStats(BaseModel):
+    model_config = ConfigDict(use_attribute_docstrings=True)
+
+    in_flight: int = 0
+    """The number of LLM calls currently admitted"""
+    queue_depth: int = 0
+    """The number of LLM calls waiting for admission"""
+    queue_depth_first_hop: int = 0
+    """The number of waiting LLM calls answering a user message, served before the follow-up calls after tools"""
+    tokens_last_minute: int = 0
+    """The tokens admitted over the budget window, estimated until the calls report their usage"""
+    admitted: int = 0
+    queued: int = 0
+    """The number of admitted calls that had to wait"""
+    rejected: int = 0
+    """The number of calls rejected at once because the queue was full"""
+    timed_out: int = 0
+    """The number of calls rejected after waiting too long in the queue"""
+    wait_ms_total: float = 0
+    wait_ms_max: float = 0
+
+    @computed_field
+    @property
+    def mean_wait_ms(self) -> float:
+        """The mean wait of the calls that had to wait"""
+        return self.wait_ms_total / self.queued if self.queued else 0.0
@@ -0,0 +1,19 @@
+from pydantic import BaseModel, computed_field
+
+
+class RecognizerStats(BaseModel):
+    fast_path: int = 0
+    """The number of phrases resolved by the local French date parser"""
+    remote: int = 0
+    """The number of phrases sent to the Recognizers service"""
+    speculative: int = 0
+    """The number of user messages recognized for a speculative prefetch, counted apart from the phrases above"""
+    speculative_remote: int = 0
+    """The number of these user messages sent to the Recognizers service"""
+
+    @computed_field
+    @property
+    def fast_path_share(self) -> float:
+        """The share of phrases resolved without calling the Recognizers service"""
+        total = self.fast_path + self.remote
+        return self.fast_path / total if total else 0.0
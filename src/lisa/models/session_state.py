@@ -0,0 +1,15 @@
+from typing import Any
+
+from pydantic import BaseModel, ConfigDict
+
+from lisa.models.base_agent_usage import BaseAgentUsage
+
+
+class SessionState(BaseModel):
+    model_config = ConfigDict(use_attribute_docstrings=True)
+
+    messages: list[dict[str, Any]]
+    """The message history of the agent, system messages included"""
+    agent_usage: BaseAgentUsage = BaseAgentUsage()
+    version: int = 0
+    """The number of times the session was saved, which tells a stale agent of another worker from the stored state"""
@@ -0,0 +1,32 @@
+from pydantic import BaseModel, computed_field
+
+
+class SessionStoreStats(BaseModel):
+    live_sessions: int = 0
+    """The number of agents held in memory by this worker"""
+    pending_writes: int = 0
+    """The number of sessions changed since the last flush"""
+    rehydrations: int = 0
+    """The number of agents rebuilt from the store, after an eviction, a restart or on another worker"""
+    evictions: int = 0
+    stale_reloads: int = 0
+    """The number of live agents rebuilt from the store, as another worker had saved a newer state of their session"""
+    expired: int = 0
+    """The number of session states deleted from the store, not saved for longer than its TTL"""
+    saves: int = 0
+    """The number of session changes handed to the write-behind buffer"""
+    flushes: int = 0
+    sessions_written: int = 0
+    """The number of session states written to the store, several changes of a session between flushes counting once"""
+    bytes_written: int = 0
+    flush_ms_total: float = 0
+
+    @computed_field
+    @property
+    def mean_batch_size(self) -> float:
+        return self.sessions_written / self.flushes if self.flushes else 0.0
+
+    @computed_field
+    @property
+    def mean_bytes_per_session(self) -> float:
+        return self.bytes_written / self.sessions_written if self.sessions_written else 0.0
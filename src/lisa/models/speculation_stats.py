@@ -0,0 +1,28 @@
+from pydantic import BaseModel, computed_field
+
+
+class SpeculationStats(BaseModel):
+    started: int = 0
+    """The number of speculations started, one per user message and speculated tool"""
+    unresolved: int = 0
+    """The number of speculations dropped because the user message gave no key, such as no recognizable date"""
+    hits: int = 0
+    """The number of tool calls served with the speculative result"""
+    misses: int = 0
+    """The number of tool calls whose arguments differed from the speculation"""
+    unused: int = 0
+    """The number of speculations whose tool was not called during the turn"""
+    failed: int = 0
+    saved_ms_total: float = 0
+    """The total time of speculative loading already done when the tool asked for it"""
+
+    @computed_field
+    @property
+    def hit_rate(self) -> float:
+        """The share of the speculations that served a tool call"""
+        return self.hits / self.started if self.started else 0.0
+
+    @computed_field
+    @property
+    def mean_saved_ms(self) -> float:
+        return self.saved_ms_total / self.hits if self.hits else 0.0
@@ -0,0 +1,47 @@
+from dataclasses import dataclass
+from typing import Any
+
+# Text deltas are streamed as the delta strings themselves, so that no object is allocated per token
+TextDelta = str
+
+
+@dataclass(slots=True, frozen=True)
+class ToolStart:
+    tool_call_id: str
+    name: str
+    arguments: str
+
+
+@dataclass(slots=True, frozen=True)
+class ToolEnd:
+    tool_call_id: str
+    name: str
+    content: str
+
+
+@dataclass(slots=True, frozen=True)
+class Finish:
+    finish_reason: str | None
+    """The reason the model stopped generating tokens, following the OpenAI convention"""
+    usage: dict[str, Any] | None = None
+    """The provider usage of the last LLM call of the turn, when available"""
+
+
+@dataclass(slots=True, frozen=True)
+class SentenceChunk:
+    text: str
+    """A complete sentence or clause, ready to be spoken"""
+    started_at: float
+    """When the answer was requested, on the `time.perf_counter` clock"""
+    first_token_at: float
+    """When the first token of the chunk was received"""
+    ready_at: float
+    """When the end of the chunk was detected"""
+
+    @property
+    def time_to_ready_ms(self) -> float:
+        """The time from the request to the chunk being ready, which is the time to first audio of a first chunk"""
+        return (self.ready_at - self.started_at) * 1000
+
+
+StreamEvent = TextDelta | ToolStart | ToolEnd | Finish
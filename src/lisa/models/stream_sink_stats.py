@@ -0,0 +1,27 @@
+import time
+
+from pydantic import BaseModel, ConfigDict, Field, computed_field
+
+
+class StreamSinkStats(BaseModel):
+    model_config = ConfigDict(use_attribute_docstrings=True)
+
+    deltas: int = 0
+    """The number of deltas written to the sinks"""
+    emits: int = 0
+    """The number of emits to the clients, each one carrying one or more deltas"""
+    flush_reasons: dict[str, int] = {}
+    """The number of emits, per reason: first, size, sentence, interval, timer or close"""
+    started_at: float = Field(default_factory=time.monotonic, exclude=True)
+
+    @computed_field
+    @property
+    def deltas_per_emit(self) -> float:
+        return self.deltas / self.emits if self.emits else 0.0
+
+    @computed_field
+    @property
+    def emits_per_second(self) -> float:
+        """The mean emit rate since the process started"""
+        elapsed = time.monotonic() - self.started_at
+        return self.emits / elapsed if elapsed > 0 else 0.0
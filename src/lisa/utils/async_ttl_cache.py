@@ -0,0 +1,104 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+from lisa.models.cache_stats import CacheStats
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+# Tells a missing entry from a cached None, such as of a phrase that is not a date
+_MISSING = object()
+
+
+class AsyncTTLCache(Generic[K, V]):
+    """Bounded LRU cache whose entries expire after a TTL, with single-flight loading.
+
+    Concurrent lookups of a missing key share one call to the loader instead of each calling it.
+    Failed loads are not cached.
+    """
+
+    def __init__(self, ttl: float, max_size: int) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._inflight: dict[K, asyncio.Future] = {}
+        self._generation = 0
+        self._stats = CacheStats(max_size=max_size, ttl=ttl)
+
+    def get(self, key: K, default: V | None = None) -> V | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self._stats.expirations += 1
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    async def get_or_load(self, key: K, loader: Callable[[], Awaitable[V]]) -> V:
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            self._stats.hits += 1
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._stats.coalesced += 1
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+            # The caller that started the load was cancelled, load it again on behalf of this one
+            return await self.get_or_load(key, loader)
+
+        self._stats.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        generation = self._generation
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved, in case no other caller was waiting for it
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            # Do not store a value loaded before an invalidation, it may already be stale
+            if generation == self._generation:
+                self.put(key, value)
+            return value
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def put(self, key: K, value: V) -> None:
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._stats.evictions += 1
+
+    def invalidate(self, predicate: Callable[[K, V], bool] | None = None) -> int:
+        """Removes the entries matching the predicate, or all entries if no predicate is given."""
+        self._generation += 1
+        keys = [key for key, (_, value) in self._entries.items() if predicate is None or predicate(key, value)]
+        for key in keys:
+            del self._entries[key]
+        # Lookups arriving from now on must not join a load started before the invalidation
+        self._inflight.clear()
+        self._stats.invalidations += len(keys)
+        return len(keys)
+
+    def stats(self) -> CacheStats:
+        return self._stats.model_copy(update={"size": len(self._entries)})
@@ -0,0 +1,83 @@
+import asyncio
+import os
+from collections.abc import Awaitable, Callable
+
+from lisa.models.stream_sink_stats import StreamSinkStats
+from lisa.utils.metrics import metrics
+
+SENTENCE_ENDINGS = (".", "!", "?", "…", "\n")
+
+stream_sink_stats = StreamSinkStats()
+metrics.register("stream_sinks", lambda: stream_sink_stats)
+
+
+class BufferedStreamSink:
+    """Coalesces streamed deltas into fewer emits to the client.
+
+    The first delta is emitted immediately, so that the perceived latency is unchanged. The following deltas are
+    buffered, and emitted once `flush_interval` seconds have passed since the last emit, once the buffer holds
+    `max_chars` characters, or at the end of a sentence, whichever comes first. A timer emits the buffer when the
+    stream pauses, for instance while tools run.
+    """
+
+    def __init__(
+        self,
+        emit: Callable[[str], Awaitable[None]],
+        flush_interval: float = float(os.environ.get("STREAM_FLUSH_INTERVAL_MS", "40")) / 1000,
+        max_chars: int = int(os.environ.get("STREAM_FLUSH_MAX_CHARS", "200")),
+        stats: StreamSinkStats = stream_sink_stats,
+    ) -> None:
+        self.emit = emit
+        self.flush_interval = flush_interval
+        self.max_chars = max_chars
+        self.stats = stats
+        self._buffer: list[str] = []
+        self._buffered_chars = 0
+        self._last_emit: float | None = None
+        self._timer: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+
+    async def write(self, delta: str) -> None:
+        if not delta:
+            return
+        self.stats.deltas += 1
+        self._buffer.append(delta)
+        self._buffered_chars += len(delta)
+        now = asyncio.get_running_loop().time()
+        if self._last_emit is None:
+            await self.flush("first")
+        elif self._buffered_chars >= self.max_chars:
+            await self.flush("size")
+        elif delta.rstrip(" ").endswith(SENTENCE_ENDINGS):
+            await self.flush("sentence")
+        elif now - self._last_emit >= self.flush_interval:
+            await self.flush("interval")
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later(self._last_emit + self.flush_interval - now))
+
+    async def flush(self, reason: str = "close") -> None:
+        # The timer is only cancelled while it waits, never while it emits
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        async with self._lock:
+            if not self._buffer:
+                return
+            text = "".join(self._buffer)
+            self._buffer.clear()
+            self._buffered_chars = 0
+            self._last_emit = asyncio.get_running_loop().time()
+            self.stats.emits += 1
+            self.stats.flush_reasons[reason] = self.stats.flush_reasons.get(reason, 0) + 1
+            await self.emit(text)
+
+    async def _flush_later(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        self._timer = None
+        await self.flush("timer")
+
+    async def __aenter__(self) -> "BufferedStreamSink":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.flush("close")
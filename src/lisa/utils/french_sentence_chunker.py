@@ -0,0 +1,132 @@
+import re
+import time
+
+from lisa.models.stream_events import SentenceChunk
+
+# Punctuation followed by a whitespace, so that decimals ("3.5", "12,50") and times ("14:30") never end a chunk.
+# A boundary at the very end of the text is only confirmed once the next delta arrives.
+BOUNDARY_PATTERN = re.compile(r"[.!?…;:,]+(?=\s)|\n")
+SENTENCE_PUNCTUATION = frozenset("!?…\n")
+CLAUSE_PUNCTUATION = frozenset(",;:")
+
+# Lowercased words commonly abbreviated with a period in French, which do not end a sentence
+ABBREVIATIONS = frozenset(
+    {
+        "m",
+        "mm",
+        "mme",
+        "mmes",
+        "mlle",
+        "mlles",
+        "dr",
+        "pr",
+        "mgr",
+        "st",
+        "ste",
+        "av",
+        "bd",
+        "cf",
+        "ex",
+        "env",
+        "tél",
+        "tel",
+        "no",
+        "n°",
+        "réf",
+        "ref",
+        "chap",
+        "fig",
+        "vol",
+        "janv",
+        "févr",
+        "fév",
+        "avr",
+        "juil",
+        # "sept" is left out, as it is the number seven as well ("à sept.")
+        "oct",
+        "nov",
+        "déc",
+    }
+)
+
+
+class FrenchSentenceChunker:
+    """Splits a stream of text deltas into speakable French sentences and clauses.
+
+    A chunk ends at a sentence punctuation, or at a clause punctuation once it holds at least `min_clause_chars`
+    characters, so that a text-to-speech stage can start speaking the first chunk while the rest is generated.
+    Abbreviations such as "M." or "p.ex." and numbers such as "3,5" or "14:30" never end a chunk. A chunk reaching
+    `max_chars` characters without a boundary is split at its last space.
+    """
+
+    def __init__(self, min_clause_chars: int = 40, max_chars: int = 300, started_at: float | None = None) -> None:
+        self.min_clause_chars = min_clause_chars
+        self.max_chars = max_chars
+        self.started_at = time.perf_counter() if started_at is None else started_at
+        self._pending = ""
+        self._scan_from = 0
+        self._first_token_at: float | None = None
+
+    def feed(self, delta: str) -> list[SentenceChunk]:
+        """Adds a delta, and returns the chunks it completed."""
+        if not delta:
+            return []
+        now = time.perf_counter()
+        if self._first_token_at is None:
+            self._first_token_at = now
+        self._pending += delta
+
+        chunks = []
+        chunk_start = 0
+        for match in BOUNDARY_PATTERN.finditer(self._pending, self._scan_from):
+            if self._is_boundary(self._pending[chunk_start : match.end()], match.group()):
+                chunks.append(self._pending[chunk_start : match.end()])
+                chunk_start = match.end()
+        if chunk_start:
+            self._pending = self._pending[chunk_start:]
+        while len(self._pending) > self.max_chars:
+            split_at = self._pending.rfind(" ", 1, self.max_chars + 1)
+            split_at = split_at if split_at > 0 else self.max_chars
+            chunks.append(self._pending[:split_at])
+            self._pending = self._pending[split_at:].lstrip()
+        # The punctuation at the end of the text is scanned again with the next delta
+        self._scan_from = len(self._pending.rstrip(".!?…;:,"))
+        return self._make_chunks(chunks, now)
+
+    def finish(self) -> list[SentenceChunk]:
+        """Returns the text left at the end of the stream."""
+        chunks, self._pending, self._scan_from = [self._pending], "", 0
+        return self._make_chunks(chunks, time.perf_counter())
+
+    def _is_boundary(self, chunk: str, punctuation: str) -> bool:
+        if not SENTENCE_PUNCTUATION.isdisjoint(punctuation) or len(punctuation) > 1:
+            return True
+        if punctuation in CLAUSE_PUNCTUATION:
+            return len(chunk.strip()) >= self.min_clause_chars
+        return not _ends_with_abbreviation(chunk)
+
+    def _make_chunks(self, texts: list[str], ready_at: float) -> list[SentenceChunk]:
+        chunks = []
+        for text in texts:
+            text = text.strip()
+            if not text:
+                continue
+            chunks.append(
+                SentenceChunk(text=text, started_at=self.started_at, first_token_at=self._first_token_at, ready_at=ready_at)
+            )
+            # The text following the boundary arrived with the delta that completed the chunk
+            self._first_token_at = ready_at
+        if not self._pending.strip():
+            self._first_token_at = None
+        return chunks
+
+
+def _ends_with_abbreviation(chunk: str) -> bool:
+    words = chunk[:-1].split()
+    if not words:
+        return False
+    word = words[-1].lstrip("(«\"'")
+    # Initials ("J. Dupont") and dotted abbreviations ("p.ex.", "c.-à-d.")
+    if (len(word) == 1 and word.isupper()) or ("." in word and not any(c.isdigit() for c in word)):
+        return True
+    return word.lower() in ABBREVIATIONS
@@ -1,11 +1,16 @@
 import asyncio
+import dataclasses
 import json
+from dataclasses import dataclass
+from datetime import date, datetime, time
+from enum import Enum
 from functools import partial
 from inspect import Parameter, signature
 from typing import Any, Callable, Optional, cast
 
 from litellm.types.utils import ChatCompletionMessageToolCall
 from openai_function_calling import Function, FunctionDict, FunctionInferrer, JsonSchemaType, ParameterDict
+from pydantic import BaseModel, ConfigDict, ValidationError, create_model
 
 
 def remove_unwanted_whitespaces(s: str):
@@ -103,21 +108,118 @@ def convert_to_openai_tool(
     return {"type": "function", "function": tool_json_schema}
 
 
-async def execute_tool(tool_call: ChatCompletionMessageToolCall, tool_dict: dict[str, Callable], **extra_tool_args):
+def tool_result_formatter(formatter: Callable[[Any], str]) -> Callable[[Callable], Callable]:
+    """Decorates a tool with the function encoding its results, instead of the default compact JSON encoding."""
+
+    def decorate(function: Callable) -> Callable:
+        function.tool_result_formatter = formatter
+        return function
+
+    return decorate
+
+
+def encode_tool_result(result: Any, formatter: Callable[[Any], str] | None = None) -> str:
+    """Encodes a tool result into the content of its tool message.
+
+    Strings are kept as they are. Other results are given to the formatter of the tool if any, or encoded as compact
+    JSON otherwise: no whitespace, no null values, non-ASCII characters kept as is, and sets sorted, so that the same
+    result always gives the same content.
+    """
+    if isinstance(result, str):
+        return result
+    if formatter is not None:
+        return formatter(result)
+    return json.dumps(_to_compact_jsonable(result), ensure_ascii=False, separators=(",", ":"))
+
+
+def _to_compact_jsonable(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return _to_compact_jsonable(value.model_dump(exclude_none=True))
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return _to_compact_jsonable({field.name: getattr(value, field.name) for field in dataclasses.fields(value)})
+    if isinstance(value, dict):
+        return {str(key): _to_compact_jsonable(item) for key, item in value.items() if item is not None}
+    if isinstance(value, (list, tuple)):
+        return [_to_compact_jsonable(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted(_to_compact_jsonable(item) for item in value)
+    if isinstance(value, datetime):
+        # Dates without a time are the most common, and the shortest
+        return value.date().isoformat() if value.time() == time() else value.isoformat(timespec="minutes")
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+@dataclass(frozen=True, slots=True)
+class RegisteredTool:
+    name: str
+    function: Callable
+    schema: dict[str, Any]
+    """The OpenAI tool schema, shared by every session: it must not be modified"""
+    arguments_model: type[BaseModel]
+    """Validates and converts the JSON arguments of a call, as described by the schema"""
+    result_formatter: Callable[[Any], str] | None = None
+
+    def parse_arguments(self, arguments: str | None) -> dict[str, Any]:
+        try:
+            parsed = self.arguments_model.model_validate_json(arguments or "{}")
+        except ValidationError as e:
+            raise ValueError(f"Invalid arguments for the tool {self.name}: {e}") from None
+        return {field: getattr(parsed, field) for field in parsed.model_fields_set}
+
+
+class ToolRegistry:
+    """Process-wide registry building the schema and the argument validator of each tool once.
+
+    Tools are registered on first use, so that sessions share the result instead of inspecting the tool functions
+    again on every chat start.
+    """
+
+    def __init__(self) -> None:
+        self._tools: dict[Callable, RegisteredTool] = {}
+
+    def get(self, function: Callable) -> RegisteredTool:
+        tool = self._tools.get(function)
+        if tool is None:
+            tool = self._tools[function] = _build_tool(function)
+        return tool
+
+
+def _build_tool(function: Callable) -> RegisteredTool:
+    schema = convert_to_openai_tool(function)
+    parameters = signature(function).parameters
+    fields = {}
+    for name in schema["function"]["parameters"]["properties"]:
+        parameter = parameters[name]
+        annotation = Any if parameter.annotation is Parameter.empty else parameter.annotation
+        default = ... if parameter.default is Parameter.empty else parameter.default
+        fields[name] = (annotation, default)
+    name = schema["function"]["name"]
+    arguments_model = create_model(f"{name}_arguments", __config__=ConfigDict(extra="forbid"), **fields)
+    wrapped = function.func if isinstance(function, partial) else function
+    return RegisteredTool(
+        name=name,
+        function=function,
+        schema=schema,
+        arguments_model=arguments_model,
+        result_formatter=getattr(wrapped, "tool_result_formatter", None),
+    )
+
+
+tool_registry = ToolRegistry()
+
+
+async def execute_tool(tool_call: ChatCompletionMessageToolCall, tool_dict: dict[str, Callable], **extra_tool_args) -> str:
     tool_name = tool_call.function.name
     if tool_name not in tool_dict:
         raise ValueError(f"{tool_name} is not a valid tool name.")
 
-    try:
-        if tool_call.function.arguments:
-            tool_args = json.loads(tool_call.function.arguments)
-        else:
-            tool_args = {}
-    except json.JSONDecodeError as ex:
-        raise ValueError(f"Tool call arguments were provided in an invalid JSON: {ex}") from None
-
-    func_result = tool_dict[tool_name](**(tool_args | extra_tool_args))
+    tool = tool_registry.get(tool_dict[tool_name])
+    tool_args = tool.parse_arguments(tool_call.function.arguments)
+    func_result = tool.function(**(tool_args | extra_tool_args))
     if asyncio.iscoroutine(func_result):
-        return await func_result
-    else:
-        return func_result
+        func_result = await func_result
+    return encode_tool_result(func_result, tool.result_formatter)
@@ -0,0 +1,76 @@
+import asyncio
+import logging
+
+import aiohttp
+
+from lisa.models.http_pool_config import HttpPoolConfig
+from lisa.models.http_pool_stats import HttpPoolStats
+from lisa.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class HttpClientPool:
+    """Process-wide keep-alive aiohttp sessions, one per upstream service.
+
+    Each upstream gets its own connector, so connection limits and the DNS cache are shared by every call to that
+    upstream instead of being rebuilt per request. Sessions are created lazily on the running event loop, and
+    recreated if the loop they were bound to is gone.
+    """
+
+    def __init__(self) -> None:
+        self._configs: dict[str, HttpPoolConfig] = {}
+        self._sessions: dict[str, tuple[asyncio.AbstractEventLoop, aiohttp.ClientSession]] = {}
+
+    def configure(self, upstream: str, config: HttpPoolConfig) -> None:
+        self._configs[upstream] = config
+
+    def session(self, upstream: str) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        entry = self._sessions.get(upstream)
+        if entry is not None:
+            session_loop, session = entry
+            if session_loop is loop and not session.closed:
+                return session
+        config = self._configs.setdefault(upstream, HttpPoolConfig.from_env(upstream))
+        connector = aiohttp.TCPConnector(
+            limit=config.limit,
+            limit_per_host=config.limit_per_host,
+            keepalive_timeout=config.keepalive_timeout,
+            ttl_dns_cache=config.ttl_dns_cache,
+            use_dns_cache=True,
+        )
+        session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=config.total_timeout))
+        self._sessions[upstream] = (loop, session)
+        logger.info(f"Opened HTTP connection pool for upstream '{upstream}': {config.model_dump()}")
+        return session
+
+    async def start(self, *upstreams: str) -> None:
+        for upstream in upstreams or tuple(self._configs):
+            self.session(upstream)
+
+    async def close(self) -> None:
+        sessions, self._sessions = self._sessions, {}
+        for session_loop, session in sessions.values():
+            if session_loop is asyncio.get_running_loop():
+                await session.close()
+
+    def stats(self) -> dict[str, HttpPoolStats]:
+        stats = {}
+        for upstream, (_, session) in self._sessions.items():
+            connector = session.connector
+            if connector is None or connector.closed:
+                continue
+            # aiohttp does not expose pool occupancy publicly, so read it from the connector internals
+            stats[upstream] = HttpPoolStats(
+                in_use=len(getattr(connector, "_acquired", ())),
+                idle=sum(len(conns) for conns in getattr(connector, "_conns", {}).values()),
+                waiters=sum(len(waiters) for waiters in getattr(connector, "_waiters", {}).values()),
+                limit=connector.limit,
+                limit_per_host=connector.limit_per_host,
+            )
+        return stats
+
+
+http_client_pool = HttpClientPool()
+metrics.register("http_pools", http_client_pool.stats)
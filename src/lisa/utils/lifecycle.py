@@ -0,0 +1,43 @@
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable
+
+from fastapi import FastAPI
+
+_startup_hooks: list[Callable[[], Awaitable[None]]] = []
+_shutdown_hooks: list[Callable[[], Awaitable[None]]] = []
+
+
+def on_startup(hook: Callable[[], Awaitable[None]]) -> Callable[[], Awaitable[None]]:
+    if hook not in _startup_hooks:
+        _startup_hooks.append(hook)
+    return hook
+
+
+def on_shutdown(hook: Callable[[], Awaitable[None]]) -> Callable[[], Awaitable[None]]:
+    if hook not in _shutdown_hooks:
+        _shutdown_hooks.append(hook)
+    return hook
+
+
+def install_lifespan(app: FastAPI) -> None:
+    """Runs the registered hooks within the lifespan of the given app.
+
+    The shutdown hooks run before the wrapped lifespan exits, because the Chainlit lifespan ends the process.
+    """
+    if getattr(app.router, "_lisa_lifespan_installed", False):
+        return
+    wrapped_lifespan = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        async with wrapped_lifespan(app) as state:
+            for hook in _startup_hooks:
+                await hook()
+            try:
+                yield state
+            finally:
+                for hook in reversed(_shutdown_hooks):
+                    await hook()
+
+    app.router.lifespan_context = lifespan
+    app.router._lisa_lifespan_installed = True
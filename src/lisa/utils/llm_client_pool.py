@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import weakref
+
+import httpx
+import openai
+from openai import AsyncAzureOpenAI, AsyncOpenAI
+
+from lisa.models.llm_config import LLMConfig
+from lisa.models.llm_connection_stats import LLMConnectionStats
+from lisa.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# The providers whose litellm handlers accept a pre-built OpenAI client
+POOLED_PROVIDERS = ("openai", "azure")
+
+
+class LLMClientPool:
+    """Process-wide provider clients that keep their connections alive across calls and sessions.
+
+    Agents sharing the same endpoint and credentials share one client, hence one connection pool, so that the TLS
+    handshake is paid once rather than on every LLM call.
+    """
+
+    def __init__(self) -> None:
+        self._clients: dict[tuple, tuple[asyncio.AbstractEventLoop, AsyncOpenAI]] = {}
+        self._seen_streams: weakref.WeakSet = weakref.WeakSet()
+        self._stats = LLMConnectionStats()
+
+    def client(self, llm_config: LLMConfig) -> AsyncOpenAI | None:
+        """Returns the pooled client for the config, or None if its provider cannot be given a client."""
+        if not llm_config.keep_alive or llm_config.provider not in POOLED_PROVIDERS:
+            return None
+        loop = asyncio.get_running_loop()
+        key = (
+            llm_config.provider,
+            llm_config.base_url,
+            llm_config.api_key,
+            llm_config.api_version,
+            llm_config.idle_timeout,
+            llm_config.max_connections,
+        )
+        entry = self._clients.get(key)
+        if entry is not None and entry[0] is loop and not entry[1].is_closed():
+            return entry[1]
+
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=llm_config.max_connections,
+                max_keepalive_connections=llm_config.max_connections,
+                keepalive_expiry=llm_config.idle_timeout,
+            ),
+            timeout=httpx.Timeout(600, connect=5),
+            event_hooks={"response": [self._on_response]},
+        )
+        if llm_config.provider == "azure":
+            client = AsyncAzureOpenAI(
+                api_key=llm_config.api_key,
+                azure_endpoint=llm_config.base_url,
+                api_version=llm_config.api_version,
+                http_client=http_client,
+            )
+        else:
+            client = AsyncOpenAI(api_key=llm_config.api_key, base_url=llm_config.base_url, http_client=http_client)
+        self._clients[key] = (loop, client)
+        return client
+
+    async def warm_up(self, llm_config: LLMConfig) -> None:
+        """Opens a connection to the provider ahead of the first LLM call."""
+        client = self.client(llm_config)
+        if client is None:
+            return
+        try:
+            await client.with_options(max_retries=0, timeout=10).models.list()
+        except openai.APIError as e:
+            # The connection is open even if the endpoint refuses to list the models
+            logger.info(f"LLM connection warm-up got an error response: {e}")
+
+    async def close(self) -> None:
+        clients, self._clients = self._clients, {}
+        for client_loop, client in clients.values():
+            if client_loop is asyncio.get_running_loop():
+                await client.close()
+
+    async def _on_response(self, response: httpx.Response) -> None:
+        self._stats.requests += 1
+        network_stream = response.extensions.get("network_stream")
+        if network_stream is None:
+            return
+        if network_stream in self._seen_streams:
+            self._stats.reused_connections += 1
+        else:
+            self._seen_streams.add(network_stream)
+            self._stats.new_connections += 1
+
+    def stats(self) -> LLMConnectionStats:
+        return self._stats.model_copy(update={"open_clients": len(self._clients)})
+
+
+llm_client_pool = LLMClientPool()
+metrics.register("llm_connections", llm_client_pool.stats)
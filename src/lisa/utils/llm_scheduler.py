@@ -0,0 +1,212 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+
+from lisa.exceptions.llm_over_capacity_error import LLMOverCapacityError
+from lisa.models.llm_scheduler_stats import LLMSchedulerStats
+from lisa.utils.metrics import metrics
+
+FIRST_HOP, FOLLOW_UP = 0, 1
+
+
+@dataclass(slots=True, eq=False)
+class _Waiter:
+    session_id: str
+    tokens: int
+    priority: int
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class LLMTicket:
+    """The admission of an LLM call, to be released once the call has ended."""
+
+    def __init__(self, scheduler: "LLMScheduler", window_entry: list) -> None:
+        self._scheduler = scheduler
+        self._window_entry = window_entry
+        self._released = False
+
+    def update_tokens(self, tokens: int) -> None:
+        """Replaces the estimated tokens of the call by its actual usage, in the tokens-per-minute budget."""
+        self._scheduler._update_window_entry(self._window_entry, tokens)
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._scheduler._release()
+
+
+class LLMScheduler:
+    """Process-wide admission control of the LLM calls of every session.
+
+    At most `max_in_flight` calls run at once, and at most `tokens_per_minute` tokens are admitted over a sliding
+    `window` of seconds. Excess calls wait in a queue where the first LLM call of a user turn goes before the
+    follow-up calls made after tools, and where sessions are served in turn, so that one busy session cannot starve
+    the others. A call is rejected at once with `LLMOverCapacityError` when `max_queue_size` calls are already
+    waiting, or after waiting `max_wait` seconds.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 64,
+        tokens_per_minute: int | None = None,
+        max_queue_size: int = 256,
+        max_wait: float = 10,
+        window: float = 60,
+    ) -> None:
+        self.max_in_flight = max_in_flight
+        self.tokens_per_minute = tokens_per_minute
+        self.max_queue_size = max_queue_size
+        self.max_wait = max_wait
+        self.window = window
+        self._in_flight = 0
+        # Per priority, the waiting calls of each session, sessions being served in the order of the dict
+        self._queues: list[OrderedDict[str, deque[_Waiter]]] = [OrderedDict(), OrderedDict()]
+        self._queue_depth = 0
+        self._window_entries: deque[list] = deque()
+        self._window_tokens = 0
+        self._timer: asyncio.TimerHandle | None = None
+        self._stats = LLMSchedulerStats()
+
+    async def acquire(self, session_id: str, tokens: int = 0, first_hop: bool = True) -> LLMTicket:
+        """Waits for the admission of an LLM call of `tokens` estimated tokens."""
+        if self._queue_depth == 0 and self._can_admit(tokens):
+            return self._admit(tokens)
+        if self._queue_depth >= self.max_queue_size:
+            self._stats.rejected += 1
+            raise LLMOverCapacityError(
+                f"The LLM queue is full ({self._queue_depth} calls waiting)",
+                queue_depth=self._queue_depth,
+                in_flight=self._in_flight,
+            )
+
+        waiter = _Waiter(session_id, tokens, FIRST_HOP if first_hop else FOLLOW_UP, asyncio.get_running_loop().create_future())
+        self._queues[waiter.priority].setdefault(session_id, deque()).append(waiter)
+        self._queue_depth += 1
+        self._schedule_window_timer()
+        try:
+            async with asyncio.timeout(self.max_wait):
+                return await waiter.future
+        except BaseException as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Admitted while being cancelled
+                waiter.future.result().release()
+            else:
+                self._remove(waiter)
+            if isinstance(e, TimeoutError):
+                self._stats.timed_out += 1
+                raise LLMOverCapacityError(
+                    f"The LLM call waited more than {self.max_wait} seconds in the queue",
+                    queue_depth=self._queue_depth,
+                    in_flight=self._in_flight,
+                ) from None
+            raise
+
+    def _can_admit(self, tokens: int) -> bool:
+        if self._in_flight >= self.max_in_flight:
+            return False
+        if self.tokens_per_minute is None:
+            return True
+        self._prune_window()
+        # A call larger than the whole budget is still admitted once the window is empty
+        return self._window_tokens + tokens <= self.tokens_per_minute or self._window_tokens == 0
+
+    def _admit(self, tokens: int, waiter: _Waiter | None = None) -> LLMTicket:
+        self._in_flight += 1
+        self._stats.admitted += 1
+        if waiter is not None:
+            wait_ms = (time.monotonic() - waiter.enqueued_at) * 1000
+            self._stats.queued += 1
+            self._stats.wait_ms_total += wait_ms
+            self._stats.wait_ms_max = max(self._stats.wait_ms_max, wait_ms)
+        window_entry = [time.monotonic(), tokens]
+        if self.tokens_per_minute is not None:
+            self._window_entries.append(window_entry)
+            self._window_tokens += tokens
+        return LLMTicket(self, window_entry)
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self._queue_depth:
+            priority, session_id = next((p, next(iter(queue))) for p, queue in enumerate(self._queues) if queue)
+            session_queue = self._queues[priority][session_id]
+            waiter = session_queue[0]
+            # The head of the queue is not overtaken, so that large calls are not starved by smaller ones
+            if not waiter.future.done() and not self._can_admit(waiter.tokens):
+                break
+            session_queue.popleft()
+            if session_queue:
+                self._queues[priority].move_to_end(session_id)
+            else:
+                del self._queues[priority][session_id]
+            self._queue_depth -= 1
+            if waiter.future.done():
+                # Cancelled while its task has not yet run to leave the queue: it is dropped without being admitted
+                continue
+            waiter.future.set_result(self._admit(waiter.tokens, waiter))
+        self._schedule_window_timer()
+
+    def _remove(self, waiter: _Waiter) -> None:
+        session_queue = self._queues[waiter.priority].get(waiter.session_id)
+        if session_queue is None or waiter not in session_queue:
+            return
+        session_queue.remove(waiter)
+        if not session_queue:
+            del self._queues[waiter.priority][waiter.session_id]
+        self._queue_depth -= 1
+        # The removed call may have been the head of the queue blocking the others
+        self._dispatch()
+
+    def _prune_window(self) -> None:
+        expiry = time.monotonic() - self.window
+        while self._window_entries and self._window_entries[0][0] <= expiry:
+            self._window_tokens -= self._window_entries.popleft()[1]
+
+    def _update_window_entry(self, window_entry: list, tokens: int) -> None:
+        if self.tokens_per_minute is None:
+            return
+        if self._window_entries and window_entry[0] > time.monotonic() - self.window:
+            self._window_tokens += tokens - window_entry[1]
+        window_entry[1] = tokens
+        self._dispatch()
+
+    def _schedule_window_timer(self) -> None:
+        """Wakes the queue up when the oldest tokens leave the budget window, if the budget is what blocks it."""
+        if self._timer is not None or not self._queue_depth or not self._window_entries:
+            return
+        if self._in_flight >= self.max_in_flight:
+            return
+        loop = asyncio.get_running_loop()
+        delay = max(0.0, self._window_entries[0][0] + self.window - time.monotonic())
+        self._timer = loop.call_later(delay, self._on_window_timer)
+
+    def _on_window_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+    def stats(self) -> LLMSchedulerStats:
+        if self.tokens_per_minute is not None:
+            self._prune_window()
+        return self._stats.model_copy(
+            update={
+                "in_flight": self._in_flight,
+                "queue_depth": self._queue_depth,
+                "queue_depth_first_hop": sum(len(queue) for queue in self._queues[FIRST_HOP].values()),
+                "tokens_last_minute": self._window_tokens,
+            }
+        )
+
+
+tokens_per_minute = os.environ.get("LLM_TOKENS_PER_MINUTE")
+llm_scheduler = LLMScheduler(
+    max_in_flight=int(os.environ.get("LLM_MAX_IN_FLIGHT", "64")),
+    tokens_per_minute=int(tokens_per_minute) if tokens_per_minute else None,
+    max_queue_size=int(os.environ.get("LLM_MAX_QUEUE_SIZE", "256")),
+    max_wait=float(os.environ.get("LLM_MAX_QUEUE_WAIT_MS", "10000")) / 1000,
+)
+metrics.register("llm_scheduler", llm_scheduler.stats)
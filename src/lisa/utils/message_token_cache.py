@@ -0,0 +1,29 @@
+from typing import Any, Callable
+
+
+class MessageTokenCache:
+    """Memoizes the token count of each message of a conversation history.
+
+    Messages are identified by identity, so a count is computed once per message dict. A message whose content is
+    replaced in place is counted again.
+    """
+
+    def __init__(self, token_counter: Callable[..., int]) -> None:
+        self.token_counter = token_counter
+        self._counts: dict[int, tuple[dict, Any, int]] = {}
+
+    def count(self, message: dict) -> int:
+        entry = self._counts.get(id(message))
+        content = message.get("content")
+        if entry is not None and entry[0] is message and entry[1] is content:
+            return entry[2]
+        tokens = self.token_counter(messages=[message])
+        # Keeping a reference to the message prevents its id from being reused by another message
+        self._counts[id(message)] = (message, content, tokens)
+        return tokens
+
+    def prune(self, messages: list[dict]) -> None:
+        """Forgets the counts of the messages that are no longer in the history."""
+        if len(self._counts) > 2 * len(messages):
+            ids = {id(message) for message in messages}
+            self._counts = {key: entry for key, entry in self._counts.items() if key in ids}
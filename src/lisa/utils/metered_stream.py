@@ -0,0 +1,91 @@
+import inspect
+import time
+from collections.abc import AsyncIterator, Callable
+
+from litellm.types.utils import Usage
+from litellm.utils import CustomStreamWrapper, ModelResponse
+
+
+class MeteredStream:
+    """Iterates a model stream while measuring it.
+
+    Records when the first token arrived, when the stream ended, the provider usage sent in the final chunk if any,
+    and the streamed completion text for counting its tokens locally otherwise. `on_end` is called with the stream
+    once it is exhausted, has failed or has been closed.
+    """
+
+    def __init__(self, stream: CustomStreamWrapper, on_end: Callable[["MeteredStream"], None]) -> None:
+        self.stream = stream
+        self.on_end = on_end
+        self.first_token_time: float | None = None
+        self.end_time: float | None = None
+        self.usage: Usage | None = None
+        self.completion_parts: list[str] = []
+
+    def __aiter__(self) -> AsyncIterator[ModelResponse]:
+        return self._iterate()
+
+    async def _iterate(self) -> AsyncIterator[ModelResponse]:
+        exhausted = False
+        try:
+            async for chunk in self.stream:
+                self.usage = getattr(chunk, "usage", None) or self.usage
+                delta = chunk.choices[0].delta if chunk.choices else None
+                if delta is not None and (delta.content or delta.tool_calls):
+                    if self.first_token_time is None:
+                        self.first_token_time = time.time()
+                    if delta.content:
+                        self.completion_parts.append(delta.content)
+                    for tc_chunk in delta.tool_calls or []:
+                        self.completion_parts.append(tc_chunk.function.name or "")
+                        self.completion_parts.append(tc_chunk.function.arguments or "")
+                yield chunk
+            exhausted = True
+        finally:
+            self.end_time = time.time()
+            self.on_end(self)
+            if not exhausted:
+                await self._close_provider_stream()
+
+    async def _close_provider_stream(self) -> None:
+        """Closes the connection of a stream abandoned before its end, such as the loser of a hedged call."""
+        close = getattr(getattr(self.stream, "completion_stream", None), "close", None)
+        if close is not None:
+            result = close()
+            if inspect.isawaitable(result):
+                await result
+
+    @property
+    def completion_text(self) -> str:
+        return "".join(self.completion_parts)
+
+
+class PrefetchedStream:
+    """A model stream whose first chunks have been read ahead, up to its first token."""
+
+    def __init__(self, iterator: AsyncIterator[ModelResponse], chunks: list[ModelResponse]) -> None:
+        self.iterator = iterator
+        self.chunks = chunks
+
+    @classmethod
+    async def first_token_of(cls, stream: MeteredStream) -> "PrefetchedStream":
+        iterator = aiter(stream)
+        chunks = []
+        async for chunk in iterator:
+            chunks.append(chunk)
+            delta = chunk.choices[0].delta if chunk.choices else None
+            if delta is not None and (delta.content or delta.tool_calls):
+                break
+        return cls(iterator, chunks)
+
+    def __aiter__(self) -> AsyncIterator[ModelResponse]:
+        return self._iterate()
+
+    async def _iterate(self) -> AsyncIterator[ModelResponse]:
+        for chunk in self.chunks:
+            yield chunk
+        async for chunk in self.iterator:
+            yield chunk
+
+    async def aclose(self) -> None:
+        await self.iterator.aclose()
@@ -0,0 +1,42 @@
+from typing import Any, Callable
+
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+
+
+class MetricsRegistry:
+    """Process-wide registry of named metric providers, collected on demand."""
+
+    def __init__(self) -> None:
+        self._providers: dict[str, Callable[[], Any]] = {}
+
+    def register(self, name: str, provider: Callable[[], Any]) -> None:
+        self._providers[name] = provider
+
+    def collect(self) -> dict[str, Any]:
+        return {name: _to_jsonable(provider()) for name, provider in self._providers.items()}
+
+
+def _to_jsonable(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, dict):
+        return {key: _to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_jsonable(item) for item in value]
+    return value
+
+
+metrics = MetricsRegistry()
+
+
+def mount_metrics_endpoint(app: FastAPI, path: str = "/metrics") -> None:
+    """Exposes the collected metrics as JSON on the given path.
+
+    The route is inserted first so that it takes precedence over the catch-all route serving the Chainlit UI.
+    """
+    if any(isinstance(route, APIRoute) and route.path == path for route in app.router.routes):
+        return
+    route = APIRoute(path, endpoint=metrics.collect, methods=["GET"], include_in_schema=False)
+    app.router.routes.insert(0, route)
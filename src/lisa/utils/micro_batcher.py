@@ -0,0 +1,79 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Generic, Hashable, TypeVar
+
+from lisa.models.batcher_stats import BatcherStats
+
+K = TypeVar("K", bound=Hashable)
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[K, T, R]):
+    """Gathers concurrent requests sharing the same key into a single batch call.
+
+    A batch is sent once `max_batch_size` requests are waiting, or `window` seconds after its first request,
+    whichever comes first. `send` receives the key and the batched items, and must return one result per item,
+    in order.
+    """
+
+    def __init__(self, send: Callable[[K, list[T]], Awaitable[list[R]]], window: float, max_batch_size: int) -> None:
+        self.send = send
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._pending: dict[K, list[tuple[T, asyncio.Future, float]]] = {}
+        self._timers: dict[K, asyncio.TimerHandle] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._stats = BatcherStats()
+
+    async def submit(self, key: K, item: T) -> R:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self._pending.setdefault(key, [])
+        batch.append((item, future, time.perf_counter()))
+        if len(batch) >= self.max_batch_size:
+            self._flush(key)
+        elif len(batch) == 1:
+            self._timers[key] = loop.call_later(self.window, self._flush, key)
+        return await future
+
+    def _flush(self, key: K) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(key, None)
+        if batch:
+            task = asyncio.create_task(self._send(key, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, key: K, batch: list[tuple[T, asyncio.Future, float]]) -> None:
+        sent_at = time.perf_counter()
+        self._record_batch(batch, sent_at)
+        try:
+            results = await self.send(key, [item for item, _, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"Expected {len(batch)} results for the batch, got {len(results)}")
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._stats.batch_latency_ms_total += (time.perf_counter() - sent_at) * 1000
+        for (_, future, _), result in zip(batch, results):
+            # The caller may have been cancelled while the batch was in flight
+            if not future.done():
+                future.set_result(result)
+
+    def _record_batch(self, batch: list[tuple[Any, asyncio.Future, float]], sent_at: float) -> None:
+        self._stats.requests += len(batch)
+        self._stats.batches += 1
+        self._stats.batch_sizes[len(batch)] = self._stats.batch_sizes.get(len(batch), 0) + 1
+        for _, _, submitted_at in batch:
+            queue_wait_ms = (sent_at - submitted_at) * 1000
+            self._stats.queue_wait_ms_total += queue_wait_ms
+            self._stats.queue_wait_ms_max = max(self._stats.queue_wait_ms_max, queue_wait_ms)
+
+    def stats(self) -> BatcherStats:
+        return self._stats.model_copy(deep=True)
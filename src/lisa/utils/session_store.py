@@ -0,0 +1,343 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+
+from lisa.models.base_agent_usage import BaseAgentUsage
+from lisa.models.session_state import SessionState
+from lisa.models.session_store_stats import SessionStoreStats
+
+logger = logging.getLogger(__name__)
+
+# The computed usage fields are derived from the stored ones, and are not written
+_COMPUTED_USAGE_FIELDS = {"agent_usage": set(BaseAgentUsage.model_computed_fields)}
+
+
+def encode_session_state(state: SessionState) -> bytes:
+    """Serializes a session state as compressed compact JSON, the repeated prompts and keys compressing well."""
+    return zlib.compress(state.model_dump_json(exclude_none=True, exclude=_COMPUTED_USAGE_FIELDS).encode(), level=6)
+
+
+def decode_session_state(data: bytes) -> SessionState:
+    return SessionState.model_validate_json(zlib.decompress(data))
+
+
+class SessionStore(ABC):
+    """Storage of the encoded session states, shared by the workers serving the sessions.
+
+    The states not saved for `ttl` seconds are deleted by `purge_expired`, so that the sessions of the chats that
+    ended do not pile up.
+    """
+
+    # Whether other workers write to the store, in which case the live agent of a session may be stale
+    shared = True
+
+    @abstractmethod
+    async def load(self, session_id: str) -> bytes | None: ...
+
+    async def version(self, session_id: str) -> int | None:
+        """The version of the stored state of the session, or None without one."""
+        data = await self.load(session_id)
+        return decode_session_state(data).version if data is not None else None
+
+    @abstractmethod
+    async def save_many(self, states: dict[str, bytes]) -> None:
+        """Writes several encoded session states at once."""
+
+    @abstractmethod
+    async def exists(self, session_id: str) -> bool: ...
+
+    @abstractmethod
+    async def delete(self, session_id: str) -> None: ...
+
+    @abstractmethod
+    async def purge_expired(self) -> int:
+        """Deletes the states not saved for `ttl` seconds, and returns how many were deleted."""
+
+    async def close(self) -> None:
+        pass
+
+
+class MemorySessionStore(SessionStore):
+    """Keeps the encoded states in the process, for a single worker. Evicted sessions still take less memory."""
+
+    shared = False
+
+    def __init__(self, ttl: float | None = None) -> None:
+        self.ttl = ttl
+        # The states with the time they were saved, the oldest first
+        self._states: OrderedDict[str, tuple[bytes, float]] = OrderedDict()
+
+    def _expired(self, saved_at: float) -> bool:
+        return self.ttl is not None and saved_at <= time.monotonic() - self.ttl
+
+    async def load(self, session_id: str) -> bytes | None:
+        entry = self._states.get(session_id)
+        return entry[0] if entry is not None and not self._expired(entry[1]) else None
+
+    async def save_many(self, states: dict[str, bytes]) -> None:
+        now = time.monotonic()
+        for session_id, data in states.items():
+            self._states.pop(session_id, None)
+            self._states[session_id] = (data, now)
+
+    async def exists(self, session_id: str) -> bool:
+        return await self.load(session_id) is not None
+
+    async def delete(self, session_id: str) -> None:
+        self._states.pop(session_id, None)
+
+    async def purge_expired(self) -> int:
+        expired = 0
+        while self._states and self._expired(next(iter(self._states.values()))[1]):
+            self._states.popitem(last=False)
+            expired += 1
+        return expired
+
+
+class FileSessionStore(SessionStore):
+    """Writes one file per session in a directory, replaced atomically so that a reader never sees a partial state."""
+
+    def __init__(self, directory: str | Path, ttl: float | None = None) -> None:
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, session_id: str) -> Path:
+        # Session ids come from the client, only their safe characters make the file name
+        return self.directory / ("".join(c for c in session_id if c.isalnum() or c in "-_") + ".session")
+
+    async def load(self, session_id: str) -> bytes | None:
+        return await asyncio.to_thread(self._read, self._path(session_id))
+
+    def _read(self, path: Path) -> bytes | None:
+        try:
+            return path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+    async def save_many(self, states: dict[str, bytes]) -> None:
+        await asyncio.to_thread(self._write_many, states)
+
+    def _write_many(self, states: dict[str, bytes]) -> None:
+        for session_id, data in states.items():
+            path = self._path(session_id)
+            temporary_path = path.with_suffix(f".{os.getpid()}.tmp")
+            temporary_path.write_bytes(data)
+            os.replace(temporary_path, path)
+
+    async def exists(self, session_id: str) -> bool:
+        return self._path(session_id).exists()
+
+    async def delete(self, session_id: str) -> None:
+        self._path(session_id).unlink(missing_ok=True)
+
+    async def purge_expired(self) -> int:
+        if self.ttl is None:
+            return 0
+        return await asyncio.to_thread(self._unlink_older_than, time.time() - self.ttl)
+
+    def _unlink_older_than(self, expiry: float) -> int:
+        expired = 0
+        for path in self.directory.glob("*.session"):
+            try:
+                if path.stat().st_mtime <= expiry:
+                    path.unlink()
+                    expired += 1
+            except FileNotFoundError:
+                # Purged by another worker meanwhile
+                pass
+        return expired
+
+
+class SQLiteSessionStore(SessionStore):
+    """Stores the sessions in an SQLite database in WAL mode, which several local workers can share.
+
+    The calls run in a single worker thread owning the connection, each batch being written in one transaction.
+    """
+
+    def __init__(self, path: str | Path, ttl: float | None = None) -> None:
+        self.path = str(path)
+        self.ttl = ttl
+        self._connection: sqlite3.Connection | None = None
+        self._lock = asyncio.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, data BLOB NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)")
+        return self._connection
+
+    async def _run(self, function, *args):
+        # The connection is shared by the threads, one call at a time
+        async with self._lock:
+            return await asyncio.to_thread(function, *args)
+
+    async def load(self, session_id: str) -> bytes | None:
+        row = await self._run(self._fetch_one, "SELECT data FROM sessions WHERE id = ?", session_id)
+        return row[0] if row else None
+
+    def _fetch_one(self, query: str, session_id: str) -> tuple | None:
+        return self._connect().execute(query, (session_id,)).fetchone()
+
+    async def save_many(self, states: dict[str, bytes]) -> None:
+        await self._run(self._write_many, states)
+
+    def _write_many(self, states: dict[str, bytes]) -> None:
+        connection = self._connect()
+        now = time.time()
+        connection.execute("BEGIN")
+        try:
+            connection.executemany(
+                "INSERT INTO sessions (id, data, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                [(session_id, data, now) for session_id, data in states.items()],
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    async def exists(self, session_id: str) -> bool:
+        return await self._run(self._fetch_one, "SELECT 1 FROM sessions WHERE id = ?", session_id) is not None
+
+    async def delete(self, session_id: str) -> None:
+        await self._run(lambda: self._connect().execute("DELETE FROM sessions WHERE id = ?", (session_id,)))
+
+    async def purge_expired(self) -> int:
+        if self.ttl is None:
+            return 0
+        expiry = time.time() - self.ttl
+        return await self._run(lambda: self._connect().execute("DELETE FROM sessions WHERE updated_at <= ?", (expiry,)).rowcount)
+
+    async def close(self) -> None:
+        if self._connection is not None:
+            await self._run(self._connection.close)
+            self._connection = None
+
+
+class WriteBehindBuffer:
+    """Gathers the session changes and writes them to the store in batches, off the path of the answers.
+
+    A change is written at most `flush_interval` seconds later, or as soon as `max_batch` sessions have changed. Only
+    the last change of a session is written, and it is encoded when written. Reads of a pending session are served
+    from the buffer, so that a session reads its own writes.
+    """
+
+    def __init__(
+        self,
+        store: SessionStore,
+        flush_interval: float = 0.5,
+        max_batch: int = 64,
+        stats: SessionStoreStats | None = None,
+    ) -> None:
+        self.store = store
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.stats = stats or SessionStoreStats()
+        self._pending: dict[str, SessionState] = {}
+        self._flush_task: asyncio.Task | None = None
+        self._flush_lock = asyncio.Lock()
+
+    def save(self, session_id: str, state: SessionState) -> None:
+        self._pending[session_id] = state
+        self.stats.saves += 1
+        if len(self._pending) >= self.max_batch:
+            self._start_flush(delay=0)
+        elif self._flush_task is None:
+            self._start_flush(delay=self.flush_interval)
+
+    def _start_flush(self, delay: float) -> None:
+        if self._flush_task is not None and not self._flush_task.done():
+            if delay > 0:
+                return
+            # A full batch does not wait for the scheduled flush
+            self._flush_task.cancel()
+        self._flush_task = asyncio.create_task(self._flush_later(delay))
+
+    async def _flush_later(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        self._flush_task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Could not write the sessions to the store: {e!r}")
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+            start = time.perf_counter()
+            try:
+                states = await asyncio.to_thread(lambda: {key: encode_session_state(s) for key, s in pending.items()})
+                await self.store.save_many(states)
+            except BaseException:
+                # Keep the failed changes for the next flush, unless the sessions changed again meanwhile
+                self._pending = pending | self._pending
+                raise
+            self.stats.flushes += 1
+            self.stats.sessions_written += len(states)
+            self.stats.bytes_written += sum(len(data) for data in states.values())
+            self.stats.flush_ms_total += (time.perf_counter() - start) * 1000
+
+    async def load(self, session_id: str) -> SessionState | None:
+        state = self._pending.get(session_id)
+        if state is not None:
+            return state
+        data = await self.store.load(session_id)
+        return decode_session_state(data) if data is not None else None
+
+    async def version(self, session_id: str) -> int | None:
+        state = self._pending.get(session_id)
+        if state is not None:
+            return state.version
+        return await self.store.version(session_id)
+
+    async def exists(self, session_id: str) -> bool:
+        return session_id in self._pending or await self.store.exists(session_id)
+
+    async def delete(self, session_id: str) -> None:
+        self._pending.pop(session_id, None)
+        await self.store.delete(session_id)
+
+    async def purge_expired(self) -> int:
+        """Deletes the states expired from the store, the pending changes being written with the next flush."""
+        expired = await self.store.purge_expired()
+        self.stats.expired += expired
+        return expired
+
+    @property
+    def pending_writes(self) -> int:
+        return len(self._pending)
+
+    async def close(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+        await self.store.close()
+
+
+def session_store_from_env() -> SessionStore:
+    """Builds the store selected by SESSION_STORE: `memory` (default), `sqlite` or `file`, at SESSION_STORE_PATH.
+
+    The states are kept for SESSION_TTL seconds after their last save.
+    """
+    kind = os.environ.get("SESSION_STORE", "memory").lower()
+    ttl = float(os.environ.get("SESSION_TTL", "86400"))
+    if kind == "sqlite":
+        return SQLiteSessionStore(os.environ.get("SESSION_STORE_PATH", "sessions.db"), ttl=ttl)
+    if kind == "file":
+        return FileSessionStore(os.environ.get("SESSION_STORE_PATH", "sessions"), ttl=ttl)
+    return MemorySessionStore(ttl=ttl)
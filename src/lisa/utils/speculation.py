@@ -0,0 +1,119 @@
+import asyncio
+import time
+from collections.abc import Awaitable, Callable, Hashable
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any
+
+from lisa.models.speculation_stats import SpeculationStats
+from lisa.utils.metrics import metrics
+
+speculation_stats = SpeculationStats()
+metrics.register("speculative_prefetch", lambda: speculation_stats)
+
+
+@dataclass(slots=True, frozen=True)
+class ToolSpeculator:
+    """Predicts the result of a tool from the raw user message, before the LLM has asked for it."""
+
+    resolve: Callable[[str], Awaitable[Hashable | None]]
+    """Computes the key the tool is expected to load, such as the requested day, from the user message"""
+    load: Callable[[Any], Awaitable[Any]]
+    """Loads the result for a key, the way the tool does"""
+
+
+class _Prefetch:
+    def __init__(self, speculator: ToolSpeculator, text: str, stats: SpeculationStats) -> None:
+        self.speculator = speculator
+        self.stats = stats
+        self.used = False
+        self.result: asyncio.Task | None = None
+        self.load_started_at: float | None = None
+        self.load_ended_at: float | None = None
+        self.key = asyncio.create_task(speculator.resolve(text))
+        self.key.add_done_callback(self._on_key)
+
+    def _on_key(self, task: asyncio.Task) -> None:
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            self.stats.failed += 1
+            return
+        if task.result() is None:
+            self.stats.unresolved += 1
+            return
+        self.load_started_at = time.perf_counter()
+        self.result = asyncio.create_task(self.speculator.load(task.result()))
+        self.result.add_done_callback(self._on_result)
+
+    def _on_result(self, task: asyncio.Task) -> None:
+        self.load_ended_at = time.perf_counter()
+        if not task.cancelled() and task.exception() is not None:
+            self.stats.failed += 1
+
+    def cancel(self) -> None:
+        self.key.cancel()
+        if self.result is not None:
+            self.result.cancel()
+
+
+class Speculation:
+    """The tool results loaded ahead for one user message, while the first LLM call of the turn is running.
+
+    A tool reads its result through `serve`: when the key it was called with matches the speculated key, it gets the
+    speculative result, awaited if still loading, and otherwise loads its own. Speculations left unused when the turn
+    ends are discarded.
+    """
+
+    def __init__(self, text: str, speculators: dict[str, ToolSpeculator], stats: SpeculationStats = speculation_stats) -> None:
+        self.stats = stats
+        self._prefetches: dict[str, _Prefetch] = {}
+        for tool_name, speculator in speculators.items():
+            self._prefetches[tool_name] = _Prefetch(speculator, text, stats)
+            stats.started += 1
+
+    async def serve(self, tool_name: str, key: Hashable, load: Callable[[Any], Awaitable[Any]]) -> Any:
+        prefetch = self._prefetches.get(tool_name)
+        if prefetch is None or prefetch.used:
+            return await load(key)
+        prefetch.used = True
+        try:
+            speculated_key = await asyncio.shield(prefetch.key)
+        except Exception:
+            return await load(key)
+        if speculated_key is None:
+            return await load(key)
+        if speculated_key != key or prefetch.result is None:
+            self.stats.misses += 1
+            prefetch.cancel()
+            return await load(key)
+
+        asked_at = time.perf_counter()
+        try:
+            result = await asyncio.shield(prefetch.result)
+        except Exception:
+            return await load(key)
+        self.stats.hits += 1
+        self.stats.saved_ms_total += (min(asked_at, prefetch.load_ended_at) - prefetch.load_started_at) * 1000
+        return result
+
+    def discard(self) -> None:
+        """Cancels the speculations the turn did not use."""
+        for prefetch in self._prefetches.values():
+            # Speculations that resolved no key are already counted as unresolved or failed
+            if not prefetch.used and (not prefetch.key.done() or prefetch.result is not None):
+                self.stats.unused += 1
+            prefetch.cancel()
+        self._prefetches.clear()
+
+
+# The speculation of the current user message, read by the tools run during its turn
+current_speculation: ContextVar[Speculation | None] = ContextVar("current_speculation", default=None)
+
+
+async def speculative(tool_name: str, key: Hashable, load: Callable[[Any], Awaitable[Any]]) -> Any:
+    """Returns the result of `load(key)`, served from the current speculation when it predicted this call."""
+    speculation = current_speculation.get()
+    if speculation is None:
+        return await load(key)
+    return await speculation.serve(tool_name, key, load)
@@ -0,0 +1,19 @@
+from collections.abc import AsyncGenerator, AsyncIterable
+
+from lisa.models.llm_response import LLMResponse
+from lisa.models.stream_events import Finish, StreamEvent
+
+SERIALIZED_FINISH_REASONS = ("stop", "length", "content_filter")
+
+
+async def serialize_stream_events(events: AsyncIterable[StreamEvent]) -> AsyncGenerator[str]:
+    """Serializes stream events into JSON lines of `LLMResponse`.
+
+    Text deltas become messages, and the end of the answer becomes an empty message with its finish reason.
+    Tool events are not serialized.
+    """
+    async for event in events:
+        if isinstance(event, str):
+            yield LLMResponse(message=event).model_dump_json(exclude_none=True) + "\n"
+        elif isinstance(event, Finish) and event.finish_reason in SERIALIZED_FINISH_REASONS:
+            yield LLMResponse(message="", finish_reason=event.finish_reason).model_dump_json(exclude_none=True) + "\n"
@@ -0,0 +1,285 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from collections.abc import AsyncGenerator, AsyncIterator, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from pathlib import Path
+from typing import Any
+
+from lisa.models.latency_histogram import LatencyHistogram
+from lisa.utils.http_client_pool import http_client_pool
+from lisa.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    """A timed operation, such as a user turn, an LLM call or a tool execution, within the span it ran in."""
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        parent: "Span | None" = None,
+        start_time: float | None = None,
+        attributes: dict[str, Any] | None = None,
+    ) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.start_time = start_time if start_time is not None else time.time()
+        self.end_time: float | None = None
+        self.attributes = attributes or {}
+        self.error: str | None = None
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_time or time.time()) - self.start_time) * 1000
+
+    def set_attributes(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def end(self, error: BaseException | None = None, **attributes: Any) -> None:
+        """Ends the span, once: a span already ended is left as it is."""
+        if self.end_time is not None:
+            return
+        self.attributes.update(attributes)
+        if error is not None:
+            self.error = repr(error)
+        self.end_time = time.time()
+        self.tracer._on_end(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+# The span the code runs within, which parents the spans it starts. Tasks inherit it from the code creating them.
+current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+class SpanExporter(ABC):
+    @abstractmethod
+    async def export(self, spans: list[Span]) -> None: ...
+
+    async def close(self) -> None:
+        pass
+
+
+class JsonFileSpanExporter(SpanExporter):
+    """Appends the spans to a JSON lines file, one span per line."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+
+    async def export(self, spans: list[Span]) -> None:
+        lines = "".join(json.dumps(span.to_dict(), default=str) + "\n" for span in spans)
+        await asyncio.to_thread(self._append, lines)
+
+    def _append(self, lines: str) -> None:
+        with self.path.open("a", encoding="utf-8") as file:
+            file.write(lines)
+
+
+class OTLPSpanExporter(SpanExporter):
+    """Sends the spans to an OpenTelemetry collector, with the JSON encoding of the OTLP/HTTP protocol."""
+
+    def __init__(self, endpoint: str = "http://localhost:4318/v1/traces", service_name: str = "lisa") -> None:
+        self.endpoint = endpoint
+        self.service_name = service_name
+
+    async def export(self, spans: list[Span]) -> None:
+        session = http_client_pool.session("otlp")
+        async with session.post(self.endpoint, json=self.payload(spans)) as response:
+            if response.status >= 300:
+                raise EnvironmentError(f"The collector rejected the spans: {response.status} {await response.text()}")
+
+    def payload(self, spans: list[Span]) -> dict:
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": _otlp_attributes({"service.name": self.service_name})},
+                    "scopeSpans": [{"scope": {"name": "lisa"}, "spans": [_otlp_span(span) for span in spans]}],
+                }
+            ]
+        }
+
+
+def _otlp_span(span: Span) -> dict:
+    otlp_span = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        # SPAN_KIND_INTERNAL
+        "kind": 1,
+        "startTimeUnixNano": str(int(span.start_time * 1e9)),
+        "endTimeUnixNano": str(int(span.end_time * 1e9)),
+        "attributes": _otlp_attributes(span.attributes),
+        # STATUS_CODE_ERROR or STATUS_CODE_UNSET
+        "status": {"code": 2, "message": span.error} if span.error else {"code": 0},
+    }
+    if span.parent_id is not None:
+        otlp_span["parentSpanId"] = span.parent_id
+    return otlp_span
+
+
+def _otlp_attributes(attributes: dict[str, Any]) -> list[dict]:
+    otlp_attributes = []
+    for key, value in attributes.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            otlp_value = {"boolValue": value}
+        elif isinstance(value, int):
+            otlp_value = {"intValue": str(value)}
+        elif isinstance(value, float):
+            otlp_value = {"doubleValue": value}
+        else:
+            otlp_value = {"stringValue": str(value)}
+        otlp_attributes.append({"key": key, "value": otlp_value})
+    return otlp_attributes
+
+
+class Tracer:
+    """Records the spans of the turns, aggregates their durations into latency histograms, and exports them.
+
+    The histograms are kept per span name, and per measurement recorded with `observe`, such as the time to first
+    token of the LLM calls. Ended spans are exported in batches, at most `flush_interval` seconds later, off the path
+    of the answers. Without an exporter, only the histograms are kept.
+    """
+
+    def __init__(
+        self,
+        exporter: SpanExporter | None = None,
+        flush_interval: float = 1.0,
+        max_pending: int = 10_000,
+    ) -> None:
+        self.exporter = exporter
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._histograms: dict[str, LatencyHistogram] = {}
+        self._pending: list[Span] = []
+        self._flush_task: asyncio.Task | None = None
+
+    def start_span(self, name: str, start_time: float | None = None, root: bool = False, **attributes: Any) -> Span:
+        """Starts a span within the current span, or as the root of a new trace, to be ended by the caller."""
+        parent = None if root else current_span.get()
+        return Span(self, name, parent=parent, start_time=start_time, attributes=attributes)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """Runs the block within a new span, which parents the spans started in the block."""
+        span = self.start_span(name, **attributes)
+        token = current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.end(error=e)
+            raise
+        finally:
+            current_span.reset(token)
+            span.end()
+
+    def observe(self, name: str, duration_ms: float) -> None:
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            histogram = self._histograms[name] = LatencyHistogram()
+        histogram.observe(duration_ms)
+
+    def _on_end(self, span: Span) -> None:
+        self.observe(span.name, span.duration_ms)
+        if self.exporter is None:
+            return
+        if len(self._pending) >= self.max_pending:
+            # The exporter is not keeping up: the spans are dropped rather than the memory growing unbounded
+            return
+        self._pending.append(span)
+        if self._flush_task is None:
+            try:
+                self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+            except RuntimeError:
+                # Ended outside of an event loop, the span is exported with the next flush
+                pass
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        self._flush_task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        spans, self._pending = self._pending, []
+        if not spans or self.exporter is None:
+            return
+        try:
+            await self.exporter.export(spans)
+        except Exception as e:
+            logger.warning(f"Could not export {len(spans)} spans: {e!r}")
+
+    def histograms(self) -> dict[str, LatencyHistogram]:
+        return {name: self._histograms[name].model_copy(deep=True) for name in sorted(self._histograms)}
+
+    async def close(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+        if self.exporter is not None:
+            await self.exporter.close()
+
+
+async def trace_stream(span: Span, stream: AsyncIterator, token: Token | None = None) -> AsyncGenerator:
+    """Yields the events of the stream, and ends the span once the stream ends, fails or is closed.
+
+    `token` is the token of the span set as the current span, which is reset when the stream ends.
+    """
+    error = None
+    try:
+        async for event in stream:
+            yield event
+    except GeneratorExit:
+        raise
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        span.end(error=error)
+        if token is not None:
+            try:
+                current_span.reset(token)
+            except ValueError:
+                # Closed from another context, such as by the garbage collector, which never had the span set
+                pass
+        if hasattr(stream, "aclose"):
+            await stream.aclose()
+
+
+def span_exporter_from_env() -> SpanExporter | None:
+    """Builds the exporter selected by TRACING_EXPORTER: `none` (default), `json` or `otlp`."""
+    kind = os.environ.get("TRACING_EXPORTER", "none").lower()
+    if kind == "json":
+        return JsonFileSpanExporter(os.environ.get("TRACING_JSON_PATH", "traces.jsonl"))
+    if kind == "otlp":
+        endpoint = os.environ.get("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT")
+        if endpoint is None:
+            endpoint = f"{os.environ.get('OTEL_EXPORTER_OTLP_ENDPOINT', 'http://localhost:4318').rstrip('/')}/v1/traces"
+        return OTLPSpanExporter(endpoint, service_name=os.environ.get("OTEL_SERVICE_NAME", "lisa"))
+    return None
+
+
+tracer = Tracer(span_exporter_from_env(), flush_interval=float(os.environ.get("TRACING_FLUSH_INTERVAL_MS", "1000")) / 1000)
+metrics.register("latency", tracer.histograms)
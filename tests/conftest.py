@@ -0,0 +1,178 @@
+import asyncio
+import importlib.util
+import json
+import re
+import socket
+import threading
+import time
+from pathlib import Path
+
+import pytest
+import uvicorn
+from aiohttp import web
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+class FakeLLMProvider:
+    """OpenAI-compatible chat completions endpoint replying with scripted answers, streamed or not.
+
+    Each scripted answer is either a text, or a list of (tool name, arguments) tool calls, the arguments being a dict
+    or their raw JSON.
+    """
+
+    def __init__(self, token_delay: float = 0) -> None:
+        self.answers: list[str | list[tuple[str, dict | str]]] = []
+        self.requests: list[dict] = []
+        self.stream_ends: list[float] = []
+        self.token_delay = token_delay
+        self.first_token_delay = 0.0
+        self.status = 200
+        self.url = ""
+
+    async def chat_completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        self.requests.append(body)
+        if self.status != 200:
+            return web.json_response({"error": {"message": "Unavailable deployment", "type": "server_error"}}, status=self.status)
+        await asyncio.sleep(self.first_token_delay)
+        answer = self.answers.pop(0) if self.answers else "Bonjour"
+        if not body.get("stream"):
+            return web.json_response(self._completion(body, answer))
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for delta in self._deltas(answer):
+            await asyncio.sleep(self.token_delay)
+            await response.write(f"data: {json.dumps(self._chunk(body, delta))}\n\n".encode())
+        finish_reason = "stop" if isinstance(answer, str) else "tool_calls"
+        await response.write(f"data: {json.dumps(self._chunk(body, {}, finish_reason))}\n\n".encode())
+        if body.get("stream_options", {}).get("include_usage"):
+            usage_chunk = self._chunk(body, {}) | {"choices": [], "usage": self._usage(answer)}
+            await response.write(f"data: {json.dumps(usage_chunk)}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        self.stream_ends.append(time.perf_counter())
+        return response
+
+    async def models(self, request: web.Request) -> web.Response:
+        return web.json_response({"object": "list", "data": []})
+
+    def _deltas(self, answer: str | list[tuple[str, dict]]) -> list[dict]:
+        if isinstance(answer, str):
+            return [{"role": "assistant", "content": token} for token in re.findall(r"\S+\s*", answer)]
+        deltas = []
+        for index, (name, arguments) in enumerate(answer):
+            deltas.append(
+                {
+                    "tool_calls": [
+                        {"index": index, "id": f"call_{index}", "type": "function", "function": {"name": name, "arguments": ""}}
+                    ]
+                }
+            )
+            arguments_json = arguments if isinstance(arguments, str) else json.dumps(arguments)
+            # Stream the arguments in small pieces, as providers do
+            for start in range(0, len(arguments_json), 8):
+                deltas.append({"tool_calls": [{"index": index, "function": {"arguments": arguments_json[start : start + 8]}}]})
+        return deltas
+
+    def _completion(self, body: dict, answer: str | list[tuple[str, dict]]) -> dict:
+        if isinstance(answer, str):
+            message = {"role": "assistant", "content": answer}
+        else:
+            message = {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [
+                    {
+                        "id": f"call_{i}",
+                        "type": "function",
+                        "function": {
+                            "name": name,
+                            "arguments": arguments if isinstance(arguments, str) else json.dumps(arguments),
+                        },
+                    }
+                    for i, (name, arguments) in enumerate(answer)
+                ],
+            }
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body["model"],
+            "choices": [{"index": 0, "message": message, "finish_reason": "stop" if isinstance(answer, str) else "tool_calls"}],
+            "usage": self._usage(answer),
+        }
+
+    def _chunk(self, body: dict, delta: dict, finish_reason: str | None = None) -> dict:
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": body["model"],
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+
+    def _usage(self, answer: str | list[tuple[str, dict]]) -> dict:
+        completion_tokens = len(answer.split(" ")) if isinstance(answer, str) else 10 * len(answer)
+        return {
+            "prompt_tokens": 100,
+            "completion_tokens": completion_tokens,
+            "total_tokens": 100 + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": 64},
+        }
+
+
+async def start_fake_llm_provider() -> tuple[FakeLLMProvider, web.AppRunner]:
+    provider = FakeLLMProvider()
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", provider.chat_completions)
+    app.router.add_get("/v1/models", provider.models)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    provider.url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/v1"
+    return provider, runner
+
+
+@pytest.fixture
+async def fake_llm_provider():
+    provider, runner = await start_fake_llm_provider()
+    yield provider
+    await runner.cleanup()
+
+
+@pytest.fixture
+async def alternate_llm_provider():
+    provider, runner = await start_fake_llm_provider()
+    yield provider
+    await runner.cleanup()
+
+
+def load_agenda_app():
+    """Loads a fresh copy of the fake agenda service, which is not a package, with empty indexes."""
+    spec = importlib.util.spec_from_file_location("agenda_app", Path(__file__).parents[1] / "agenda" / "app.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def agenda_service(monkeypatch):
+    """Serves a fresh fake agenda over HTTP from a background thread, and points `AGENDA_BASE_URL` to it."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    module = load_agenda_app()
+    server = uvicorn.Server(uvicorn.Config(module.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    monkeypatch.setenv("AGENDA_BASE_URL", f"http://127.0.0.1:{port}")
+    yield module
+    server.should_exit = True
+    thread.join()
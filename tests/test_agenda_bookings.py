@@ -0,0 +1,137 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import pytest
+from conftest import load_agenda_app
+from fastapi.testclient import TestClient
+
+DAY = date(2025, 3, 3)
+
+
+@pytest.fixture
+def agenda():
+    module = load_agenda_app()
+    return module, TestClient(module.app)
+
+
+def listed_slots(client):
+    response = client.get("/booking/available-slots", params={"start": DAY.isoformat(), "end": "2025-03-04"})
+    return response.json()["data"][0]["availableSlots"]
+
+
+def test_booking_removes_the_slot_from_listings_and_conflicts(agenda):
+    ## Arrange
+    _, client = agenda
+    slot = listed_slots(client)[0]
+
+    # Act
+    booked = client.post("/booking/bookings", json={"date": DAY.isoformat(), "time": slot})
+    conflict = client.post("/booking/bookings", json={"date": DAY.isoformat(), "time": slot})
+
+    # Assert
+    assert booked.status_code == 201
+    assert booked.json()["status"] == "booked"
+    assert conflict.status_code == 409
+    assert slot not in listed_slots(client)
+    client.delete(f"/booking/bookings/{booked.json()['id']}")
+    assert slot in listed_slots(client)
+
+
+def test_slot_not_open_cannot_be_booked(agenda):
+    ## Arrange
+    _, client = agenda
+    closed = next(label for label in ["09:00", "09:15", "09:30", "09:45", "10:00", "10:15"] if label not in listed_slots(client))
+
+    # Act
+    response = client.post("/booking/bookings", json={"date": DAY.isoformat(), "time": closed})
+
+    # Assert
+    assert response.status_code == 409
+
+
+def test_hold_expires_unless_confirmed(agenda):
+    ## Arrange
+    _, client = agenda
+    first, second = listed_slots(client)[:2]
+    expiring = client.post("/booking/holds", params={"ttl_seconds": 0.05}, json={"date": DAY.isoformat(), "time": first})
+    confirmed = client.post("/booking/holds", params={"ttl_seconds": 0.05}, json={"date": DAY.isoformat(), "time": second})
+    client.post(f"/booking/holds/{confirmed.json()['id']}/confirm")
+
+    # Act
+    time.sleep(0.1)
+    slots = listed_slots(client)
+
+    # Assert
+    assert first in slots
+    assert second not in slots
+    assert client.post(f"/booking/holds/{expiring.json()['id']}/confirm").status_code == 404
+
+
+def test_hold_endpoints_reject_bookings(agenda):
+    ## Arrange
+    _, client = agenda
+    first, second = listed_slots(client)[:2]
+    booking = client.post("/booking/bookings", json={"date": DAY.isoformat(), "time": first}).json()
+    hold = client.post("/booking/holds", json={"date": DAY.isoformat(), "time": second}).json()
+
+    # Act
+    confirmed = client.post(f"/booking/holds/{booking['id']}/confirm")
+    released = client.delete(f"/booking/holds/{booking['id']}")
+    cancelled = client.delete(f"/booking/bookings/{hold['id']}")
+
+    # Assert
+    assert (confirmed.status_code, released.status_code, cancelled.status_code) == (404, 404, 404)
+    slots = listed_slots(client)
+    assert first not in slots and second not in slots
+    assert client.delete(f"/booking/bookings/{booking['id']}").status_code == 200
+    assert client.delete(f"/booking/holds/{hold['id']}").status_code == 200
+
+
+def test_concurrent_attempts_book_each_slot_once(agenda):
+    ## Arrange
+    module, _ = agenda
+    slots = [module.SLOT_INDEXES[label] for label in module.index.slots(DAY)]
+
+    def attempt(i):
+        start = slots[i % len(slots)]
+        try:
+            module.reservations.reserve(DAY, start, start + 1)
+            return True
+        except module.SlotConflictError:
+            return False
+
+    # Act
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(attempt, range(400)))
+
+    # Assert
+    assert sum(results) == len(slots)
+    assert module.index.slots(DAY) == []
+
+
+def test_listing_a_day_while_it_is_booked_never_caches_the_booked_slot(agenda):
+    ## Arrange
+    module, _ = agenda
+    open_bitmap = module.index.open_bitmap(DAY)
+    start = (open_bitmap & -open_bitmap).bit_length() - 1
+    booking = threading.Thread(target=module.reservations.reserve, args=(DAY, start, start + 1))
+
+    class BookedMeanwhile(dict):
+        def get(self, key, default=None):
+            reserved = super().get(key, default)
+            # The booking runs between the read of the reservations and the caching of the bitmap
+            if booking.ident is None:
+                booking.start()
+                booking.join(timeout=0.2)
+            return reserved
+
+    module.index._reserved = BookedMeanwhile()
+
+    # Act
+    module.index.bitmap(DAY)
+    booking.join()
+
+    # Assert
+    assert not module.index.bitmap(DAY) >> start & 1
@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+
+from lisa.utils.async_ttl_cache import AsyncTTLCache
+
+
+class CountingLoader:
+    def __init__(self, delay: float = 0):
+        self.calls = 0
+        self.delay = delay
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.calls
+
+
+@pytest.mark.anyio
+async def test_concurrent_lookups_share_a_single_load():
+    ## Arrange
+    cache = AsyncTTLCache(ttl=60, max_size=10)
+    loader = CountingLoader(delay=0.01)
+
+    # Act
+    values = await asyncio.gather(*[cache.get_or_load("demain", loader) for _ in range(10)])
+
+    # Assert
+    assert values == [1] * 10
+    assert loader.calls == 1
+    stats = cache.stats()
+    assert (stats.misses, stats.coalesced, stats.hits) == (1, 9, 0)
+
+
+@pytest.mark.anyio
+async def test_none_values_are_cached():
+    ## Arrange
+    cache = AsyncTTLCache(ttl=60, max_size=10)
+    loads = []
+
+    async def unrecognized():
+        loads.append(1)
+        return None
+
+    # Act
+    values = [await cache.get_or_load("bientôt", unrecognized) for _ in range(3)]
+
+    # Assert
+    assert values == [None] * 3
+    assert len(loads) == 1
+    stats = cache.stats()
+    assert (stats.misses, stats.hits) == (1, 2)
+
+
+@pytest.mark.anyio
+async def test_entries_expire_after_ttl():
+    ## Arrange
+    cache = AsyncTTLCache(ttl=0.01, max_size=10)
+    loader = CountingLoader()
+    await cache.get_or_load("demain", loader)
+
+    # Act
+    await asyncio.sleep(0.02)
+    value = await cache.get_or_load("demain", loader)
+
+    # Assert
+    assert value == 2
+    assert cache.stats().expirations == 1
+
+
+@pytest.mark.anyio
+async def test_least_recently_used_entry_is_evicted():
+    ## Arrange
+    cache = AsyncTTLCache(ttl=60, max_size=2)
+    for key in ("lundi", "mardi"):
+        await cache.get_or_load(key, CountingLoader())
+
+    # Act
+    await cache.get_or_load("lundi", CountingLoader())
+    await cache.get_or_load("mercredi", CountingLoader())
+
+    # Assert
+    assert cache.get("lundi") is not None
+    assert cache.get("mardi") is None
+    assert cache.stats().evictions == 1
+
+
+@pytest.mark.anyio
+async def test_invalidation_drops_matching_entries_and_inflight_loads():
+    ## Arrange
+    cache = AsyncTTLCache(ttl=60, max_size=10)
+    await cache.get_or_load("lundi", CountingLoader())
+    slow_loader = CountingLoader(delay=0.01)
+    pending = asyncio.create_task(cache.get_or_load("mardi", slow_loader))
+    await asyncio.sleep(0)
+
+    # Act
+    removed = cache.invalidate(lambda key, value: key == "lundi")
+    await pending
+
+    # Assert
+    assert removed == 1
+    assert cache.get("lundi") is None
+    assert cache.get("mardi") is None
+
+
+@pytest.mark.anyio
+async def test_waiters_reload_when_the_leading_load_is_cancelled():
+    ## Arrange
+    cache = AsyncTTLCache(ttl=60, max_size=10)
+    loader = CountingLoader(delay=0.01)
+    leader = asyncio.create_task(cache.get_or_load("demain", loader))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(cache.get_or_load("demain", loader))
+    await asyncio.sleep(0)
+
+    # Act
+    leader.cancel()
+    value = await follower
+
+    # Assert
+    assert value == 2
+    assert leader.cancelled()
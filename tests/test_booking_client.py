@@ -0,0 +1,59 @@
+from datetime import date
+
+import pytest
+
+from lisa.agent_tools.appointment import booking_client
+from lisa.agent_tools.appointment.booking_client import SlotUnavailableError, book_slot
+from lisa.agent_tools.appointment.schedulers import book_time_slot
+
+DAY = date(2025, 3, 3)
+DAY_NAME = f"{DAY:%A} {DAY.day} {DAY:%B}"
+
+
+@pytest.fixture
+def invalidated(monkeypatch):
+    invalidated = []
+    monkeypatch.setattr(booking_client, "invalidate_availability", invalidated.append)
+    return invalidated
+
+
+@pytest.mark.anyio
+async def test_booked_slot_is_returned_and_the_day_invalidated(agenda_service, invalidated):
+    ## Arrange
+    time_slot = agenda_service.index.slots(DAY)[0]
+
+    # Act
+    booking = await book_slot(DAY, time_slot)
+
+    # Assert
+    assert (booking["status"], booking["date"], booking["time"]) == ("booked", "2025-03-03", time_slot)
+    assert time_slot not in agenda_service.index.slots(DAY)
+    assert invalidated == [DAY]
+
+
+@pytest.mark.anyio
+async def test_taken_slot_raises_and_the_day_is_invalidated(agenda_service, invalidated):
+    ## Arrange
+    time_slot = agenda_service.index.slots(DAY)[0]
+    await book_slot(DAY, time_slot)
+
+    # Act
+    with pytest.raises(SlotUnavailableError):
+        await book_slot(DAY, time_slot)
+
+    # Assert
+    assert invalidated == [DAY, DAY]
+
+
+@pytest.mark.anyio
+async def test_book_time_slot_replies_in_french(agenda_service, invalidated):
+    ## Arrange
+    time_slot = agenda_service.index.slots(DAY)[0]
+
+    # Act
+    booked = await book_time_slot("2025-03-03", time_slot)
+    taken = await book_time_slot("2025-03-03", time_slot)
+
+    # Assert
+    assert booked == f"Rendez-vous réservé le {DAY_NAME} à {time_slot}"
+    assert taken == f"Le créneau du {DAY_NAME} à {time_slot} n'est plus disponible"
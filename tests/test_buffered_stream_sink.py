@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from lisa.models.stream_sink_stats import StreamSinkStats
+from lisa.utils.buffered_stream_sink import BufferedStreamSink
+
+
+class RecordingClient:
+    def __init__(self):
+        self.emits = []
+
+    async def stream_token(self, text):
+        self.emits.append(text)
+
+
+@pytest.mark.anyio
+async def test_first_delta_is_emitted_immediately_and_the_next_ones_are_coalesced():
+    ## Arrange
+    client = RecordingClient()
+    sink = BufferedStreamSink(client.stream_token, flush_interval=60, max_chars=1000, stats=StreamSinkStats())
+
+    # Act
+    async with sink:
+        await sink.write("Je ")
+        emits_after_first_delta = list(client.emits)
+        for delta in ["peux ", "vous ", "proposer ", "mardi"]:
+            await sink.write(delta)
+        emits_before_close = list(client.emits)
+
+    # Assert
+    assert emits_after_first_delta == ["Je "]
+    assert emits_before_close == ["Je "]
+    assert client.emits == ["Je ", "peux vous proposer mardi"]
+    assert sink.stats.flush_reasons == {"first": 1, "close": 1}
+    assert sink.stats.deltas_per_emit == 2.5
+
+
+@pytest.mark.anyio
+async def test_buffer_is_emitted_at_sentence_end_and_when_full():
+    ## Arrange
+    client = RecordingClient()
+    sink = BufferedStreamSink(client.stream_token, flush_interval=60, max_chars=12, stats=StreamSinkStats())
+
+    # Act
+    async with sink:
+        for delta in ["Bonjour", " !", " Quel", " jour", " vous", " convient", " ?"]:
+            await sink.write(delta)
+
+    # Assert
+    assert client.emits == ["Bonjour", " !", " Quel jour vous", " convient ?"]
+    assert sink.stats.flush_reasons == {"first": 1, "sentence": 2, "size": 1}
+
+
+@pytest.mark.anyio
+async def test_timer_emits_the_buffer_when_the_stream_pauses():
+    ## Arrange
+    client = RecordingClient()
+    sink = BufferedStreamSink(client.stream_token, flush_interval=0.01, max_chars=1000, stats=StreamSinkStats())
+
+    # Act
+    async with sink:
+        await sink.write("Je ")
+        await sink.write("regarde")
+        await asyncio.sleep(0.05)
+        emits_during_pause = list(client.emits)
+        await sink.write(" les créneaux")
+
+    # Assert
+    assert emits_during_pause == ["Je ", "regarde"]
+    assert client.emits == ["Je ", "regarde", " les créneaux"]
+    assert sink.stats.flush_reasons == {"first": 1, "timer": 1, "interval": 1}
@@ -0,0 +1,76 @@
+import pytest
+
+from lisa.agents.base_agent import BaseAgent
+from lisa.exceptions.token_limit_error import TokenLimitError
+from lisa.models.llm_config import LLMConfig
+
+
+class CountingTokenCounter:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, messages):
+        self.calls += 1
+        return len(messages[0]["content"].split())
+
+
+@pytest.fixture
+def agent():
+    # max_prompt_tokens = (context_window - max_tokens) * 0.9 = 9
+    llm_config = LLMConfig(model="gpt-4o-mini", api_key="test", context_window=20, max_tokens=10)
+    llm_config.token_counter = CountingTokenCounter()
+    return BaseAgent(llm_config=llm_config)
+
+
+def test_oldest_messages_are_trimmed_first(agent):
+    ## Arrange
+    messages = [
+        {"role": "system", "content": "un deux trois quatre"},
+        {"role": "user", "content": "un deux trois"},
+        {"role": "assistant", "content": "un deux"},
+        {"role": "user", "content": "un deux trois"},
+    ]
+
+    # Act
+    trimmed_messages = agent._fit_messages_within_context(messages)
+
+    # Assert
+    assert trimmed_messages == messages[1:]
+
+
+def test_leading_assistant_message_is_dropped(agent):
+    ## Arrange
+    messages = [
+        {"role": "user", "content": "un deux trois quatre cinq"},
+        {"role": "assistant", "content": "un deux"},
+        {"role": "user", "content": "un deux trois"},
+    ]
+
+    # Act
+    trimmed_messages = agent._fit_messages_within_context(messages)
+
+    # Assert
+    assert trimmed_messages == messages[2:]
+
+
+def test_each_message_is_counted_once_across_calls(agent):
+    ## Arrange
+    messages = [{"role": "user", "content": "un"}, {"role": "assistant", "tool_calls": []}, {"role": "tool", "content": "deux"}]
+
+    # Act
+    for _ in range(5):
+        agent._fit_messages_within_context(messages)
+    messages[2]["content"] = "trois"
+    agent._fit_messages_within_context(messages)
+
+    # Assert
+    assert agent.llm_config.token_counter.calls == 3
+
+
+def test_token_limit_error_when_last_message_does_not_fit(agent):
+    ## Arrange
+    messages = [{"role": "user", "content": " ".join(["mot"] * 10)}]
+
+    # Act & Assert
+    with pytest.raises(TokenLimitError):
+        agent._fit_messages_within_context(messages)
@@ -0,0 +1,51 @@
+from datetime import date, datetime
+
+import pytest
+
+from lisa.agent_tools.appointment.french_date_parser import parse_french_date
+
+# A Wednesday
+TODAY = date(2025, 3, 12)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("aujourd'hui", datetime(2025, 3, 12)),
+        ("Demain", datetime(2025, 3, 13)),
+        ("pour demain à 14h30", datetime(2025, 3, 13, 14, 30)),
+        ("après-demain", datetime(2025, 3, 14)),
+        ("dans trois jours", datetime(2025, 3, 15)),
+        ("dans 2 semaines", datetime(2025, 3, 26)),
+        ("lundi", datetime(2025, 3, 17)),
+        ("lundi prochain vers 9h", datetime(2025, 3, 17, 9)),
+        ("mercredi", datetime(2025, 3, 19)),
+        ("ce mercredi à midi", datetime(2025, 3, 12, 12)),
+        ("le 20 mars", datetime(2025, 3, 20)),
+        ("le 1er mars", datetime(2026, 3, 1)),
+        ("jeudi 20 mars 2025 à 10:15", datetime(2025, 3, 20, 10, 15)),
+        ("le 14 février 2026", datetime(2026, 2, 14)),
+        ("20/03", datetime(2025, 3, 20)),
+        ("20/03/25", datetime(2025, 3, 20)),
+        ("2025-03-20", datetime(2025, 3, 20)),
+        ("2025-03-20T09:30:00", datetime(2025, 3, 20, 9, 30)),
+    ],
+)
+def test_common_phrases_are_resolved(text, expected):
+    assert parse_french_date(text, today=TODAY) == expected
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "la semaine prochaine",
+        "lundi matin",
+        "vendredi 20 mars",
+        "le 31 février",
+        "demain à 25h",
+        "dès que possible",
+        "",
+    ],
+)
+def test_uncertain_phrases_are_left_to_the_recognizer(text):
+    assert parse_french_date(text, today=TODAY) is None
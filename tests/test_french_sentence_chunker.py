@@ -0,0 +1,54 @@
+import re
+
+import pytest
+
+from lisa.utils.french_sentence_chunker import FrenchSentenceChunker
+
+
+def chunk_stream(deltas, **kwargs):
+    chunker = FrenchSentenceChunker(**kwargs)
+    chunks = [chunk.text for delta in deltas for chunk in chunker.feed(delta)]
+    return chunks + [chunk.text for chunk in chunker.finish()]
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("Bonjour ! Quand êtes-vous disponible ?", ["Bonjour !", "Quand êtes-vous disponible ?"]),
+        ("Le rendez-vous est à 14h30. Cela vous convient ?", ["Le rendez-vous est à 14h30.", "Cela vous convient ?"]),
+        (
+            "Le tarif est de 3,5 euros. Le créneau de 14:30 est libre.",
+            ["Le tarif est de 3,5 euros.", "Le créneau de 14:30 est libre."],
+        ),
+        ("Le Dr. Martin et Mme. Durand vous recevront.", ["Le Dr. Martin et Mme. Durand vous recevront."]),
+        ("Apportez vos papiers, p.ex. une carte. Merci.", ["Apportez vos papiers, p.ex. une carte.", "Merci."]),
+        ("J. Dupont confirme... À bientôt.", ["J. Dupont confirme...", "À bientôt."]),
+        ("Votre note est de 2.5. Merci.", ["Votre note est de 2.5.", "Merci."]),
+        ("Nous serons sept. À demain.", ["Nous serons sept.", "À demain."]),
+    ],
+)
+def test_sentences_are_split_at_their_end_only(text, expected):
+    # Act
+    chunks = chunk_stream(list(text))
+
+    # Assert
+    assert chunks == expected
+
+
+def test_long_clauses_are_split_at_their_punctuation():
+    ## Arrange
+    text = "Je peux vous proposer lundi matin à neuf heures, ou bien mardi, si vous préférez l'après-midi."
+
+    # Act
+    chunks = chunk_stream(re.findall(r"\S+\s*", text), min_clause_chars=40)
+
+    # Assert
+    assert chunks == ["Je peux vous proposer lundi matin à neuf heures,", "ou bien mardi, si vous préférez l'après-midi."]
+
+
+def test_chunk_without_boundary_is_split_at_a_space_once_too_long():
+    # Act
+    chunks = chunk_stream(["un deux trois quatre cinq six"], max_chars=12)
+
+    # Assert
+    assert chunks == ["un deux", "trois quatre", "cinq six"]
@@ -0,0 +1,112 @@
+from dataclasses import dataclass
+from datetime import datetime
+
+import pytest
+from litellm.types.utils import ChatCompletionMessageToolCall, Function
+
+from lisa.agent_tools.appointment.schedulers import get_available_time_slots
+from lisa.agent_tools.appointment.time_slot_fetcher import TimeSlots
+from lisa.utils.function_calling import (
+    ToolRegistry,
+    convert_to_openai_tool,
+    encode_tool_result,
+    execute_tool,
+    tool_result_formatter,
+)
+
+
+@dataclass
+class Slot:
+    start: datetime
+    room: str | None
+    tags: set[str]
+
+
+def test_structured_results_are_encoded_as_compact_deterministic_json():
+    # Act
+    encoded = encode_tool_result({"créneaux": [Slot(datetime(2025, 3, 3, 9), None, {"b", "a"})], "jour": datetime(2025, 3, 3)})
+
+    # Assert
+    assert encoded == '{"créneaux":[{"start":"2025-03-03T09:00","tags":["a","b"]}],"jour":"2025-03-03"}'
+
+
+def test_text_results_are_kept_as_they_are():
+    # Act
+    encoded = encode_tool_result("Impossible de reconnaître la date 'hier'")
+
+    # Assert
+    assert encoded == "Impossible de reconnaître la date 'hier'"
+
+
+@pytest.mark.anyio
+async def test_execute_tool_encodes_the_result_with_the_tool_formatter():
+    ## Arrange
+    @tool_result_formatter(lambda candidates: " | ".join(" ".join(slots.slots) for slots in candidates))
+    async def list_slots(day: str) -> list[TimeSlots]:
+        return [
+            TimeSlots(date=datetime(2025, 3, 3), slots=["09:00", "09:15"]),
+            TimeSlots(date=datetime(2025, 3, 4), slots=["10:00"]),
+        ]
+
+    tool_call = ChatCompletionMessageToolCall(id="call_1", function=Function(name="list_slots", arguments='{"day": "lundi"}'))
+
+    # Act
+    content = await execute_tool(tool_call, {"list_slots": list_slots})
+
+    # Assert
+    assert content == "09:00 09:15 | 10:00"
+
+
+def test_formatted_tool_keeps_its_schema():
+    # Act
+    tool = convert_to_openai_tool(get_available_time_slots)
+
+    # Assert
+    assert tool["function"]["name"] == "get_available_time_slots"
+    assert tool["function"]["parameters"]["required"] == ["date_string"]
+
+
+def test_registry_builds_each_tool_once():
+    ## Arrange
+    registry = ToolRegistry()
+
+    # Act
+    first = registry.get(get_available_time_slots)
+    second = registry.get(get_available_time_slots)
+
+    # Assert
+    assert first is second
+    assert first.schema == convert_to_openai_tool(get_available_time_slots)
+    assert first.result_formatter is not None
+
+
+@pytest.mark.parametrize(
+    "arguments, expected",
+    [
+        ('{"day": "lundi", "count": 2}', {"day": "lundi", "count": 2}),
+        ('{"day": "lundi"}', {"day": "lundi"}),
+        ("", ValueError),
+        ('{"day": "lundi", "count": "beaucoup"}', ValueError),
+        ('{"day": "lundi", "room": "B"}', ValueError),
+        ('{"day": "lundi"', ValueError),
+    ],
+)
+def test_registered_tool_validates_the_call_arguments(arguments, expected):
+    ## Arrange
+    def count_slots(day: str, count: int = 1) -> int:
+        """Count slots.
+
+        Args:
+            day (str): The day.
+            count (int): The number of slots.
+        """
+        return count
+
+    tool = ToolRegistry().get(count_slots)
+
+    # Act & Assert
+    if expected is ValueError:
+        with pytest.raises(ValueError):
+            tool.parse_arguments(arguments)
+    else:
+        assert tool.parse_arguments(arguments) == expected
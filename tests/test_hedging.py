@@ -0,0 +1,86 @@
+import time
+
+import pytest
+
+from lisa.agents.tool_call_agent import ToolCallAgent
+from lisa.models.hedging_policy import HedgingPolicy
+from lisa.models.llm_config import LLMConfig
+
+
+def make_agent(primary, alternate, **policy):
+    llm_config = LLMConfig(model="gpt-4o-mini", api_key="test", base_url=primary.url)
+    llm_config.token_counter(text="Bonjour")
+    hedging_policy = HedgingPolicy(alternates=[LLMConfig(model="gpt-4o-mini", api_key="test", base_url=alternate.url)], **policy)
+    return ToolCallAgent(
+        llm_config=llm_config, messages=[{"role": "user", "content": "Bonjour"}], agent_tools=[], hedging_policy=hedging_policy
+    )
+
+
+async def answer(agent):
+    return "".join([event async for event in agent.stream_events(stream=True) if isinstance(event, str)])
+
+
+@pytest.mark.anyio
+async def test_slow_call_is_hedged_and_the_first_token_wins(fake_llm_provider, alternate_llm_provider):
+    ## Arrange
+    fake_llm_provider.first_token_delay = 2.5
+    fake_llm_provider.answers = ["Réponse lente"]
+    alternate_llm_provider.answers = ["Réponse rapide"]
+    agent = make_agent(fake_llm_provider, alternate_llm_provider, hedge_delay=0.1)
+
+    # Act
+    start = time.perf_counter()
+    text = await answer(agent)
+    elapsed = time.perf_counter() - start
+
+    # Assert
+    assert text == "Réponse rapide"
+    assert elapsed < 2
+    usage = agent.agent_usage
+    assert (usage.hedging_requests, usage.hedged_requests, usage.hedge_wins) == (1, 1, 1)
+    assert (usage.hedge_rate, usage.hedge_win_rate) == (1, 1)
+    assert [(call["attempt"], call["won"]) for call in usage.llm_calls] == [("hedge", True)]
+
+
+@pytest.mark.anyio
+async def test_fast_call_is_not_hedged(fake_llm_provider, alternate_llm_provider):
+    ## Arrange
+    fake_llm_provider.answers = ["Bonjour"]
+    agent = make_agent(fake_llm_provider, alternate_llm_provider, hedge_delay=1)
+
+    # Act
+    text = await answer(agent)
+
+    # Assert
+    assert text == "Bonjour"
+    assert alternate_llm_provider.requests == []
+    assert (agent.agent_usage.hedging_requests, agent.agent_usage.hedged_requests) == (1, 0)
+    assert [(call["attempt"], call["won"]) for call in agent.agent_usage.llm_calls] == [("primary", True)]
+
+
+@pytest.mark.anyio
+async def test_failed_call_fails_over_to_the_next_deployment(fake_llm_provider, alternate_llm_provider):
+    ## Arrange
+    fake_llm_provider.status = 400
+    alternate_llm_provider.answers = ["Je prends le relais"]
+    agent = make_agent(fake_llm_provider, alternate_llm_provider, hedge_delay=None)
+
+    # Act
+    text = await answer(agent)
+
+    # Assert
+    assert text == "Je prends le relais"
+    assert agent.agent_usage.failovers == 1
+    assert [(call["attempt"], call["won"]) for call in agent.agent_usage.llm_calls] == [("failover", True)]
+
+
+@pytest.mark.anyio
+async def test_failure_without_failover_is_raised(fake_llm_provider, alternate_llm_provider):
+    ## Arrange
+    fake_llm_provider.status = 400
+    agent = make_agent(fake_llm_provider, alternate_llm_provider, hedge_delay=None, failover=False)
+
+    # Act & Assert
+    with pytest.raises(Exception, match="Unavailable deployment"):
+        await answer(agent)
+    assert alternate_llm_provider.requests == []
@@ -0,0 +1,109 @@
+from lisa.agent_tools.appointment.schedulers import summarize_available_time_slots
+from lisa.agents.history_compactor import HistoryCompactor
+from lisa.models.llm_config import LLMConfig
+from lisa.utils.message_token_cache import MessageTokenCache
+
+SLOTS_RESULT = "lundi 3 mars: " + " ".join(f"{hour:02d}:{minute:02d}" for hour in range(9, 17) for minute in (0, 30))
+
+
+def count_words(message):
+    return len(message["content"].split())
+
+
+def make_turn(turn):
+    return [
+        {"role": "user", "content": f"Un créneau le {turn} mars ?"},
+        {"role": "assistant", "tool_calls": [{"id": f"call_{turn}"}]},
+        {"role": "tool", "name": "get_available_time_slots", "tool_call_id": f"call_{turn}", "content": SLOTS_RESULT},
+        {"role": "tool", "name": "get_weather", "tool_call_id": f"call_{turn}_bis", "content": "Soleil. " * 100},
+    ]
+
+
+def test_tool_results_of_earlier_turns_are_summarized_and_the_last_turn_is_kept():
+    ## Arrange
+    compactor = HistoryCompactor(summarizers={"get_available_time_slots": summarize_available_time_slots}, keep_turns=1)
+    messages = [{"role": "system", "content": "Vous êtes LISA."}, *make_turn(3), *make_turn(4)]
+
+    # Act
+    compacted, tokens_saved = compactor.compact(messages, count_tokens=count_words)
+
+    # Assert
+    assert compacted[3]["content"] == "lundi 3 mars: 16 créneaux déjà consultés"
+    assert compacted[4]["content"].endswith(" […]") and len(compacted[4]["content"]) == 204
+    assert compacted[5:] == messages[5:]
+    assert [(m["role"], m.get("tool_call_id")) for m in compacted] == [(m["role"], m.get("tool_call_id")) for m in messages]
+    assert tokens_saved == sum(count_words(m) for m in messages[3:5]) - sum(count_words(m) for m in compacted[3:5])
+    assert messages[3]["content"] == SLOTS_RESULT
+
+
+def test_compacted_messages_are_reused_across_calls():
+    ## Arrange
+    compactor = HistoryCompactor(summarizers={"get_available_time_slots": summarize_available_time_slots})
+    messages = [*make_turn(3), *make_turn(4)]
+    counted = []
+
+    def counting(message):
+        counted.append(message)
+        return count_words(message)
+
+    # Act
+    first, _ = compactor.compact(messages, count_tokens=counting)
+    counted_first = len(counted)
+    second, _ = compactor.compact(messages + [{"role": "assistant", "content": "Lequel ?"}], count_tokens=counting)
+
+    # Assert
+    assert first[2] is second[2] and first[3] is second[3]
+    assert len(counted) == counted_first
+
+
+def test_history_with_only_recent_turns_is_unchanged():
+    ## Arrange
+    compactor = HistoryCompactor(keep_turns=2)
+    messages = [*make_turn(3), *make_turn(4)]
+
+    # Act
+    compacted, tokens_saved = compactor.compact(messages, count_tokens=count_words)
+
+    # Assert
+    assert compacted is messages
+    assert tokens_saved == 0
+
+
+def test_unrecognized_time_slots_result_is_kept_unchanged():
+    ## Arrange
+    content = "Impossible de reconnaître la date 'bientôt'"
+
+    # Act
+    summary = summarize_available_time_slots(content)
+
+    # Assert
+    assert summary == content
+
+
+def test_compacting_time_slots_saves_prompt_tokens():
+    ## Arrange
+    message_tokens = MessageTokenCache(LLMConfig(model="gpt-4o-mini", api_key="test").token_counter)
+    compactor = HistoryCompactor(summarizers={"get_available_time_slots": summarize_available_time_slots})
+    messages = [*make_turn(3), *make_turn(4)]
+    messages[2]["content"] = "lundi 3 mars: 09:00 10:15 11:30 14:00 15:45\nmardi 4 mars: 09:30 16:00"
+
+    # Act
+    compacted, tokens_saved = compactor.compact(messages, count_tokens=message_tokens.count)
+
+    # Assert
+    assert tokens_saved > 0
+    assert message_tokens.count(compacted[2]) < message_tokens.count(messages[2])
+
+
+def test_summary_longer_than_the_result_is_not_used():
+    ## Arrange
+    compactor = HistoryCompactor(summarizers={"get_available_time_slots": summarize_available_time_slots})
+    messages = [*make_turn(3), *make_turn(4)]
+    messages[2]["content"] = "lundi 3 mars: 09:00"
+
+    # Act
+    compacted, tokens_saved = compactor.compact(messages, count_tokens=count_words)
+
+    # Assert
+    assert compacted[2] is messages[2]
+    assert tokens_saved == sum(count_words(m) for m in messages[3:4]) - count_words(compacted[3])
@@ -0,0 +1,55 @@
+import pytest
+from aiohttp import web
+
+from lisa.models.http_pool_config import HttpPoolConfig
+from lisa.utils.http_client_pool import HttpClientPool
+
+
+@pytest.fixture
+async def upstream_url():
+    async def handle(request):
+        return web.json_response({"data": []})
+
+    app = web.Application()
+    app.router.add_get("/ping", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    yield f"http://127.0.0.1:{port}"
+    await runner.cleanup()
+
+
+@pytest.mark.anyio
+async def test_session_is_shared_and_connections_are_reused(upstream_url):
+    ## Arrange
+    pool = HttpClientPool()
+    pool.configure("agenda", HttpPoolConfig(limit_per_host=3))
+
+    # Act
+    for _ in range(5):
+        async with pool.session("agenda").get(f"{upstream_url}/ping") as response:
+            await response.json()
+    stats = pool.stats()["agenda"]
+    await pool.close()
+
+    # Assert
+    assert stats.idle == 1
+    assert stats.in_use == 0
+    assert stats.waiters == 0
+    assert stats.limit_per_host == 3
+
+
+def test_config_from_env(monkeypatch):
+    ## Arrange
+    monkeypatch.setenv("HTTP_LIMIT_PER_HOST", "8")
+    monkeypatch.setenv("AGENDA_HTTP_LIMIT_PER_HOST", "4")
+
+    # Act
+    agenda_config = HttpPoolConfig.from_env("agenda")
+    recognizers_config = HttpPoolConfig.from_env("recognizers")
+
+    # Assert
+    assert agenda_config.limit_per_host == 4
+    assert recognizers_config.limit_per_host == 8
@@ -0,0 +1,52 @@
+import pytest
+
+from lisa.agents.base_agent import BaseAgent
+from lisa.models.llm_config import LLMConfig
+from lisa.utils.llm_client_pool import LLMClientPool, llm_client_pool
+
+
+@pytest.mark.anyio
+async def test_agents_reuse_pooled_connections(fake_llm_provider):
+    ## Arrange
+    llm_config = LLMConfig(model="gpt-4o-mini", api_key="test", base_url=fake_llm_provider.url)
+    stats_before = llm_client_pool.stats()
+
+    # Act
+    for _ in range(3):
+        agent = BaseAgent(llm_config=llm_config)
+        await agent.acompletion([{"role": "user", "content": "Bonjour"}])
+    stats = llm_client_pool.stats()
+    await llm_client_pool.close()
+
+    # Assert
+    assert stats.requests - stats_before.requests == 3
+    assert stats.new_connections - stats_before.new_connections == 1
+    assert stats.reused_connections - stats_before.reused_connections == 2
+
+
+@pytest.mark.anyio
+async def test_warm_up_opens_the_connection(fake_llm_provider):
+    ## Arrange
+    pool = LLMClientPool()
+    llm_config = LLMConfig(model="gpt-4o-mini", api_key="test", base_url=fake_llm_provider.url)
+
+    # Act
+    await pool.warm_up(llm_config)
+    await pool.client(llm_config).chat.completions.create(model="gpt-4o-mini", messages=[{"role": "user", "content": "Bonjour"}])
+    stats = pool.stats()
+    await pool.close()
+
+    # Assert
+    assert (stats.new_connections, stats.reused_connections) == (1, 1)
+
+
+@pytest.mark.anyio
+async def test_close_per_call_fallback_does_not_use_the_pool():
+    ## Arrange
+    llm_config = LLMConfig(model="gpt-4o-mini", api_key="test", keep_alive=False)
+
+    # Act
+    client = llm_client_pool.client(llm_config)
+
+    # Assert
+    assert client is None
@@ -0,0 +1,146 @@
+import asyncio
+
+import pytest
+
+from lisa.agents.tool_call_agent import ToolCallAgent
+from lisa.exceptions.llm_over_capacity_error import LLMOverCapacityError
+from lisa.models.llm_config import LLMConfig
+from lisa.utils.llm_scheduler import LLMScheduler
+
+
+async def admit_in_order(scheduler, requests):
+    """Queues the (session, first hop) requests behind a held ticket, then returns the order of their admission."""
+    order = []
+
+    async def request(session_id, first_hop):
+        ticket = await scheduler.acquire(session_id, first_hop=first_hop)
+        order.append((session_id, first_hop))
+        ticket.release()
+
+    held = await scheduler.acquire("holder")
+    tasks = [asyncio.create_task(request(*r)) for r in requests]
+    await asyncio.sleep(0)
+    held.release()
+    await asyncio.gather(*tasks)
+    return order
+
+
+@pytest.mark.anyio
+async def test_first_hops_are_admitted_before_follow_ups():
+    ## Arrange
+    scheduler = LLMScheduler(max_in_flight=1)
+
+    # Act
+    order = await admit_in_order(scheduler, [("a", False), ("b", True), ("c", False), ("d", True)])
+
+    # Assert
+    assert order == [("b", True), ("d", True), ("a", False), ("c", False)]
+    stats = scheduler.stats()
+    assert (stats.in_flight, stats.queue_depth, stats.admitted, stats.queued) == (0, 0, 5, 4)
+
+
+@pytest.mark.anyio
+async def test_sessions_are_served_in_turn():
+    ## Arrange
+    scheduler = LLMScheduler(max_in_flight=1)
+
+    # Act
+    order = await admit_in_order(scheduler, [("busy", True), ("busy", True), ("busy", True), ("quiet", True)])
+
+    # Assert
+    assert [session_id for session_id, _ in order] == ["busy", "quiet", "busy", "busy"]
+
+
+@pytest.mark.anyio
+async def test_full_queue_rejects_at_once():
+    ## Arrange
+    scheduler = LLMScheduler(max_in_flight=1, max_queue_size=1)
+    held = await scheduler.acquire("a")
+    waiting = asyncio.create_task(scheduler.acquire("b"))
+    await asyncio.sleep(0)
+
+    # Act
+    with pytest.raises(LLMOverCapacityError) as error:
+        await scheduler.acquire("c")
+
+    # Assert
+    assert (error.value.queue_depth, error.value.in_flight) == (1, 1)
+    held.release()
+    (await waiting).release()
+    assert scheduler.stats().rejected == 1
+
+
+@pytest.mark.anyio
+async def test_long_wait_is_rejected_and_leaves_the_queue():
+    ## Arrange
+    scheduler = LLMScheduler(max_in_flight=1, max_wait=0.05)
+    held = await scheduler.acquire("a")
+
+    # Act
+    with pytest.raises(LLMOverCapacityError):
+        await scheduler.acquire("b")
+
+    # Assert
+    stats = scheduler.stats()
+    assert (stats.queue_depth, stats.timed_out) == (0, 1)
+    held.release()
+    assert scheduler.stats().in_flight == 0
+
+
+@pytest.mark.anyio
+async def test_waiter_cancelled_while_a_call_is_released_is_not_admitted():
+    ## Arrange
+    scheduler = LLMScheduler(max_in_flight=1)
+    held = await scheduler.acquire("a")
+    waiting = asyncio.create_task(scheduler.acquire("b"))
+    await asyncio.sleep(0)
+
+    # Act
+    waiting.cancel()
+    held.release()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+
+    # Assert
+    stats = scheduler.stats()
+    assert (stats.in_flight, stats.queue_depth, stats.admitted) == (0, 0, 1)
+    (await scheduler.acquire("c")).release()
+
+
+@pytest.mark.anyio
+async def test_tokens_per_minute_budget_waits_for_the_window():
+    ## Arrange
+    scheduler = LLMScheduler(tokens_per_minute=1000, window=0.1)
+    (await scheduler.acquire("a", tokens=800)).release()
+
+    # Act
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    ticket = await scheduler.acquire("b", tokens=400)
+    waited = loop.time() - start
+
+    # Assert
+    assert waited >= 0.05
+    ticket.update_tokens(300)
+    assert scheduler.stats().tokens_last_minute == 300
+    ticket.release()
+
+
+@pytest.mark.anyio
+async def test_agent_calls_release_their_admission(fake_llm_provider):
+    ## Arrange
+    scheduler = LLMScheduler(max_in_flight=1, tokens_per_minute=100_000)
+    llm_config = LLMConfig(model="gpt-4o-mini", api_key="test", base_url=fake_llm_provider.url)
+    llm_config.token_counter(text="Bonjour")
+    agent = ToolCallAgent(llm_config=llm_config, messages=[], agent_tools=[], scheduler=scheduler)
+
+    # Act
+    for _ in range(2):
+        stream = await agent.on_message("Bonjour", stream=True)
+        [event async for event in stream]
+
+    # Assert
+    stats = scheduler.stats()
+    assert (stats.in_flight, stats.admitted) == (0, 2)
+    # The estimates are replaced by the usage the provider reported
+    assert stats.tokens_last_minute == sum(call["tokens_total"] for call in agent.agent_usage.llm_calls)
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from lisa.utils.micro_batcher import MicroBatcher
+
+
+class RecordingSender:
+    def __init__(self):
+        self.batches = []
+
+    async def __call__(self, culture, texts):
+        self.batches.append((culture, texts))
+        await asyncio.sleep(0)
+        return [f"{culture}:{text}" for text in texts]
+
+
+@pytest.mark.anyio
+async def test_concurrent_requests_are_sent_as_one_batch_per_key():
+    ## Arrange
+    sender = RecordingSender()
+    batcher = MicroBatcher(sender, window=0.01, max_batch_size=10)
+
+    # Act
+    results = await asyncio.gather(
+        batcher.submit("fr-fr", "demain"),
+        batcher.submit("en-us", "tomorrow"),
+        batcher.submit("fr-fr", "lundi"),
+    )
+
+    # Assert
+    assert results == ["fr-fr:demain", "en-us:tomorrow", "fr-fr:lundi"]
+    assert sorted(sender.batches) == [("en-us", ["tomorrow"]), ("fr-fr", ["demain", "lundi"])]
+    stats = batcher.stats()
+    assert (stats.requests, stats.batches, stats.batch_sizes) == (3, 2, {1: 1, 2: 1})
+
+
+@pytest.mark.anyio
+async def test_full_batch_is_sent_without_waiting_for_the_window():
+    ## Arrange
+    sender = RecordingSender()
+    batcher = MicroBatcher(sender, window=60, max_batch_size=2)
+
+    # Act
+    results = await asyncio.wait_for(
+        asyncio.gather(batcher.submit("fr-fr", "demain"), batcher.submit("fr-fr", "lundi")), timeout=1
+    )
+
+    # Assert
+    assert results == ["fr-fr:demain", "fr-fr:lundi"]
+
+
+@pytest.mark.anyio
+async def test_failed_batch_fails_every_request():
+    ## Arrange
+    async def failing_sender(culture, texts):
+        raise ConnectionError("recognizers unavailable")
+
+    batcher = MicroBatcher(failing_sender, window=0.001, max_batch_size=10)
+
+    # Act
+    results = await asyncio.gather(batcher.submit("fr-fr", "demain"), batcher.submit("fr-fr", "lundi"), return_exceptions=True)
+
+    # Assert
+    assert all(isinstance(result, ConnectionError) for result in results)
@@ -0,0 +1,64 @@
+import pytest
+
+from lisa.agent_tools.appointment import recognizers
+from lisa.agent_tools.appointment.recognizers import recognize_date_time, recognizer_cache, recognizer_stats
+
+
+@pytest.fixture
+def remote_answers(monkeypatch):
+    """Replaces the Recognizers service with the given answers, an exception being raised rather than returned."""
+    answers = []
+
+    async def submit(culture, text):
+        answer = answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    recognizer_cache.invalidate()
+    monkeypatch.setattr(recognizers.recognizer_batcher, "submit", submit)
+    yield answers
+    recognizer_cache.invalidate()
+
+
+@pytest.mark.anyio
+async def test_unrecognized_phrase_is_sent_to_the_service_once(remote_answers):
+    ## Arrange
+    remote_answers += [None]
+
+    # Act
+    results = [await recognize_date_time("quand vous voulez") for _ in range(3)]
+
+    # Assert
+    assert results == [None] * 3
+    assert remote_answers == []
+
+
+@pytest.mark.anyio
+async def test_failed_recognition_is_not_cached(remote_answers):
+    ## Arrange
+    remote_answers += [OSError("Request failed with status 503: unavailable"), None]
+
+    # Act
+    failed = await recognize_date_time("quand vous voulez")
+    retried = await recognize_date_time("quand vous voulez")
+
+    # Assert
+    assert failed is None and retried is None
+    assert remote_answers == []
+
+
+@pytest.mark.anyio
+async def test_speculative_lookups_are_counted_apart(remote_answers):
+    ## Arrange
+    remote_answers += [None]
+    before = recognizer_stats.model_copy()
+
+    # Act
+    await recognize_date_time("Bonjour, je voudrais un rendez-vous", speculative=True)
+    await recognize_date_time("demain", speculative=True)
+
+    # Assert
+    assert (recognizer_stats.remote, recognizer_stats.fast_path) == (before.remote, before.fast_path)
+    assert recognizer_stats.speculative == before.speculative + 2
+    assert recognizer_stats.speculative_remote == before.speculative_remote + 1
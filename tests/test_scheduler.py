@@ -2,11 +2,11 @@ from datetime import datetime
 
 import pytest
 
-from lisa.scheduler import TimeSlotFetcher
+from lisa.agent_tools.appointment.time_slot_fetcher import TimeSlotFetcher
 
 
 @pytest.mark.anyio
-async def test_get_available_time_slots():
+async def test_get_available_time_slots(agenda_service):
     ## Arrange
     today = datetime.now()
     fetcher = TimeSlotFetcher()
@@ -0,0 +1,208 @@
+import asyncio
+
+import pytest
+from litellm.types.utils import ChatCompletionMessageToolCall, Function
+
+from lisa.agents.agent_sessions import AgentSessions
+from lisa.agents.tool_call_agent import ToolCallAgent
+from lisa.models.base_agent_usage import BaseAgentUsage
+from lisa.models.llm_config import LLMConfig
+from lisa.models.session_state import SessionState
+from lisa.utils.session_store import (
+    FileSessionStore,
+    MemorySessionStore,
+    SQLiteSessionStore,
+    WriteBehindBuffer,
+    decode_session_state,
+    encode_session_state,
+)
+
+
+def make_state(turns: int = 1) -> SessionState:
+    messages = [{"role": "system", "content": "Vous êtes LISA. " * 50}]
+    for i in range(turns):
+        tool_call = ChatCompletionMessageToolCall(
+            id=f"call_{i}", function=Function(name="get_available_time_slots", arguments='{"date_string": "mardi"}')
+        )
+        messages += [
+            {"role": "user", "content": "Un rendez-vous mardi ?"},
+            {"role": "assistant", "tool_calls": [tool_call]},
+            {
+                "role": "tool",
+                "name": "get_available_time_slots",
+                "content": "mardi 4 mars: 09:00 09:15",
+                "tool_call_id": f"call_{i}",
+            },
+        ]
+    return SessionState(messages=messages, agent_usage=BaseAgentUsage(llm_calls=[{"tokens_prompt": 100, "tokens_cached": 64}]))
+
+
+@pytest.fixture(params=["memory", "file", "sqlite"])
+async def store(request, tmp_path):
+    if request.param == "memory":
+        store = MemorySessionStore()
+    elif request.param == "file":
+        store = FileSessionStore(tmp_path / "sessions")
+    else:
+        store = SQLiteSessionStore(tmp_path / "sessions.db")
+    yield store
+    await store.close()
+
+
+def test_encoded_state_is_compact_and_decodes_to_the_same_history():
+    ## Arrange
+    state = make_state(turns=3)
+
+    # Act
+    data = encode_session_state(state)
+    decoded = decode_session_state(data)
+
+    # Assert
+    assert len(data) < len(state.model_dump_json()) / 3
+    assert decoded.messages[2]["tool_calls"][0]["function"]["name"] == "get_available_time_slots"
+    assert decoded.messages[3] == state.messages[3]
+    assert decoded.agent_usage.prompt_cache_hit_rate == 0.64
+
+
+@pytest.mark.anyio
+async def test_store_saves_loads_and_deletes_sessions(store):
+    ## Arrange
+    states = {"a": encode_session_state(make_state(1)), "b": encode_session_state(make_state(2))}
+
+    # Act
+    await store.save_many(states)
+    await store.save_many({"a": states["b"]})
+
+    # Assert
+    assert await store.load("a") == states["b"]
+    assert await store.exists("b")
+    await store.delete("b")
+    assert await store.load("b") is None
+    assert not await store.exists("b")
+
+
+@pytest.mark.anyio
+async def test_states_not_saved_within_the_ttl_are_purged(store):
+    ## Arrange
+    store.ttl = 0.2
+    await store.save_many({"old": encode_session_state(make_state(1))})
+    await asyncio.sleep(0.3)
+    await store.save_many({"recent": encode_session_state(make_state(1))})
+
+    # Act
+    expired = await store.purge_expired()
+
+    # Assert
+    assert expired == 1
+    assert await store.load("old") is None
+    assert await store.exists("recent")
+
+
+@pytest.mark.anyio
+async def test_write_behind_buffer_writes_the_last_change_of_each_session_in_one_batch():
+    ## Arrange
+    store = MemorySessionStore()
+    buffer = WriteBehindBuffer(store, flush_interval=0.05)
+
+    # Act
+    buffer.save("a", make_state(1))
+    buffer.save("a", make_state(2))
+    buffer.save("b", make_state(1))
+    pending = await buffer.load("a")
+    await asyncio.sleep(0.1)
+
+    # Assert
+    assert len(pending.messages) == 7
+    assert (buffer.stats.saves, buffer.stats.flushes, buffer.stats.sessions_written) == (3, 1, 2)
+    assert len(decode_session_state(await store.load("a")).messages) == 7
+
+
+@pytest.mark.anyio
+async def test_evicted_session_is_rehydrated_on_its_next_message(tmp_path):
+    ## Arrange
+    llm_config = LLMConfig(model="gpt-4o-mini", api_key="test")
+
+    def build_agent(state):
+        agent = ToolCallAgent(llm_config=llm_config, messages=state.messages, agent_tools=[])
+        agent.agent_usage = state.agent_usage
+        return agent
+
+    buffer = WriteBehindBuffer(SQLiteSessionStore(tmp_path / "sessions.db"), flush_interval=0.01)
+    sessions = AgentSessions(buffer, agent_factory=build_agent, max_idle=0)
+    sessions.put("a", build_agent(make_state(1)))
+    (await sessions.get("a")).messages.append({"role": "assistant", "content": "Mardi à 9h ?"})
+
+    # Act
+    evicted = sessions.evict_idle()
+    await buffer.flush()
+    # Another worker, sharing the store, serves the next message
+    other_worker = AgentSessions(WriteBehindBuffer(buffer.store), agent_factory=build_agent)
+    agent = await other_worker.get("a")
+
+    # Assert
+    assert evicted == 1
+    assert sessions.stats().live_sessions == 0
+    assert agent.messages[-1] == {"role": "assistant", "content": "Mardi à 9h ?"}
+    assert agent.agent_usage.llm_calls == [{"tokens_prompt": 100, "tokens_cached": 64}]
+    assert other_worker.stats().rehydrations == 1
+    await buffer.close()
+
+
+@pytest.mark.anyio
+async def test_turn_of_an_agent_evicted_while_it_runs_is_saved():
+    ## Arrange
+    llm_config = LLMConfig(model="gpt-4o-mini", api_key="test")
+
+    def build_agent(state):
+        agent = ToolCallAgent(llm_config=llm_config, messages=state.messages, agent_tools=[])
+        agent.agent_usage = state.agent_usage
+        return agent
+
+    buffer = WriteBehindBuffer(MemorySessionStore(), flush_interval=60)
+    sessions = AgentSessions(buffer, agent_factory=build_agent, max_live=1)
+    sessions.put("a", build_agent(SessionState(messages=[{"role": "system", "content": "Vous êtes LISA."}])))
+    agent = await sessions.get("a")
+
+    # Act
+    # Another session starts during the turn of "a", which is evicted to make room
+    sessions.put("b", build_agent(make_state(1)))
+    agent.messages += [{"role": "user", "content": "Mardi ?"}, {"role": "assistant", "content": "Mardi à 9h ?"}]
+    sessions.save("a", agent)
+    await buffer.flush()
+    rehydrated = await AgentSessions(WriteBehindBuffer(buffer.store), agent_factory=build_agent).get("a")
+
+    # Assert
+    assert sessions.stats().evictions == 1
+    assert rehydrated.messages[-1] == {"role": "assistant", "content": "Mardi à 9h ?"}
+    assert len(rehydrated.messages) == 3
+
+
+@pytest.mark.anyio
+async def test_live_agent_is_rebuilt_once_another_worker_saved_its_session(tmp_path):
+    ## Arrange
+    llm_config = LLMConfig(model="gpt-4o-mini", api_key="test")
+
+    def build_agent(state):
+        return ToolCallAgent(llm_config=llm_config, messages=state.messages, agent_tools=[])
+
+    store = SQLiteSessionStore(tmp_path / "sessions.db")
+    worker, other_worker = (
+        AgentSessions(WriteBehindBuffer(store), build_agent),
+        AgentSessions(WriteBehindBuffer(store), build_agent),
+    )
+    worker.put("a", build_agent(make_state(1)))
+    await worker.buffer.flush()
+    # The session moves to the other worker for a turn, then comes back
+    moved = await other_worker.get("a")
+    moved.messages.append({"role": "assistant", "content": "Mardi à 9h ?"})
+    other_worker.save("a")
+    await other_worker.buffer.flush()
+
+    # Act
+    agent = await worker.get("a")
+
+    # Assert
+    assert agent.messages[-1] == {"role": "assistant", "content": "Mardi à 9h ?"}
+    assert worker.stats().stale_reloads == 1
+    assert await worker.get("a") is agent
+    await store.close()
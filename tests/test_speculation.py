@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+from chainlit.context import init_http_context
+
+from lisa.agents.tool_call_agent import ToolCallAgent
+from lisa.models.llm_config import LLMConfig
+from lisa.models.speculation_stats import SpeculationStats
+from lisa.utils.speculation import Speculation, ToolSpeculator, current_speculation, speculative
+
+DAYS = {"Un rendez-vous mardi ?": "mardi", "Et jeudi ?": "jeudi", "mardi": "mardi", "jeudi": "jeudi"}
+
+
+class FakeAgenda:
+    def __init__(self, delay: float = 0.05) -> None:
+        self.delay = delay
+        self.loads: list[str] = []
+
+    async def resolve(self, text: str) -> str | None:
+        return DAYS.get(text)
+
+    async def load(self, day: str) -> str:
+        self.loads.append(day)
+        await asyncio.sleep(self.delay)
+        return f"créneaux du {day}"
+
+
+@pytest.mark.anyio
+async def test_matching_call_is_served_from_the_speculation():
+    ## Arrange
+    agenda, stats = FakeAgenda(), SpeculationStats()
+    speculation = Speculation("Un rendez-vous mardi ?", {"slots": ToolSpeculator(agenda.resolve, agenda.load)}, stats)
+    await asyncio.sleep(0.03)
+
+    # Act
+    result = await speculation.serve("slots", "mardi", agenda.load)
+
+    # Assert
+    assert result == "créneaux du mardi"
+    assert agenda.loads == ["mardi"]
+    assert (stats.started, stats.hits, stats.misses) == (1, 1, 0)
+    assert stats.saved_ms_total >= 25
+
+
+@pytest.mark.anyio
+async def test_different_call_discards_the_speculation():
+    ## Arrange
+    agenda, stats = FakeAgenda(), SpeculationStats()
+    speculation = Speculation("Un rendez-vous mardi ?", {"slots": ToolSpeculator(agenda.resolve, agenda.load)}, stats)
+
+    # Act
+    result = await speculation.serve("slots", "jeudi", agenda.load)
+
+    # Assert
+    assert result == "créneaux du jeudi"
+    assert (stats.hits, stats.misses, stats.hit_rate) == (0, 1, 0)
+
+
+@pytest.mark.anyio
+async def test_unresolved_and_unused_speculations_are_counted():
+    ## Arrange
+    agenda, stats = FakeAgenda(), SpeculationStats()
+    speculators = {"slots": ToolSpeculator(agenda.resolve, agenda.load)}
+    Speculation("Bonjour", speculators, stats)
+    unused = Speculation("Et jeudi ?", speculators, stats)
+    await asyncio.sleep(0.01)
+
+    # Act
+    unused.discard()
+
+    # Assert
+    assert (stats.started, stats.unresolved, stats.unused) == (2, 1, 1)
+
+
+@pytest.mark.anyio
+async def test_agent_tool_reuses_the_prefetched_result(fake_llm_provider):
+    ## Arrange
+    init_http_context()
+    agenda = FakeAgenda(delay=0.2)
+
+    async def get_slots(date_string: str) -> str:
+        """Retrieve the available slots of a day."""
+        return await speculative("get_slots", await agenda.resolve(date_string), agenda.load)
+
+    fake_llm_provider.first_token_delay = 0.1
+    fake_llm_provider.answers = [[("get_slots", {"date_string": "mardi"})], "Mardi à 9h ?"]
+    llm_config = LLMConfig(model="gpt-4o-mini", api_key="test", base_url=fake_llm_provider.url)
+    llm_config.token_counter(text="Bonjour")
+    agent = ToolCallAgent(
+        llm_config=llm_config,
+        messages=[],
+        agent_tools=[get_slots],
+        speculators={"get_slots": ToolSpeculator(agenda.resolve, agenda.load)},
+    )
+
+    # Act
+    stream = await agent.on_message("Un rendez-vous mardi ?", stream=True)
+    events = [event async for event in stream]
+
+    # Assert
+    assert "".join(event for event in events if isinstance(event, str)) == "Mardi à 9h ?"
+    assert agenda.loads == ["mardi"]
+    assert agent.messages[2]["content"] == "créneaux du mardi"
+
+
+@pytest.mark.anyio
+async def test_speculation_is_discarded_when_the_turn_fails(fake_llm_provider):
+    ## Arrange
+    init_http_context()
+    agenda = FakeAgenda(delay=1)
+
+    async def get_slots(date_string: str) -> str:
+        """Retrieve the available slots of a day."""
+        return await speculative("get_slots", await agenda.resolve(date_string), agenda.load)
+
+    fake_llm_provider.status = 400
+    llm_config = LLMConfig(model="gpt-4o-mini", api_key="test", base_url=fake_llm_provider.url)
+    agent = ToolCallAgent(
+        llm_config=llm_config,
+        messages=[],
+        agent_tools=[get_slots],
+        speculators={"get_slots": ToolSpeculator(agenda.resolve, agenda.load)},
+    )
+
+    # Act
+    stream = await agent.on_message("Un rendez-vous mardi ?", stream=True)
+    speculation = agent._speculation
+    with pytest.raises(Exception, match="Unavailable deployment"):
+        [event async for event in stream]
+
+    # Assert
+    assert agent._speculation is None
+    assert current_speculation.get() is None
+    assert not speculation._prefetches
@@ -0,0 +1,112 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from aiohttp import web
+
+from lisa.agent_tools.appointment.time_slot_fetcher import FetchMode, NoAvailableTimeSlotsError, TimeSlotFetcher
+
+TODAY = datetime(2025, 3, 3)
+BOOKED_DAYS = 2
+
+
+@pytest.fixture
+async def agenda(monkeypatch):
+    requests = []
+
+    def day_slots(start, days):
+        data = []
+        for i in range(days):
+            day = start + timedelta(days=i)
+            slots = [] if (day - TODAY).days < BOOKED_DAYS else ["09:00", "09:15"]
+            data.append({"date": day.strftime("%Y-%m-%d"), "availableSlots": slots})
+        return data
+
+    async def available_slots(request):
+        start = datetime.strptime(request.query["start"], "%Y-%m-%d")
+        end = datetime.strptime(request.query["end"], "%Y-%m-%d")
+        requests.append((start, end))
+        # Later days answer faster, so that concurrent probes do not complete in order
+        await asyncio.sleep(0.05 / (1 + (start - TODAY).days))
+        return web.json_response({"data": day_slots(start, (end - start).days)})
+
+    async def next_available(request):
+        start = datetime.strptime(request.query["start"], "%Y-%m-%d")
+        count, horizon = int(request.query["count"]), int(request.query["horizon"])
+        requests.append((start, start + timedelta(days=horizon)))
+        available = [day for day in day_slots(start, horizon) if day["availableSlots"]]
+        return web.json_response({"data": available[:count]})
+
+    app = web.Application()
+    app.router.add_get("/booking/available-slots", available_slots)
+    app.router.add_get("/booking/next-available", next_available)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    monkeypatch.setenv("AGENDA_BASE_URL", f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}")
+    yield requests
+    await runner.cleanup()
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("mode", list(FetchMode))
+async def test_fetch_returns_earliest_available_day(agenda, mode):
+    ## Arrange
+    fetcher = TimeSlotFetcher(mode=mode)
+
+    # Act
+    slots = await fetcher.fetch(TODAY)
+
+    # Assert
+    assert slots.date == TODAY + timedelta(days=BOOKED_DAYS)
+    assert slots.slots == ["09:00", "09:15"]
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("mode", list(FetchMode))
+async def test_fetch_candidates_returns_consecutive_days(agenda, mode):
+    ## Arrange
+    fetcher = TimeSlotFetcher(mode=mode)
+
+    # Act
+    candidates = await fetcher.fetch_candidates(TODAY, count=2)
+
+    # Assert
+    assert [c.date for c in candidates] == [TODAY + timedelta(days=BOOKED_DAYS + i) for i in range(2)]
+
+
+@pytest.mark.anyio
+async def test_ranged_mode_uses_a_single_request(agenda):
+    ## Arrange
+    fetcher = TimeSlotFetcher(mode=FetchMode.RANGED)
+
+    # Act
+    await fetcher.fetch_candidates(TODAY, count=2)
+
+    # Assert
+    assert agenda == [(TODAY, TODAY + timedelta(days=5))]
+
+
+@pytest.mark.anyio
+async def test_next_available_mode_uses_a_single_request(agenda):
+    ## Arrange
+    fetcher = TimeSlotFetcher(mode=FetchMode.NEXT_AVAILABLE)
+
+    # Act
+    candidates = await fetcher.fetch_candidates(TODAY, count=2)
+
+    # Assert
+    assert len(candidates) == 2
+    assert agenda == [(TODAY, TODAY + timedelta(days=5))]
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("mode", list(FetchMode))
+async def test_fetch_raises_when_window_is_fully_booked(agenda, mode):
+    ## Arrange
+    fetcher = TimeSlotFetcher(mode=mode, max_attempts=BOOKED_DAYS)
+
+    # Act & Assert
+    with pytest.raises(NoAvailableTimeSlotsError):
+        await fetcher.fetch(TODAY)
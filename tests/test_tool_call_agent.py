@@ -0,0 +1,307 @@
+import asyncio
+import json
+import time
+
+import pytest
+from chainlit.context import init_http_context
+from litellm.types.utils import ChatCompletionMessageToolCall, Function
+
+from lisa.agents.tool_call_agent import ToolCallAgent
+from lisa.models.llm_config import LLMConfig
+from lisa.models.stream_events import Finish, SentenceChunk, ToolEnd, ToolStart
+
+
+async def get_available_time_slots(date_string: str) -> str:
+    """Retrieve available time slots.
+
+    Args:
+        date_string (str): Date string for appointment booking.
+    """
+    await asyncio.sleep(0.1 if date_string == "lundi" else 0.05)
+    return f"Créneaux du {date_string}"
+
+
+async def get_slow_answer(question: str) -> str:
+    """Answer slowly.
+
+    Args:
+        question (str): The question.
+    """
+    await asyncio.sleep(10)
+    return question
+
+
+async def book_time_slot(time_slot: str) -> str:
+    """Book a time slot.
+
+    Args:
+        time_slot (str): The chosen time slot.
+    """
+    raise ValueError(f"Créneau invalide : {time_slot}")
+
+
+def make_tool_call(call_id: str, name: str, arguments: str) -> ChatCompletionMessageToolCall:
+    return ChatCompletionMessageToolCall(id=call_id, function=Function(name=name, arguments=arguments))
+
+
+@pytest.fixture
+async def agent():
+    init_http_context()
+    llm_config = LLMConfig(model="gpt-4o-mini", api_key="test")
+    agent = ToolCallAgent(
+        llm_config=llm_config,
+        messages=[],
+        agent_tools=[get_available_time_slots, get_slow_answer, book_time_slot],
+        tool_timeout=0.2,
+    )
+    # The first Chainlit step and the tokenizer are slow to set up, keep them out of the measured durations
+    await agent.call_tool(make_tool_call("call_0", "get_available_time_slots", '{"date_string": "mardi"}'))
+    llm_config.token_counter(text="Bonjour")
+    return agent
+
+
+@pytest.mark.anyio
+async def test_tool_calls_run_concurrently_and_keep_their_order(agent):
+    ## Arrange
+    tool_calls = [
+        make_tool_call("call_1", "get_available_time_slots", '{"date_string": "lundi"}'),
+        make_tool_call("call_2", "get_available_time_slots", '{"date_string": "mardi"}'),
+    ]
+
+    # Act
+    start = time.perf_counter()
+    events = [event async for event in agent.call_tools(tool_calls)]
+    duration = time.perf_counter() - start
+
+    # Assert
+    assert duration < 0.15
+    assert [type(event) for event in events] == [ToolStart, ToolStart, ToolEnd, ToolEnd]
+    assert [(m["tool_call_id"], m["content"]) for m in agent.messages] == [
+        ("call_1", "Créneaux du lundi"),
+        ("call_2", "Créneaux du mardi"),
+    ]
+
+
+@pytest.mark.anyio
+async def test_concurrency_limit_is_applied(agent):
+    ## Arrange
+    agent.max_concurrent_tools = 1
+    tool_calls = [
+        make_tool_call("call_1", "get_available_time_slots", '{"date_string": "mardi"}'),
+        make_tool_call("call_2", "get_available_time_slots", '{"date_string": "mardi"}'),
+    ]
+
+    # Act
+    start = time.perf_counter()
+    async for _ in agent.call_tools(tool_calls):
+        pass
+    duration = time.perf_counter() - start
+
+    # Assert
+    assert duration >= 0.1
+
+
+@pytest.mark.anyio
+async def test_timed_out_tool_still_answers_its_call(agent):
+    ## Arrange
+    tool_calls = [
+        make_tool_call("call_1", "get_slow_answer", '{"question": "?"}'),
+        make_tool_call("call_2", "get_available_time_slots", '{"date_string": "mardi"}'),
+    ]
+
+    # Act
+    async for _ in agent.call_tools(tool_calls):
+        pass
+
+    # Assert
+    assert [m["tool_call_id"] for m in agent.messages] == ["call_1", "call_2"]
+    assert "délai" in agent.messages[0]["content"]
+
+
+@pytest.mark.anyio
+async def test_failed_tools_still_answer_their_calls(agent):
+    ## Arrange
+    tool_calls = [
+        make_tool_call("call_1", "book_time_slot", '{"time_slot": "25:00"}'),
+        make_tool_call("call_2", "get_available_time_slots", '{"date_string": '),
+        make_tool_call("call_3", "get_available_time_slots", '{"date_string": "mardi"}'),
+    ]
+
+    # Act
+    events = [event async for event in agent.call_tools(tool_calls)]
+
+    # Assert
+    assert [m["tool_call_id"] for m in agent.messages] == ["call_1", "call_2", "call_3"]
+    assert agent.messages[0]["content"] == "L'outil 'book_time_slot' a échoué : Créneau invalide : 25:00"
+    assert agent.messages[1]["content"].startswith("L'outil 'get_available_time_slots' a échoué")
+    assert agent.messages[2]["content"] == "Créneaux du mardi"
+    assert [type(event) for event in events].count(ToolEnd) == 3
+
+
+@pytest.mark.anyio
+async def test_streamed_tool_call_starts_before_the_stream_ends(agent, fake_llm_provider):
+    ## Arrange
+    fake_llm_provider.token_delay = 0.01
+    fake_llm_provider.answers = [
+        [("get_available_time_slots", {"date_string": "lundi"}), ("get_available_time_slots", {"date_string": "mardi"})],
+        "Je peux vous proposer lundi à 9h.",
+    ]
+    agent.llm_config = LLMConfig(model="gpt-4o-mini", api_key="test", base_url=fake_llm_provider.url)
+    started_at = {}
+    tool = agent.tool_dict["get_available_time_slots"]
+
+    async def record_start(date_string: str) -> str:
+        started_at[date_string] = time.perf_counter()
+        return await tool(date_string)
+
+    agent.tool_dict["get_available_time_slots"] = record_start
+
+    # Act
+    stream = await agent.on_message("lundi ou mardi", stream=True)
+    events = [event async for event in stream]
+
+    # Assert
+    assert started_at["lundi"] < fake_llm_provider.stream_ends[0]
+    assert [m["role"] for m in agent.messages[-4:]] == ["user", "assistant", "tool", "tool"]
+    assert [m["content"] for m in agent.messages[-2:]] == ["Créneaux du lundi", "Créneaux du mardi"]
+    assert "".join(event for event in events if isinstance(event, str)) == "Je peux vous proposer lundi à 9h."
+    assert [type(event) for event in events if not isinstance(event, str)] == [ToolStart, ToolStart, ToolEnd, ToolEnd, Finish]
+    assert events[-1].finish_reason == "stop"
+
+
+@pytest.mark.anyio
+async def test_streamed_tool_call_with_malformed_arguments_starts_at_the_end_of_the_stream(agent, fake_llm_provider):
+    ## Arrange
+    fake_llm_provider.answers = [
+        [("get_available_time_slots", {"date_string": "lundi"}), ("get_available_time_slots", '{"date_string": "mardi"')],
+        "Je peux vous proposer lundi à 9h.",
+    ]
+    agent.llm_config = LLMConfig(model="gpt-4o-mini", api_key="test", base_url=fake_llm_provider.url)
+
+    # Act
+    stream = await agent.on_message("lundi ou mardi", stream=True)
+    events = [event async for event in stream]
+
+    # Assert
+    assert [event.tool_call_id for event in events if isinstance(event, ToolStart)] == ["call_0", "call_1"]
+    assert agent.messages[-2]["content"] == "Créneaux du lundi"
+    assert agent.messages[-1]["content"].startswith("L'outil 'get_available_time_slots' a échoué")
+    assert "".join(event for event in events if isinstance(event, str)) == "Je peux vous proposer lundi à 9h."
+
+
+@pytest.mark.anyio
+async def test_call_llm_streams_json_lines(agent, fake_llm_provider):
+    ## Arrange
+    fake_llm_provider.answers = ["Bonjour, que puis-je faire ?"]
+    agent.llm_config = LLMConfig(model="gpt-4o-mini", api_key="test", base_url=fake_llm_provider.url)
+    agent.messages.append({"role": "user", "content": "Bonjour"})
+
+    # Act
+    lines = [line async for line in agent.call_llm(stream=True)]
+
+    # Assert
+    assert all(line.endswith("\n") for line in lines)
+    responses = [json.loads(line) for line in lines]
+    assert "".join(response["message"] for response in responses) == "Bonjour, que puis-je faire ?"
+    assert responses[-1] == {"message": "", "finish_reason": "stop"}
+
+
+@pytest.mark.anyio
+async def test_stream_sentences_yields_speakable_chunks_with_timings(agent, fake_llm_provider):
+    ## Arrange
+    fake_llm_provider.answers = ["Bonjour M. Martin. Je vous propose mardi à 14h30 ou à 15h. Lequel préférez-vous ?"]
+    agent.llm_config = LLMConfig(model="gpt-4o-mini", api_key="test", base_url=fake_llm_provider.url)
+    agent.messages.append({"role": "user", "content": "Bonjour"})
+
+    # Act
+    events = [event async for event in agent.stream_sentences(stream=True)]
+
+    # Assert
+    chunks = [event for event in events if isinstance(event, SentenceChunk)]
+    assert [chunk.text for chunk in chunks] == [
+        "Bonjour M. Martin.",
+        "Je vous propose mardi à 14h30 ou à 15h.",
+        "Lequel préférez-vous ?",
+    ]
+    assert all(chunk.started_at <= chunk.first_token_at <= chunk.ready_at for chunk in chunks)
+    assert chunks[0].ready_at < chunks[1].ready_at
+    assert isinstance(events[-1], Finish)
+
+
+@pytest.mark.anyio
+async def test_streamed_call_records_the_provider_usage_and_timings(agent, fake_llm_provider):
+    ## Arrange
+    fake_llm_provider.token_delay = 0.01
+    fake_llm_provider.answers = ["Je vous propose mardi à 14h30."]
+    agent.llm_config = LLMConfig(model="gpt-4o-mini", api_key="test", base_url=fake_llm_provider.url)
+    agent.messages.append({"role": "user", "content": "Bonjour"})
+
+    # Act
+    async for _ in agent.stream_events(stream=True):
+        pass
+
+    # Assert
+    assert fake_llm_provider.requests[0]["stream_options"] == {"include_usage": True}
+    llm_call = agent.agent_usage.llm_calls[-1]
+    assert llm_call["usage_source"] == "provider"
+    assert (llm_call["tokens_prompt"], llm_call["tokens_completion"], llm_call["tokens_cached"]) == (100, 6, 64)
+    assert llm_call["tokens_total"] == 106
+    assert llm_call["total_cost"] > 0
+    assert 0 < llm_call["time_to_first_token"] < llm_call["stream_duration"] == llm_call["request_llm"]
+    assert llm_call["stream_duration"] >= 50
+    assert llm_call["tokens_per_second"] > 0
+
+
+@pytest.mark.anyio
+async def test_streamed_call_without_provider_usage_counts_tokens_locally(agent, fake_llm_provider):
+    ## Arrange
+    fake_llm_provider.answers = ["Je vous propose mardi à 14h30."]
+    agent.llm_config = LLMConfig(model="gpt-4o-mini", api_key="test", base_url=fake_llm_provider.url)
+    agent.messages.append({"role": "user", "content": "Bonjour"})
+
+    # Act
+    async for _ in agent.stream_events(stream=True, stream_options={"include_usage": False}):
+        pass
+
+    # Assert
+    llm_call = agent.agent_usage.llm_calls[-1]
+    assert llm_call["usage_source"] == "estimated"
+    assert llm_call["tokens_completion"] == agent.llm_config.token_counter(text="Je vous propose mardi à 14h30.")
+    assert llm_call["tokens_prompt"] == agent.llm_config.token_counter(messages=agent.messages)
+    assert llm_call["tokens_cached"] == 0
+
+
+@pytest.mark.anyio
+async def test_dynamic_context_follows_a_stable_prefix_and_cached_tokens_are_reported(fake_llm_provider):
+    ## Arrange
+    fake_llm_provider.answers = ["Bonjour", "Bonjour"]
+    llm_config = LLMConfig(model="gpt-4o-mini", api_key="test", base_url=fake_llm_provider.url)
+    contexts = iter(["Current date: lundi 3 mars 2025", "Current date: mardi 4 mars 2025"])
+    agents = [
+        ToolCallAgent(
+            llm_config=llm_config,
+            messages=[{"role": "system", "content": "Vous êtes LISA."}],
+            agent_tools=tools,
+            dynamic_context=lambda: next(contexts),
+        )
+        for tools in ([get_available_time_slots, get_slow_answer], [get_slow_answer, get_available_time_slots])
+    ]
+
+    # Act
+    for agent in agents:
+        async for _ in agent.stream_events(stream=True):
+            pass
+
+    # Assert
+    first, second = fake_llm_provider.requests
+    assert json.dumps(first["tools"]) == json.dumps(second["tools"])
+    assert first["messages"][0] == second["messages"][0] == {"role": "system", "content": "Vous êtes LISA."}
+    assert [message["content"] for message in (first["messages"][1], second["messages"][1])] == [
+        "Current date: lundi 3 mars 2025",
+        "Current date: mardi 4 mars 2025",
+    ]
+    assert agents[0].messages == [{"role": "system", "content": "Vous êtes LISA."}]
+    llm_call = agents[0].agent_usage.llm_calls[0]
+    assert (llm_call["tokens_cached"], llm_call["cache_hit_rate"]) == (64, 0.64)
+    assert llm_call["cache_savings"] > 0
+    assert agents[0].agent_usage.prompt_cache_hit_rate == 0.64
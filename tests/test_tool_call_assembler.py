@@ -0,0 +1,49 @@
+from litellm.types.utils import ChatCompletionDeltaToolCall
+
+from lisa.agents.tool_call_assembler import ToolCallAssembler
+
+
+def delta(index: int, arguments: str = "", name: str | None = None, call_id: str | None = None) -> ChatCompletionDeltaToolCall:
+    return ChatCompletionDeltaToolCall(index=index, id=call_id, function={"name": name, "arguments": arguments})
+
+
+def test_tool_call_completes_when_its_arguments_are_a_json_object():
+    ## Arrange
+    assembler = ToolCallAssembler()
+
+    # Act
+    completed = [
+        assembler.add(delta(0, name="get_available_time_slots", call_id="call_0")),
+        assembler.add(delta(0, '{"date_string": ')),
+        assembler.add(delta(0, '"demain"}')),
+    ]
+
+    # Assert
+    assert completed[:2] == [[], []]
+    assert [tc.function.arguments for tc in completed[2]] == ['{"date_string": "demain"}']
+
+
+def test_tool_call_completes_when_the_next_one_starts():
+    ## Arrange
+    assembler = ToolCallAssembler()
+    assembler.add(delta(0, "{", name="get_available_time_slots", call_id="call_0"))
+
+    # Act
+    completed = assembler.add(delta(1, name="get_available_time_slots", call_id="call_1"))
+
+    # Assert
+    assert [tc.id for tc in completed] == ["call_0"]
+
+
+def test_pending_tool_calls_complete_at_the_end_of_the_stream():
+    ## Arrange
+    assembler = ToolCallAssembler()
+    assembler.add(delta(0, '{"date_string": "demain"}', name="get_available_time_slots", call_id="call_0"))
+    assembler.add(delta(1, "{", name="get_available_time_slots", call_id="call_1"))
+
+    # Act
+    completed = assembler.finish()
+
+    # Assert
+    assert [tc.id for tc in completed] == ["call_1"]
+    assert [tc.id for tc in assembler.tool_calls] == ["call_0", "call_1"]
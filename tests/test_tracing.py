@@ -0,0 +1,155 @@
+import json
+
+import pytest
+from chainlit.context import init_http_context
+
+from lisa.agents.tool_call_agent import ToolCallAgent
+from lisa.models.llm_config import LLMConfig
+from lisa.utils.tracing import (
+    JsonFileSpanExporter,
+    OTLPSpanExporter,
+    Span,
+    SpanExporter,
+    Tracer,
+    current_span,
+    tracer,
+)
+
+
+class CollectingExporter(SpanExporter):
+    def __init__(self) -> None:
+        self.spans: list[Span] = []
+
+    async def export(self, spans: list[Span]) -> None:
+        self.spans += spans
+
+
+@pytest.mark.anyio
+async def test_spans_nest_and_are_exported_to_a_json_file(tmp_path):
+    ## Arrange
+    local_tracer = Tracer(JsonFileSpanExporter(tmp_path / "traces.jsonl"), flush_interval=60)
+
+    # Act
+    with local_tracer.span("agent.turn") as turn:
+        with local_tracer.span("tool.call", tool="get_available_time_slots"):
+            pass
+        with pytest.raises(EnvironmentError), local_tracer.span("agenda.http", path="/booking/available-slots"):
+            raise EnvironmentError("Error while calling API")
+    await local_tracer.close()
+
+    # Assert
+    spans = [json.loads(line) for line in (tmp_path / "traces.jsonl").read_text().splitlines()]
+    assert [span["name"] for span in spans] == ["tool.call", "agenda.http", "agent.turn"]
+    assert {span["trace_id"] for span in spans} == {turn.trace_id}
+    assert spans[0]["parent_id"] == spans[1]["parent_id"] == turn.span_id
+    assert spans[0]["attributes"] == {"tool": "get_available_time_slots"}
+    assert "Error while calling API" in spans[1]["error"]
+    assert local_tracer.histograms()["agent.turn"].count == 1
+
+
+def test_histogram_estimates_the_quantiles_from_its_buckets():
+    ## Arrange
+    local_tracer = Tracer()
+
+    # Act
+    for duration_ms in [3] * 90 + [40] * 9 + [700]:
+        local_tracer.observe("llm.time_to_first_token", duration_ms)
+
+    # Assert
+    histogram = local_tracer.histograms()["llm.time_to_first_token"]
+    assert (histogram.count, histogram.max_ms, histogram.mean_ms) == (100, 700, 13.3)
+    assert histogram.p50_ms == pytest.approx(5 * 50 / 90)
+    assert histogram.p95_ms == pytest.approx(25 + 25 * 5 / 9)
+    assert histogram.p99_ms == 50
+    assert histogram.buckets["5"] == 90 and histogram.buckets["750"] == 1
+
+
+def test_histogram_quantiles_stay_close_to_the_measured_ones():
+    ## Arrange
+    local_tracer = Tracer()
+    durations = [400 + i for i in range(0, 180, 2)] + [900 + i for i in range(0, 50, 5)]
+
+    # Act
+    for duration_ms in durations:
+        local_tracer.observe("agent.turn", duration_ms)
+
+    # Assert
+    histogram = local_tracer.histograms()["agent.turn"]
+    assert histogram.p50_ms == pytest.approx(sorted(durations)[49], abs=25)
+    assert histogram.p50_ms < histogram.p95_ms < histogram.max_ms
+
+
+def test_otlp_payload_follows_the_json_encoding_of_the_protocol():
+    ## Arrange
+    local_tracer = Tracer()
+    with local_tracer.span("agent.turn"):
+        span = local_tracer.start_span("llm.call", model="gpt-4o-mini", first_hop=True)
+        span.end(time_to_first_token=120.5, tokens_prompt=400)
+
+    # Act
+    payload = OTLPSpanExporter().payload([span])
+
+    # Assert
+    otlp_span = payload["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert len(otlp_span["traceId"]) == 32 and len(otlp_span["parentSpanId"]) == 16
+    assert int(otlp_span["endTimeUnixNano"]) >= int(otlp_span["startTimeUnixNano"])
+    assert otlp_span["attributes"] == [
+        {"key": "model", "value": {"stringValue": "gpt-4o-mini"}},
+        {"key": "first_hop", "value": {"boolValue": True}},
+        {"key": "time_to_first_token", "value": {"doubleValue": 120.5}},
+        {"key": "tokens_prompt", "value": {"intValue": "400"}},
+    ]
+
+
+@pytest.mark.anyio
+async def test_turn_span_parents_the_llm_hops_and_the_tools(fake_llm_provider, monkeypatch):
+    ## Arrange
+    init_http_context()
+    exporter = CollectingExporter()
+    monkeypatch.setattr(tracer, "exporter", exporter)
+
+    async def get_slots(date_string: str) -> str:
+        """Retrieve the available slots of a day."""
+        return "mardi: 09:00 09:15"
+
+    fake_llm_provider.answers = [[("get_slots", {"date_string": "mardi"})], "Mardi à 9h ?"]
+    llm_config = LLMConfig(model="gpt-4o-mini", api_key="test", base_url=fake_llm_provider.url)
+    agent = ToolCallAgent(llm_config=llm_config, messages=[], agent_tools=[get_slots])
+
+    # Act
+    stream = await agent.on_message("Un rendez-vous mardi ?", stream=True)
+    [event async for event in stream]
+    await tracer.flush()
+
+    # Assert
+    spans = {span.name: span for span in exporter.spans}
+    turn = spans["agent.turn"]
+    llm_calls = [span for span in exporter.spans if span.name == "llm.call"]
+    assert len(llm_calls) == 2
+    assert {span.parent_id for span in [*llm_calls, spans["tool.call"]]} == {turn.span_id}
+    assert [span.attributes["first_hop"] for span in llm_calls] == [True, False]
+    assert llm_calls[1].attributes["time_to_first_token"] > 0
+    assert tracer.histograms()["llm.queue_wait"].count >= 2
+
+
+@pytest.mark.anyio
+async def test_each_turn_is_a_trace_of_its_own(fake_llm_provider, monkeypatch):
+    ## Arrange
+    init_http_context()
+    exporter = CollectingExporter()
+    monkeypatch.setattr(tracer, "exporter", exporter)
+    fake_llm_provider.answers = ["Quel jour ?", "Mardi à 9h ?"]
+    llm_config = LLMConfig(model="gpt-4o-mini", api_key="test", base_url=fake_llm_provider.url)
+    agent = ToolCallAgent(llm_config=llm_config, messages=[], agent_tools=[])
+
+    # Act
+    for message in ["Un rendez-vous ?", "Mardi"]:
+        stream = await agent.on_message(message, stream=True)
+        [event async for event in stream]
+    await tracer.flush()
+
+    # Assert
+    turns = [span for span in exporter.spans if span.name == "agent.turn"]
+    assert [turn.parent_id for turn in turns] == [None, None]
+    assert turns[0].trace_id != turns[1].trace_id
+    assert current_span.get() is None